@@ -28,26 +28,51 @@ function Dashboard({ ticker, date }) {
       );
     }, 3000);
 
+    let cancelled = false;
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+    // With a scoring worker the API answers 202 and queues the calculation;
+    // poll the job until it is done, then read the stored score.
+    const waitForJob = async (poll, retryAfter) => {
+      while (!cancelled) {
+        await sleep(retryAfter * 1000);
+        const job = await axios.get(`${process.env.REACT_APP_API_URL}${poll}`);
+        if (job.data.status === "done") return;
+        if (job.data.status === "failed") {
+          throw new Error(job.data.error || "The calculation failed.");
+        }
+      }
+    };
+
     const fetchData = async () => {
+      const url = `${process.env.REACT_APP_API_URL}/scores/${ticker}/${date}`;
       try {
-        const response = await axios.get(
-          `${process.env.REACT_APP_API_URL}/scores/${ticker}/${date}`
-        );
-        setData(response.data);
+        let response = await axios.get(url);
+        if (response.status === 202) {
+          const retryAfter = Number(response.headers["retry-after"]) || 2;
+          await waitForJob(response.data.poll, retryAfter);
+          if (cancelled) return;
+          response = await axios.get(url);
+        }
+        if (!cancelled) setData(response.data);
       } catch (err) {
+        if (cancelled) return;
         const detail =
           err.response?.data?.detail ||
           "Please check the ticker and try again.";
         setError(`Failed to fetch data for ${ticker} on ${date}. ${detail}`);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
         clearTimeout(timer);
       }
     };
 
     fetchData();
 
-    return () => clearTimeout(timer);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
   }, [ticker, date]);
 
   if (loading) {
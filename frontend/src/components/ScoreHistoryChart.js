@@ -19,8 +19,10 @@ function ScoreHistoryChart({ ticker }) {
     const fetchHistory = async () => {
       setLoading(true);
       try {
+        // Only the fields the chart draws; keeps the history payload small
         const response = await axios.get(
-          `${process.env.REACT_APP_API_URL}/scores/${ticker}`
+          `${process.env.REACT_APP_API_URL}/scores/${ticker}`,
+          { params: { fields: "date,creditworthiness" } }
         );
         const formattedData = response.data.map((item) => ({
           ...item,
@@ -1,4 +1,5 @@
 # app/config.py
+import os
 
 # List of tickers to process daily
 TICKERS_TO_MONITOR = [
@@ -16,4 +17,89 @@ TICKERS_TO_MONITOR = [
         "JNJ", "UNH", "PFE", "MRK",
         # Utilities / REITs
         "NEE", "PLD"
-]
\ No newline at end of file
+]
+
+# Pre-computed training features and the binary feature store built from them
+TRAINING_CSV_PATH = os.getenv("TRAINING_CSV_PATH", "final training.csv")
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "./feature_store")
+
+# Local OHLCV / fundamentals cache in front of yfinance
+MARKET_DATA_CACHE_DIR = os.getenv("MARKET_DATA_CACHE_DIR", "./cache/market_data")
+PRICE_CACHE_REFRESH_SECONDS = float(os.getenv("PRICE_CACHE_REFRESH_SECONDS", "3600"))
+FUNDAMENTALS_TTL_SECONDS = float(os.getenv("FUNDAMENTALS_TTL_SECONDS", "86400"))
+
+# Per-ticker rolling-window state for incrementally updated technical features
+FEATURE_STATE_DIR = os.getenv("FEATURE_STATE_DIR", "./cache/feature_state")
+
+# Load models, SHAP explainers and the sentiment model when app.main is imported
+# (use with gunicorn --preload so forked workers share them); otherwise on first use
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "false").lower() in ("1", "true", "yes")
+
+# Horizon model prediction backend: "xgboost" (sklearn wrapper), "inplace" or "compiled"
+PREDICTION_BACKEND = os.getenv("PREDICTION_BACKEND", "xgboost")
+
+# Streaming backfill: raw rows read per chunk, and where progress is checkpointed
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "5000"))
+BACKFILL_CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", "./cache/backfill_checkpoint.json")
+
+# Number of per-row SHAP explanations memoized per process
+SHAP_CACHE_SIZE = int(os.getenv("SHAP_CACHE_SIZE", "20000"))
+
+# Number of score upserts sent per bulk_write round trip
+SCORE_WRITE_BATCH_SIZE = int(os.getenv("SCORE_WRITE_BATCH_SIZE", "500"))
+
+# Daily job fan-out: worker threads for per-ticker fetches, and per-service limits
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+PRICE_FETCH_CONCURRENCY = int(os.getenv("PRICE_FETCH_CONCURRENCY", "4"))
+FUNDAMENTALS_FETCH_CONCURRENCY = int(os.getenv("FUNDAMENTALS_FETCH_CONCURRENCY", "4"))
+NEWS_FETCH_CONCURRENCY = int(os.getenv("NEWS_FETCH_CONCURRENCY", "2"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+FETCH_BACKOFF_SECONDS = float(os.getenv("FETCH_BACKOFF_SECONDS", "1.0"))
+
+# News sentiment model and batching
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "mrm8488/distilroberta-finetuned-financial-news-sentiment-analysis")
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", "128"))
+SENTIMENT_NUM_THREADS = int(os.getenv("SENTIMENT_NUM_THREADS", "0"))  # 0 = torch default
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "./cache/sentiment.sqlite3")
+
+# Per-ticker daily news sentiment and its exponential decay (decayed_sentiment)
+SENTIMENT_STORE_PATH = os.getenv("SENTIMENT_STORE_PATH", "./cache/news_sentiment.sqlite3")
+SENTIMENT_DECAY = float(os.getenv("SENTIMENT_DECAY", "0.8"))
+SENTIMENT_DECAY_SCALE = float(os.getenv("SENTIMENT_DECAY_SCALE", "1.0"))
+NEWS_MAX_ARTICLES = int(os.getenv("NEWS_MAX_ARTICLES", "5"))
+
+# Serialized responses cached in front of the /scores read endpoints
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+# How often each API process checks Mongo for score writes made by other processes
+# (the scoring worker, other gunicorn workers) and drops their cached responses
+RESPONSE_CACHE_SYNC_SECONDS = float(os.getenv("RESPONSE_CACHE_SYNC_SECONDS", "2"))
+
+# On-the-fly score computations: worker threads and max distinct (ticker, date) in flight
+COLD_COMPUTE_WORKERS = int(os.getenv("COLD_COMPUTE_WORKERS", "4"))
+COLD_COMPUTE_MAX_IN_FLIGHT = int(os.getenv("COLD_COMPUTE_MAX_IN_FLIGHT", "8"))
+
+# What-if / sensitivity sweeps: max grid points per request, and max tickers
+# averaged over for each partial-dependence curve
+SENSITIVITY_MAX_POINTS = int(os.getenv("SENSITIVITY_MAX_POINTS", "10000"))
+SENSITIVITY_PD_POPULATION = int(os.getenv("SENSITIVITY_PD_POPULATION", "200"))
+
+# Scoring worker (python -m app.worker): with SCORING_WORKER=true the API neither
+# runs the daily cron nor computes cold scores itself; it enqueues jobs instead
+SCORING_WORKER = os.getenv("SCORING_WORKER", "false").lower() in ("1", "true", "yes")
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "mongo")  # "mongo" or "sqlite"
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "./cache/jobs.sqlite3")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_SECONDS = float(os.getenv("JOB_RETRY_SECONDS", "30"))  # doubled after each failed attempt
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))
+# A score job that failed this recently is returned again instead of queueing the same work
+JOB_FAILURE_REUSE_SECONDS = float(os.getenv("JOB_FAILURE_REUSE_SECONDS", "300"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+
+# Logging for the 'app' loggers: level (DEBUG shows per-row messages) and "text" or "json" lines
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Port for the scoring worker's /metrics endpoint (0 = off); the API serves /metrics itself
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
@@ -1,72 +1,477 @@
 # app/database.py
 import os
-from pymongo import MongoClient
+import time
+import uuid
+import socket
+import logging
+from pymongo import MongoClient, UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Iterable, Set
 from datetime import datetime
 
+from .config import SCORE_WRITE_BATCH_SIZE, JOB_LEASE_SECONDS
+from .metrics import timed
+from .locks import acquire_lock, release_lock
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 
-client = MongoClient(MONGO_URI)
+# connect=False: no sockets or monitor threads until the first operation, so
+# importing this module in a gunicorn master (preload_app) before forking
+# workers is safe -- each worker opens its own connections on first use
+client = MongoClient(MONGO_URI, connect=False)
 db = client.credit_intelligence_new
+# Compact schema: scores holds only the hot fields every list/history read needs
+# (ticker, date, creditworthiness, risk_probs); the model inputs and SHAP values
+# live in explanations as fixed-order float arrays, read only by detail views
 scores_collection = db.scores
+explanations_collection = db.explanations
+# One document per ticker holding its newest score; kept current on every write
+latest_scores_collection = db.latest_scores
+# One document per ticker stamped with the server time of its last score write, so
+# processes that did not write it can drop their cached responses (see response_cache)
+score_writes_collection = db.score_writes
+# Named locks (app/locks.py) plus the marker recording that latest_scores has been
+# built from the whole scores history
+locks_collection = db.locks
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Writes only push their own tickers into latest_scores, so after an upgrade the
+# view is partial (not empty) until one rebuild has run; that rebuild sets this marker
+LATEST_VIEW_MARKER = "latest-scores-materialized"
+LATEST_REBUILD_LOCK = "latest-scores-rebuild"
+
+HOT_FIELDS = ("ticker", "date", "creditworthiness", "risk_probs")
+# Fields embedded in score documents written before the compact schema
+LEGACY_FIELDS = ("features", "shap_explanations")
+# Order of every float array in explanations (inference.feature_cols); a different
+# order needs a new EXPLANATION_VERSION
+EXPLANATION_FEATURES = (
+    "vol_5d", "vol_20d", "vol_60d", "drawdown_60d", "de_ratio",
+    "prev_return_5d", "prev_return_20d", "prev_return_60d", "decayed_sentiment",
+)
+EXPLANATION_VERSION = 1
+
+def ensure_indexes():
+    """Creates the unique (ticker, date) index that makes score writes idempotent."""
+    try:
+        scores_collection.create_index(
+            [("ticker", ASCENDING), ("date", ASCENDING)], unique=True, name="ticker_date_unique"
+        )
+    except OperationFailure as e:
+        # Typically pre-existing duplicate documents; writes still work, just without the guarantee
+        logger.warning(f"⚠️ Could not create unique (ticker, date) index on scores: {e}")
+    explanations_collection.create_index(
+        [("ticker", ASCENDING), ("date", ASCENDING)], unique=True, name="ticker_date_unique"
+    )
+    latest_scores_collection.create_index([("ticker", ASCENDING)], unique=True, name="ticker_unique")
+    score_writes_collection.create_index([("written_at", ASCENDING)], name="written_at")
+
+def build_score_document(features: Dict, creditworthiness: float, risk_probs: Dict, shap_explanations: Dict) -> Dict:
+    """Assembles the stored score document from a feature row and its model outputs."""
+    return {
+        "ticker": features["ticker"],
+        "date": features["date"],
+        "creditworthiness": creditworthiness,
+        "risk_probs": risk_probs,
+        "shap_explanations": shap_explanations,
+        "features": {k: v for k, v in features.items() if k not in ['ticker', 'date']}
+    }
+
+# -------------------- Compact schema -------------------- #
+def _array(values: Dict) -> List[Optional[float]]:
+    return [None if values.get(f) is None else float(values[f]) for f in EXPLANATION_FEATURES]
 
-def save_score_data(data: Dict):
-    """Inserts a single score document into the collection."""
+def _mapping(values: Optional[List]) -> Dict[str, float]:
+    return {f: v for f, v in zip(EXPLANATION_FEATURES, values or ()) if v is not None}
+
+def split_score_document(data: Dict):
+    """
+    Splits a score document (as built by build_score_document, or a legacy
+    stored one) into its hot scores document and its explanations document.
+    Features outside EXPLANATION_FEATURES (close, labels, ...) are dropped.
+    """
+    hot = {k: data[k] for k in HOT_FIELDS if k in data}
+    explanation = {
+        "ticker": data["ticker"], "date": data["date"], "v": EXPLANATION_VERSION,
+        "features": _array(data.get("features") or {}),
+    }
+    shap = data.get("shap_explanations") or {}
+    if shap:
+        # The scaled model input is the same for every horizon
+        explanation["scaled"] = _array(next(iter(shap.values())).get("feature_values", {}))
+        explanation["shap_base"] = {label: meta["base_value"] for label, meta in shap.items()}
+        explanation["shap"] = {label: _array(meta["shap_values"]) for label, meta in shap.items()}
+    return hot, explanation
+
+def join_score_document(hot: Dict, explanation: Optional[Dict]) -> Dict:
+    """The full score document (features and shap_explanations as dicts) served by detail views."""
+    if any(k in hot for k in LEGACY_FIELDS):
+        return hot
+    doc = dict(hot)
+    explanation = explanation or {}
+    scaled = _mapping(explanation.get("scaled"))
+    doc["features"] = _mapping(explanation.get("features"))
+    doc["shap_explanations"] = {
+        label: {"base_value": explanation["shap_base"][label], "feature_values": scaled,
+                "shap_values": _mapping(values)}
+        for label, values in explanation.get("shap", {}).items()
+    }
+    return doc
+
+def _normalize_score(data: Dict) -> Dict:
     if isinstance(data['date'], str):
         data['date'] = datetime.strptime(data['date'], '%Y-%m-%d')
-    
-    # Check if a document for this ticker and date already exists
-    existing_doc = scores_collection.find_one({
-        "ticker": data["ticker"],
-        "date": data["date"]
-    })
-    
-    if not existing_doc:
-        scores_collection.insert_one(data)
-        print(f"✅ Successfully saved score for {data['ticker']} on {data['date'].strftime('%Y-%m-%d')}")
+    return data
+
+def _score_upserts(data: Dict, overwrite: bool):
+    """
+    Returns the (filter, update) pairs for idempotent (ticker, date) upserts of
+    the hot scores document and of its explanations document.
+    """
+    hot, explanation = split_score_document(_normalize_score(dict(data)))
+    key = {"ticker": hot["ticker"], "date": hot["date"]}
+    if not overwrite:
+        return (key, {"$setOnInsert": hot}), (key, {"$setOnInsert": explanation})
+    # Overwriting a legacy document also drops its embedded copies
+    hot_update = {"$set": hot, "$unset": {f: "" for f in LEGACY_FIELDS}}
+    return (key, hot_update), (key, {"$set": explanation})
+
+LATEST_FIELDS = ("ticker", "date", "creditworthiness", "features")
+
+def _latest_entry(doc: Dict) -> Dict:
+    entry = {k: doc[k] for k in LATEST_FIELDS if k in doc}
+    if "features" in entry:
+        entry["features"] = {f: entry["features"][f] for f in EXPLANATION_FEATURES if f in entry["features"]}
+    return entry
+
+def _refresh_latest(documents: Iterable[Dict]):
+    """
+    Pushes newly written scores into latest_scores. The filter only matches a
+    stored entry that is not newer, so an older score never replaces a newer
+    one; the resulting duplicate-key error on the unique ticker index is the
+    "already newer" case and is ignored.
+    """
+    newest = {}
+    for doc in documents:
+        current = newest.get(doc["ticker"])
+        if current is None or doc["date"] >= current["date"]:
+            newest[doc["ticker"]] = doc
+    if not newest:
+        return
+    ops = [
+        UpdateOne(
+            {"ticker": ticker, "date": {"$lte": doc["date"]}},
+            {"$set": _latest_entry(doc)},
+            upsert=True,
+        )
+        for ticker, doc in newest.items()
+    ]
+    try:
+        latest_scores_collection.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        if any(err.get("code") != DUPLICATE_KEY_ERROR for err in e.details.get("writeErrors", [])):
+            raise
+
+# Callbacks run with the set of tickers whose stored scores just changed
+_write_listeners: List[Callable[[Set[str]], None]] = []
+
+def on_scores_written(callback: Callable[[Set[str]], None]):
+    """Registers a callback (e.g. a response-cache invalidator) for score writes."""
+    _write_listeners.append(callback)
+    return callback
+
+def _stamp_writes(tickers: Set[str]):
+    try:
+        score_writes_collection.bulk_write([
+            UpdateOne({"_id": ticker}, {"$currentDate": {"written_at": True}}, upsert=True) for ticker in tickers
+        ], ordered=False)
+    except Exception as e:
+        # Other processes then only catch up when their cached responses expire
+        logger.warning(f"⚠️ Could not record score writes for {sorted(tickers)}: {e}")
+
+def get_score_writes_since(since: Optional[datetime]) -> List[Dict]:
+    """(ticker, written_at) stamps of score writes at or after since (all of them without since)."""
+    query = {"written_at": {"$gte": since}} if since is not None else {}
+    return list(score_writes_collection.find(query))
+
+def _after_write(documents: List[Dict]):
+    """Keeps derived state in step with documents that actually landed in scores."""
+    if not documents:
+        return
+    _refresh_latest(documents)
+    tickers = {doc["ticker"] for doc in documents}
+    _stamp_writes(tickers)
+    for callback in _write_listeners:
+        callback(tickers)
+
+def save_score_data(data: Dict, overwrite: bool = False):
+    """
+    Upserts a single score document keyed on (ticker, date), split into its
+    scores and explanations documents. An existing document is left untouched
+    unless overwrite=True. Round trips: the explanations upsert and the scores
+    upsert, plus the latest_scores refresh and the score_writes stamp when the
+    score was inserted or updated (four in all).
+    """
+    _normalize_score(data)
+    (query, update), explanation_upsert = _score_upserts(data, overwrite)
+    with timed("mongo_write"):
+        # Explanation first, so a stored score always has one
+        try:
+            explanations_collection.update_one(*explanation_upsert, upsert=True)
+        except DuplicateKeyError:
+            # A concurrent writer inserted this explanation first; the score may still be missing
+            pass
+        try:
+            result = scores_collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # A concurrent writer inserted the same (ticker, date) first
+            result = None
+
+    if result is not None and result.upserted_id is not None:
+        _after_write([data])
+        logger.debug(f"✅ Successfully saved score for {data['ticker']} on {data['date'].strftime('%Y-%m-%d')}")
+    elif overwrite and result is not None and result.modified_count:
+        _after_write([data])
+        logger.debug(f"✅ Updated score for {data['ticker']} on {data['date'].strftime('%Y-%m-%d')}")
     else:
-        print(f"ℹ️ Score for {data['ticker']} on {data['date'].strftime('%Y-%m-%d')} already exists. Skipping.")
+        logger.debug(f"ℹ️ Score for {data['ticker']} on {data['date'].strftime('%Y-%m-%d')} already exists. Skipping.")
 
+def _bulk_upsert(collection, ops: List[UpdateOne]) -> Dict:
+    """Unordered bulk upserts; duplicate-key errors (concurrent inserts of the same key) are not failures."""
+    try:
+        with timed("mongo_write"):
+            return collection.bulk_write(ops, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        if any(err.get("code") != DUPLICATE_KEY_ERROR for err in e.details.get("writeErrors", [])):
+            raise
+        return e.details
 
-def get_scores_by_ticker(ticker: str) -> List[Dict]:
-    """Fetches all scores for a given ticker, sorted by date."""
-    cursor = scores_collection.find({"ticker": ticker}).sort("date", -1)
-    results = []
-    for doc in cursor:
-        doc['_id'] = str(doc['_id'])
-        doc['date'] = doc['date'].strftime('%Y-%m-%d')
-        results.append(doc)
-    return results
+def _stored_scores(keys: List[Dict]) -> Dict:
+    """The stored scores documents for (ticker, date) keys, by (ticker, date)."""
+    fields = {f: 1 for f in HOT_FIELDS + LEGACY_FIELDS}
+    fields["_id"] = 0
+    return {(doc["ticker"], doc["date"]): doc for doc in scores_collection.find({"$or": keys}, fields)}
 
+def _score_changed(stored: Optional[Dict], hot: Dict) -> bool:
+    """Whether overwriting stored with hot modifies it (legacy documents always lose their embedded fields)."""
+    if stored is None or any(f in stored for f in LEGACY_FIELDS):
+        return True
+    return any(stored.get(f) != hot.get(f) for f in HOT_FIELDS)
+
+def save_scores_bulk(documents: Iterable[Dict], batch_size: int = SCORE_WRITE_BATCH_SIZE,
+                     overwrite: bool = False) -> Dict[str, int]:
+    """
+    Writes score documents with unordered bulk upserts keyed on (ticker, date),
+    split into scores and explanations, flushing every batch_size documents. Returns counts of inserted, updated
+    and already-present documents. With overwrite=True only inserted scores and
+    stored scores that actually changed refresh latest_scores and invalidate caches.
+    """
+    totals = {"inserted": 0, "updated": 0, "existing": 0}
+
+    def flush(docs: List[Dict]):
+        if not docs:
+            return
+        upserts = [_score_upserts(data, overwrite) for data in docs]
+        # Overwrites read the stored scores first (one more round trip), so that an
+        # unchanged re-run moves no latest_scores entry and invalidates no cache
+        stored = _stored_scores([hot[0] for hot, _ in upserts]) if overwrite else {}
+        # Explanations first, so a stored score always has one
+        _bulk_upsert(explanations_collection, [UpdateOne(*exp, upsert=True) for _, exp in upserts])
+        ops = [UpdateOne(*hot, upsert=True) for hot, _ in upserts]
+        details = _bulk_upsert(scores_collection, ops)
+        inserted = details.get("nUpserted", 0)
+        updated = details.get("nModified", 0)
+        totals["inserted"] += inserted
+        totals["updated"] += updated
+        totals["existing"] += len(ops) - inserted - updated
+
+        # Only documents that actually landed in scores may move latest_scores
+        written = {u["index"] for u in details.get("upserted", [])}
+        if updated:
+            written.update(
+                i for i, (hot, _) in enumerate(upserts)
+                if _score_changed(stored.get((hot[0]["ticker"], hot[0]["date"])), hot[1]["$set"])
+            )
+        _after_write([docs[i] for i in sorted(written)])
+
+    batch = []
+    for data in documents:
+        batch.append(_normalize_score(dict(data)))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+
+    logger.debug(f"✅ Bulk saved scores: {totals['inserted']} inserted, {totals['updated']} updated, "
+                 f"{totals['existing']} already present.", extra=totals)
+    return totals
+
+
+HISTORY_INTERVALS = ("daily", "weekly", "monthly")
+_WEEK_MS = 7 * 24 * 3600 * 1000
+_EPOCH_MONDAY = datetime(1970, 1, 5)
+_DATE_STRING = {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}}
+
+def _check_fields(fields: List[str]):
+    """History reads may project the hot fields (or one horizon of risk_probs) and _id."""
+    for field in fields:
+        root, dotted, sub = field.partition(".")
+        if root not in HOT_FIELDS + ("_id",) or (dotted and (root != "risk_probs" or not sub.isidentifier())):
+            raise ValueError(f"Unknown field '{field}'; 'fields' may contain {', '.join(HOT_FIELDS)}, "
+                             f"_id or risk_probs.<horizon>.")
+
+def _parse_day(value: Optional[str], name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format, got '{value}'.")
+
+@timed("mongo_read")
+def get_scores_by_ticker(ticker: str, start: Optional[str] = None, end: Optional[str] = None,
+                         limit: Optional[int] = None, cursor: Optional[str] = None,
+                         fields: Optional[List[str]] = None, interval: Optional[str] = None) -> List[Dict]:
+    """
+    Fetches scores for a given ticker, newest first. Filtering, paging,
+    projection and downsampling all run inside Mongo:
+      start/end  - inclusive date range (YYYY-MM-DD)
+      cursor     - only dates strictly before this one (the last date of the previous page)
+      limit      - maximum number of documents
+      fields     - hot fields (or risk_probs.<horizon>) and _id to return; date is always included
+      interval   - 'weekly' / 'monthly' returns one averaged creditworthiness point per period
+    With no arguments every stored document is returned with its hot fields;
+    features and SHAP values are only served by get_score_for_date_or_earlier.
+    """
+    interval = interval or "daily"
+    if interval not in HISTORY_INTERVALS:
+        raise ValueError(f"'interval' must be one of {', '.join(HISTORY_INTERVALS)}.")
+    if fields:
+        _check_fields(fields)
+
+    date_range = {}
+    if start:
+        date_range["$gte"] = _parse_day(start, "start")
+    if end:
+        date_range["$lte"] = _parse_day(end, "end")
+    match = {"ticker": ticker}
+    if date_range:
+        match["date"] = date_range
+    before = _parse_day(cursor, "cursor")
+
+    pipeline = [{"$match": match}]
+    if interval == "daily":
+        if before:
+            match.setdefault("date", {})["$lt"] = before
+        pipeline.append({"$sort": {"date": -1}})
+        if limit:
+            pipeline.append({"$limit": limit})
+        if fields:
+            projection = {f: 1 for f in fields if f not in ("_id", "date")}
+            projection["_id"] = {"$toString": "$_id"} if "_id" in fields else 0
+            projection["date"] = _DATE_STRING
+            pipeline.append({"$project": projection})
+        else:
+            # Documents not migrated yet (migrate_scores.py) still embed the heavy fields
+            pipeline.append({"$project": {f: 0 for f in LEGACY_FIELDS}})
+            pipeline.append({"$addFields": {"_id": {"$toString": "$_id"}, "date": _DATE_STRING}})
+    else:
+        if interval == "weekly":
+            # Monday-based weeks counted from the first Monday after the epoch
+            bucket = {"$floor": {"$divide": [{"$subtract": ["$date", _EPOCH_MONDAY]}, _WEEK_MS]}}
+        else:
+            bucket = {"year": {"$year": "$date"}, "month": {"$month": "$date"}}
+        pipeline.append({"$group": {
+            "_id": bucket,
+            "date": {"$max": "$date"},
+            "creditworthiness": {"$avg": "$creditworthiness"},
+            "points": {"$sum": 1},
+        }})
+        if before:
+            pipeline.append({"$match": {"date": {"$lt": before}}})
+        pipeline.append({"$sort": {"date": -1}})
+        if limit:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$project": {"_id": 0, "date": _DATE_STRING, "creditworthiness": 1, "points": 1}})
+
+    return list(scores_collection.aggregate(pipeline))
+
+def rebuild_latest_scores() -> int:
+    """
+    Recomputes latest_scores from the full scores collection. Uses one indexed
+    (ticker, date desc) lookup per ticker instead of sorting the whole history.
+    """
+    global _latest_materialized
+    tickers = scores_collection.distinct("ticker")
+    for ticker in tickers:
+        doc = scores_collection.find_one(
+            {"ticker": ticker}, {k: 1 for k in LATEST_FIELDS}, sort=[("date", -1)]
+        )
+        if doc:
+            doc.pop("_id", None)
+            if "features" not in doc:
+                explanation = explanations_collection.find_one({"ticker": ticker, "date": doc["date"]}, {"features": 1})
+                doc["features"] = _mapping((explanation or {}).get("features"))
+            try:
+                # Same guard as _refresh_latest: a score written meanwhile is newer and stays
+                latest_scores_collection.replace_one(
+                    {"ticker": ticker, "date": {"$lte": doc["date"]}}, _latest_entry(doc), upsert=True
+                )
+            except DuplicateKeyError:
+                pass
+    latest_scores_collection.delete_many({"ticker": {"$nin": tickers}})
+    locks_collection.update_one(
+        {"_id": LATEST_VIEW_MARKER}, {"$currentDate": {"materialized_at": True}}, upsert=True
+    )
+    _latest_materialized = True
+    logger.info(f"✅ Rebuilt latest scores for {len(tickers)} tickers.")
+    return len(tickers)
+
+# Set once this process has seen the materialized marker
+_latest_materialized = False
+
+def _ensure_latest_materialized():
+    """
+    Rebuilds latest_scores once per database, before its first read. One process
+    rebuilds under a named lock; the others wait for its marker. A rebuilder that
+    dies loses the lock when it expires and the next reader takes over.
+    """
+    global _latest_materialized
+    if _latest_materialized:
+        return
+    owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    while locks_collection.find_one({"_id": LATEST_VIEW_MARKER}, {"_id": 1}) is None:
+        if acquire_lock(locks_collection, LATEST_REBUILD_LOCK, owner, JOB_LEASE_SECONDS):
+            try:
+                if locks_collection.find_one({"_id": LATEST_VIEW_MARKER}, {"_id": 1}) is None:
+                    logger.info("ℹ️ latest_scores not materialized yet; rebuilding it from the scores history.")
+                    rebuild_latest_scores()
+            finally:
+                release_lock(locks_collection, LATEST_REBUILD_LOCK, owner)
+            break
+        time.sleep(0.2)
+    _latest_materialized = True
+
+@timed("mongo_read")
 def get_latest_scores() -> List[Dict]:
-    """Fetches the most recent score for each monitored ticker."""
-    pipeline = [
-        {"$sort": {"date": -1}},
-        {"$group": {
-            "_id": "$ticker",
-            # --- CHANGE: Use 'creditworthiness' instead of 'score' ---
-            "latest_creditworthiness": {"$first": "$creditworthiness"},
-            "date": {"$first": "$date"},
-            "features": {"$first": "$features"}
-        }},
-        {"$project": {
-            "_id": 0,
-            "ticker": "$_id",
-            # --- CHANGE: Rename the output field ---
-            "creditworthiness": "$latest_creditworthiness",
-            "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
-            "features": 1
-        }}
-    ]
-    cursor = scores_collection.aggregate(pipeline)
-    return list(cursor)
+    """Fetches the most recent score for each monitored ticker from latest_scores."""
+    _ensure_latest_materialized()
+    docs = list(latest_scores_collection.find({}, {"_id": 0}).sort("ticker", 1))
+    for doc in docs:
+        doc['date'] = doc['date'].strftime('%Y-%m-%d')
+    return docs
 
+@timed("mongo_read")
 def get_score_for_date_or_earlier(ticker: str, date_str: str) -> Optional[Dict]:
     """
     Fetches the score for a given ticker on a specific date.
     If no score exists for that date, it finds the most recent score on or before it.
+    The detail view: features and shap_explanations are joined from explanations.
     """
     try:
         target_date = datetime.strptime(date_str, '%Y-%m-%d')
@@ -78,6 +483,9 @@ def get_score_for_date_or_earlier(ticker: str, date_str: str) -> Optional[Dict]:
         doc = next(cursor, None)
         
         if doc:
+            if not any(k in doc for k in LEGACY_FIELDS):
+                explanation = explanations_collection.find_one({"ticker": ticker, "date": doc["date"]}, {"_id": 0})
+                doc = join_score_document(doc, explanation)
             doc['_id'] = str(doc['_id'])
             doc['date'] = doc['date'].strftime('%Y-%m-%d')
             return doc
@@ -85,3 +493,17 @@ def get_score_for_date_or_earlier(ticker: str, date_str: str) -> Optional[Dict]:
         return None
     except (ValueError, StopIteration):
         return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintenance commands for the scores database.")
+    parser.add_argument("command", choices=["ensure-indexes", "rebuild-latest"])
+    args = parser.parse_args()
+
+    from .log import configure_logging
+    configure_logging()
+    ensure_indexes()
+    if args.command == "rebuild-latest":
+        rebuild_latest_scores()
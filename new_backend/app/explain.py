@@ -0,0 +1,98 @@
+# app/explain.py
+"""
+Reusable SHAP explainers for the horizon models.
+
+One TreeExplainer is built per model on first use and kept for the life of
+the process. SHAP values are computed for many rows in one call, and each
+row's result is memoized by (model version, hash of the scaled feature
+vector) in a bounded LRU, so repeated explanations cost a dict lookup.
+"""
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .cache import LRUCache
+from .metrics import timed
+from .config import SHAP_CACHE_SIZE
+
+
+def model_version(model) -> str:
+    """Content hash of a fitted XGBoost model, so cache keys change if the model file does."""
+    return hashlib.blake2b(bytes(model.get_booster().save_raw()), digest_size=8).hexdigest()
+
+
+def row_digest(row: np.ndarray) -> bytes:
+    return hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float64).tobytes(), digest_size=16).digest()
+
+
+class ShapExplainerPool:
+    def __init__(self, models: Dict, feature_names: List[str], cache_size: int = SHAP_CACHE_SIZE):
+        self.models = models
+        self.feature_names = feature_names
+        self.cache = LRUCache(cache_size)
+        self._explainers: Dict[str, Tuple[object, float]] = {}
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _explainer(self, label: str):
+        """Return (TreeExplainer, base_value) for a horizon, building it once."""
+        entry = self._explainers.get(label)
+        if entry is None:
+            with self._lock:
+                entry = self._explainers.get(label)
+                if entry is None:
+                    import shap  # heavy import, only paid when explanations are requested
+                    explainer = shap.TreeExplainer(self.models[label])
+                    base_value = float(np.ravel(explainer.expected_value)[0])
+                    entry = self._explainers[label] = (explainer, base_value)
+                    self._versions[label] = model_version(self.models[label])
+        return entry
+
+    def warm(self):
+        """Build every explainer now (e.g. before forking workers) instead of on first use."""
+        for label in self.models:
+            self._explainer(label)
+
+    def shap_values(self, X_scaled: np.ndarray) -> Dict[str, Tuple[float, np.ndarray]]:
+        """
+        SHAP values for every row of X_scaled and every horizon.
+        Returns {label: (base_value, (N, F) array)}; only cache misses hit the explainer.
+        """
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        digests = [row_digest(row) for row in X_scaled]
+        out = {}
+        with timed("shap"):
+            for label in self.models:
+                explainer, base_value = self._explainer(label)
+                version = self._versions[label]
+                values = np.empty(X_scaled.shape, dtype=np.float64)
+                missing = []
+                for i, digest in enumerate(digests):
+                    cached = self.cache.get((version, digest))
+                    if cached is None:
+                        missing.append(i)
+                    else:
+                        values[i] = cached
+                if missing:
+                    computed = np.asarray(explainer.shap_values(X_scaled[missing]), dtype=np.float64)
+                    for i, row_values in zip(missing, computed):
+                        values[i] = row_values
+                        self.cache.set((version, digests[i]), row_values)
+                out[label] = (base_value, values)
+        return out
+
+    def explain(self, X_scaled: np.ndarray) -> List[Dict]:
+        """Per-row shap_metadata dicts in the shape stored with each score document."""
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        per_label = self.shap_values(X_scaled)
+        results = [{} for _ in range(len(X_scaled))]
+        for label, (base_value, values) in per_label.items():
+            for i, metadata in enumerate(results):
+                metadata[label] = {
+                    "base_value": base_value,
+                    "feature_values": dict(zip(self.feature_names, X_scaled[i].tolist())),
+                    "shap_values": dict(zip(self.feature_names, values[i].tolist())),
+                }
+        return results
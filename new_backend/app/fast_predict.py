@@ -0,0 +1,175 @@
+# app/fast_predict.py
+"""
+Prediction backends for the horizon models.
+
+  xgboost  : XGBClassifier.predict_proba (sklearn wrapper -> DMatrix)
+  inplace  : Booster.inplace_predict on the scaled matrix, no DMatrix
+  compiled : every tree of every horizon flattened into one set of NumPy
+             arrays and walked level by level for all rows and trees at
+             once; batches above COMPILED_MAX_ROWS use inplace_predict
+
+The compiled form reads the trees from the booster's JSON dump. Inputs are
+compared as float32 against float32 split conditions with the same
+"x < split -> left, missing -> default" rule XGBoost uses, so predictions
+agree up to float32 summation order. Like predict_proba, every backend
+stops at best_iteration for an early-stopped model.
+"""
+import json
+from typing import Callable, Dict
+
+import numpy as np
+
+PREDICTION_BACKENDS = ("xgboost", "inplace", "compiled")
+
+# Rows walked per step in the compiled backend; bounds the (rows x trees) work arrays
+_COMPILED_ROW_BLOCK = 4096
+# Above this many rows the per-step NumPy gathers cost more than inplace_predict's fixed overhead
+COMPILED_MAX_ROWS = 32
+
+
+def _base_margin(learner: Dict) -> float:
+    """Margin-space base score of a binary:logistic model."""
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    return float(np.log(base_score / (1.0 - base_score)))
+
+
+def _best_iteration(model):
+    """The early-stopping best_iteration predict_proba honours, or None when the model has none."""
+    return getattr(model, "best_iteration", None)
+
+
+def _iteration_range(model):
+    """inplace_predict's iteration_range matching predict_proba: up to best_iteration, else every tree."""
+    best = _best_iteration(model)
+    return (0, 0) if best is None else (0, best + 1)
+
+
+class CompiledEnsemble:
+    """All trees of several binary:logistic boosters as flat arrays."""
+
+    def __init__(self, models: Dict):
+        self.labels = list(models)
+        features, thresholds, lefts, rights, default_left, values = [], [], [], [], [], []
+        roots, tree_model, margins = [], [], []
+        max_depth, offset = 0, 0
+
+        for m, (label, model) in enumerate(models.items()):
+            booster = model.get_booster() if hasattr(model, "get_booster") else model
+            learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+            if learner["objective"]["name"] != "binary:logistic":
+                raise ValueError(f"{label}: only binary:logistic models can be compiled")
+            margins.append(_base_margin(learner))
+            best = _best_iteration(model)
+            trees = learner["gradient_booster"]["model"]["trees"]
+            if best is not None:
+                trees = trees[:best + 1]
+
+            for tree in trees:
+                left = np.asarray(tree["left_children"], dtype=np.int64)
+                right = np.asarray(tree["right_children"], dtype=np.int64)
+                n = len(left)
+                is_leaf = left == -1
+                idx = np.arange(n)
+                # Leaves point to themselves, so extra steps past a leaf are no-ops
+                lefts.append(np.where(is_leaf, idx, left) + offset)
+                rights.append(np.where(is_leaf, idx, right) + offset)
+                features.append(np.where(is_leaf, 0, tree["split_indices"]).astype(np.int64))
+                thresholds.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+                default_left.append(np.asarray(tree["default_left"], dtype=bool))
+                # For leaves, split_conditions holds the leaf value
+                values.append(np.where(is_leaf, np.asarray(tree["split_conditions"], dtype=np.float32), 0.0))
+                roots.append(offset)
+                tree_model.append(m)
+                max_depth = max(max_depth, self._depth(left, right))
+                offset += n
+
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts)
+        self.right = np.concatenate(rights)
+        # children[2 * node + went_right] -> next node, one gather per step
+        self.children = np.empty(2 * offset, dtype=np.int64)
+        self.children[0::2] = self.left
+        self.children[1::2] = self.right
+        self.default_left = np.concatenate(default_left)
+        self.value = np.concatenate(values).astype(np.float32)
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.max_depth = max_depth
+        self.base_margin = np.asarray(margins, dtype=np.float64)
+        tree_model = np.asarray(tree_model)
+        # Trees are stored model by model; reduceat sums each model's contiguous segment
+        self._segments = np.searchsorted(tree_model, np.arange(len(self.labels)))
+
+    @staticmethod
+    def _depth(left: np.ndarray, right: np.ndarray) -> int:
+        depth, frontier = 0, [0]
+        while True:
+            children = [c for node in frontier for c in (left[node], right[node]) if c != -1]
+            if not children:
+                return depth
+            depth += 1
+            frontier = children
+
+    def _walk(self, block: np.ndarray) -> np.ndarray:
+        """Leaf node per (row, tree) for a float32 block."""
+        has_missing = np.isnan(block).any()
+        if len(block) == 1:
+            # Single row: 1-D gathers only
+            row = block[0]
+            nodes = self.roots
+            for _ in range(self.max_depth):
+                x = row[self.feature[nodes]]
+                went_right = ~(x < self.threshold[nodes])
+                if has_missing:
+                    went_right = np.where(np.isnan(x), ~self.default_left[nodes], went_right)
+                nodes = self.children[2 * nodes + went_right]
+            return nodes[None, :]
+        flat = block.ravel()
+        row_base = (np.arange(len(block)) * block.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (len(block), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[nodes]]
+            went_right = ~(x < self.threshold[nodes])
+            if has_missing:
+                went_right = np.where(np.isnan(x), ~self.default_left[nodes], went_right)
+            nodes = self.children[2 * nodes + went_right]
+        return nodes
+
+    def margins(self, X_scaled: np.ndarray) -> np.ndarray:
+        """(N, n_models) raw margins for an already-scaled matrix."""
+        X = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        out = np.empty((len(X), len(self.labels)), dtype=np.float64)
+        for start in range(0, len(X), _COMPILED_ROW_BLOCK):
+            nodes = self._walk(X[start:start + _COMPILED_ROW_BLOCK])
+            leaf_sums = np.add.reduceat(self.value[nodes], self._segments, axis=1, dtype=np.float32)
+            out[start:start + len(nodes)] = leaf_sums + self.base_margin
+        return out
+
+    def predict_proba(self, X_scaled: np.ndarray) -> Dict[str, np.ndarray]:
+        """Positive-class probability per label, like predict_proba(X)[:, 1]."""
+        margins = self.margins(X_scaled)
+        probs = 1.0 / (1.0 + np.exp(-margins))
+        return {label: probs[:, i] for i, label in enumerate(self.labels)}
+
+
+def _inplace_predictor(models: Dict) -> Callable[[np.ndarray], Dict[str, np.ndarray]]:
+    # Same trees as predict_proba: an early-stopped model stops at best_iteration
+    boosters = {label: (model.get_booster(), _iteration_range(model)) for label, model in models.items()}
+    return lambda X: {
+        label: np.asarray(booster.inplace_predict(X, iteration_range=trees), dtype=np.float64)
+        for label, (booster, trees) in boosters.items()
+    }
+
+
+def make_predictor(models: Dict, backend: str = "xgboost") -> Callable[[np.ndarray], Dict[str, np.ndarray]]:
+    """A function mapping a scaled (N, F) matrix to {label: (N,) positive-class probabilities}."""
+    if backend == "xgboost":
+        return lambda X: {label: model.predict_proba(X)[:, 1].astype(np.float64) for label, model in models.items()}
+    if backend == "inplace":
+        return _inplace_predictor(models)
+    if backend == "compiled":
+        # The tree walk wins for a handful of rows; larger batches go to inplace_predict
+        compiled = CompiledEnsemble(models)
+        inplace = _inplace_predictor(models)
+        return lambda X: compiled.predict_proba(X) if len(X) <= COMPILED_MAX_ROWS else inplace(X)
+    raise ValueError(f"Unknown prediction backend {backend!r}; expected one of {PREDICTION_BACKENDS}")
@@ -0,0 +1,306 @@
+# app/feature_store.py
+"""
+Columnar, memory-mapped copy of 'final training.csv'.
+
+The CSV is converted once into a version directory under the store
+directory, holding:
+  - features.npy : float64 matrix (rows sorted by ticker, date), the CSV's
+                   values exactly as the models were trained on them
+  - keys.npy     : int64 sorted (ticker_code, day) index, one key per row
+  - meta.json    : column names, ticker dictionary and source CSV stamp
+and the CURRENT file names the live version. A build writes a new version
+directory and then replaces CURRENT, so readers (and concurrent builders in
+other processes) always see one complete version.
+
+Lookups are a binary search on keys.npy, so a point lookup or a
+"latest on or before" lookup is O(log n) and never touches the CSV.
+
+Usage:
+    python -m app.feature_store build      # (re)build unconditionally
+    python -m app.feature_store refresh    # rebuild only if the CSV changed
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import TRAINING_CSV_PATH, FEATURE_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+# 2: float64 features (version 1 stores held float32 and are rebuilt)
+STORE_VERSION = 2
+FEATURES_FILE = "features.npy"
+KEYS_FILE = "keys.npy"
+META_FILE = "meta.json"
+CURRENT_FILE = "CURRENT"
+# Versions kept besides the live one; a reader still mapping an older one keeps working.
+# Younger versions are never removed: another process may be about to make one live.
+KEEP_VERSIONS = 1
+PRUNE_AFTER_SECONDS = 600
+
+# Composite key = ticker_code << 32 | days since epoch
+_DAY_BITS = 32
+_DAY_MASK = (1 << _DAY_BITS) - 1
+
+
+def _to_day(date) -> int:
+    """Convert a date-like value (str, datetime, Timestamp) to days since epoch."""
+    if isinstance(date, str):
+        date = date[:10]
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+def _day_to_datetime(day: int) -> datetime:
+    return np.datetime64(int(day), "D").astype("datetime64[s]").astype(datetime)
+
+
+# -------------------- Build -------------------- #
+def _source_stamp(csv_path: str) -> Dict:
+    stat = os.stat(csv_path)
+    return {"path": os.path.abspath(csv_path), "mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def version_dir(store_dir: str = FEATURE_STORE_DIR) -> str:
+    """Directory of the live version (the store directory itself for stores built before versioning)."""
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE)) as fh:
+            return os.path.join(store_dir, fh.read().strip())
+    except FileNotFoundError:
+        return store_dir
+
+
+def _prune_versions(store_dir: str, live: str):
+    versions = sorted(
+        (e for e in os.scandir(store_dir) if e.is_dir() and e.name.startswith("v-") and e.name != live),
+        key=lambda e: e.stat().st_mtime, reverse=True,
+    )
+    cutoff = time.time() - PRUNE_AFTER_SECONDS
+    for entry in versions[KEEP_VERSIONS:]:
+        if entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def build_feature_store(csv_path: str = TRAINING_CSV_PATH, store_dir: str = FEATURE_STORE_DIR) -> Dict:
+    """
+    Parse the CSV once and write the binary store as a new version directory
+    (unique per process), then point CURRENT at it with one atomic rename, so
+    readers never see a half-written or mixed store.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, parse_dates=["date"])
+    df = df.dropna(subset=["ticker", "date"]).drop_duplicates(["ticker", "date"], keep="last")
+
+    tickers = sorted(df["ticker"].astype(str).unique().tolist())
+    columns = [c for c in df.columns if c not in ("ticker", "date") and pd.api.types.is_numeric_dtype(df[c])]
+
+    codes = df["ticker"].astype(str).map({t: i for i, t in enumerate(tickers)}).to_numpy(np.int64)
+    days = df["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    keys = (codes << _DAY_BITS) | (days & _DAY_MASK)
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    matrix = df[columns].to_numpy(np.float64)[order]
+
+    version = f"v-{datetime.now():%Y%m%d%H%M%S%f}-{os.getpid()}"
+    target = os.path.join(store_dir, version)
+    os.makedirs(target)
+    meta = {
+        "version": STORE_VERSION,
+        "rows": int(len(keys)),
+        "columns": columns,
+        "tickers": tickers,
+        "source": _source_stamp(csv_path),
+    }
+    for name, array in ((FEATURES_FILE, matrix), (KEYS_FILE, keys)):
+        with open(os.path.join(target, name), "wb") as fh:
+            np.save(fh, np.ascontiguousarray(array))
+    with open(os.path.join(target, META_FILE), "w") as fh:
+        json.dump(meta, fh, indent=2)
+    # The version directory is private to this process until CURRENT names it
+    tmp = os.path.join(store_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w") as fh:
+        fh.write(version)
+    os.replace(tmp, os.path.join(store_dir, CURRENT_FILE))
+    _prune_versions(store_dir, version)
+
+    logger.info(f"Feature store built: {meta['rows']} rows, {len(tickers)} tickers -> {target}")
+    return meta
+
+
+def is_stale(csv_path: str = TRAINING_CSV_PATH, store_dir: str = FEATURE_STORE_DIR) -> bool:
+    """True when the store is missing, from another version, or older than the CSV."""
+    meta_path = os.path.join(version_dir(store_dir), META_FILE)
+    if not os.path.exists(meta_path):
+        return True
+    if not os.path.exists(csv_path):
+        return False
+    with open(meta_path) as fh:
+        meta = json.load(fh)
+    source = meta.get("source", {})
+    current = _source_stamp(csv_path)
+    return (
+        meta.get("version") != STORE_VERSION
+        or source.get("mtime") != current["mtime"]
+        or source.get("size") != current["size"]
+    )
+
+
+# -------------------- Store -------------------- #
+class FeatureStore:
+    """
+    Read-only view over a built store. The live version is resolved and its
+    arrays memory-mapped on first use; a later rebuild does not affect it.
+    """
+
+    def __init__(self, store_dir: str = FEATURE_STORE_DIR):
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.columns: List[str] = []
+        self.tickers: List[str] = []
+        self._ticker_codes: Dict[str, int] = {}
+        self._keys: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            path = version_dir(self.store_dir)
+            with open(os.path.join(path, META_FILE)) as fh:
+                meta = json.load(fh)
+            self.columns = meta["columns"]
+            self.tickers = meta["tickers"]
+            self._ticker_codes = {t: i for i, t in enumerate(self.tickers)}
+            self._keys = np.load(os.path.join(path, KEYS_FILE), mmap_mode="r")
+            self._matrix = np.load(os.path.join(path, FEATURES_FILE), mmap_mode="r")
+            self._loaded = True
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._keys)
+
+    def _key(self, ticker: str, date) -> Optional[int]:
+        code = self._ticker_codes.get(ticker)
+        if code is None:
+            return None
+        return (code << _DAY_BITS) | (_to_day(date) & _DAY_MASK)
+
+    def _row(self, idx: int) -> Dict:
+        key = int(self._keys[idx])
+        row = {
+            "date": _day_to_datetime(key & _DAY_MASK),
+            "ticker": self.tickers[key >> _DAY_BITS],
+        }
+        row.update(zip(self.columns, self._matrix[idx].tolist()))
+        return row
+
+    def get(self, ticker: str, date) -> Optional[Dict]:
+        """Exact (ticker, date) lookup."""
+        self._load()
+        key = self._key(ticker, date)
+        if key is None:
+            return None
+        idx = int(np.searchsorted(self._keys, key))
+        if idx < len(self._keys) and self._keys[idx] == key:
+            return self._row(idx)
+        return None
+
+    def get_latest(self, ticker: str, date) -> Optional[Dict]:
+        """Most recent row for ticker on or before date."""
+        self._load()
+        key = self._key(ticker, date)
+        if key is None:
+            return None
+        idx = int(np.searchsorted(self._keys, key, side="right")) - 1
+        if idx >= 0 and int(self._keys[idx]) >> _DAY_BITS == self._ticker_codes[ticker]:
+            return self._row(idx)
+        return None
+
+    def ticker_slice(self, ticker: str) -> Tuple[np.ndarray, np.ndarray]:
+        """All rows of one ticker as (dates as datetime64[D], feature matrix view)."""
+        self._load()
+        code = self._ticker_codes.get(ticker)
+        if code is None:
+            return np.empty(0, dtype="datetime64[D]"), np.empty((0, len(self.columns)), dtype=np.float64)
+        lo = int(np.searchsorted(self._keys, code << _DAY_BITS))
+        hi = int(np.searchsorted(self._keys, (code + 1) << _DAY_BITS))
+        days = (np.asarray(self._keys[lo:hi]) & _DAY_MASK).astype("datetime64[D]")
+        return days, self._matrix[lo:hi]
+
+    def cross_section(self, date) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Latest row on or before date for every ticker that has one, as
+        (tickers, dates as datetime64[D], feature matrix). One searchsorted call.
+        """
+        self._load()
+        codes = np.arange(len(self.tickers), dtype=np.int64)
+        wanted = (codes << _DAY_BITS) | (_to_day(date) & _DAY_MASK)
+        idx = np.searchsorted(self._keys, wanted, side="right") - 1
+        valid = idx >= 0
+        valid[valid] = (np.asarray(self._keys[idx[valid]]) >> _DAY_BITS) == codes[valid]
+        idx = idx[valid]
+        days = (np.asarray(self._keys[idx]) & _DAY_MASK).astype("datetime64[D]")
+        return [self.tickers[c] for c in codes[valid]], days, np.asarray(self._matrix[idx])
+
+
+_build_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _open_feature_store() -> FeatureStore:
+    with _build_lock:
+        if is_stale(TRAINING_CSV_PATH, FEATURE_STORE_DIR):
+            if not os.path.exists(TRAINING_CSV_PATH):
+                raise FileNotFoundError(TRAINING_CSV_PATH)
+            build_feature_store(TRAINING_CSV_PATH, FEATURE_STORE_DIR)
+    return FeatureStore(FEATURE_STORE_DIR)
+
+
+def get_feature_store() -> Optional[FeatureStore]:
+    """
+    Return the process-wide store, building it from the CSV on first use if
+    it is missing or out of date. Returns None when neither exists; that is
+    not cached, so the store is picked up once the CSV or a build appears.
+    """
+    try:
+        return _open_feature_store()
+    except FileNotFoundError:
+        return None
+
+
+def refresh_feature_store(force: bool = False) -> bool:
+    """Rebuild the store if the CSV changed (or unconditionally with force). Returns True if rebuilt."""
+    with _build_lock:
+        rebuilt = False
+        if force or is_stale(TRAINING_CSV_PATH, FEATURE_STORE_DIR):
+            build_feature_store(TRAINING_CSV_PATH, FEATURE_STORE_DIR)
+            rebuilt = True
+    _open_feature_store.cache_clear()
+    return rebuilt
+
+
+# -------------------- CLI -------------------- #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the binary feature store.")
+    parser.add_argument("command", choices=["build", "refresh"])
+    args = parser.parse_args()
+
+    from .log import configure_logging
+    configure_logging()
+    if refresh_feature_store(force=args.command == "build"):
+        print("✅ Feature store rebuilt.")
+    else:
+        print("ℹ️ Feature store is up to date.")
@@ -1,103 +1,288 @@
 # final_inference.py
 import os
 import json
+import logging
 import pandas as pd
-import yfinance as yf
 import numpy as np
 import joblib
-import shap
-from gnews import GNews
-from transformers import pipeline
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 from functools import lru_cache
+from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+
+from .feature_store import get_feature_store
+from .explain import ShapExplainerPool
+from .pipeline import io_slot
+from .sentiment import get_sentiment_engine
+from .market_data import get_market_data, FUNDAMENTAL_FIELDS
+from .sentiment_store import get_sentiment_store
+from .config import NEWS_MAX_ARTICLES, NEWS_FETCH_CONCURRENCY, PREDICTION_BACKEND
+from .fast_predict import make_predictor
+from .rolling_features import TickerFeatureState, FeatureStateStore, replay, advance, features_at
+from .metrics import timed, cache_result, track_lru
+
+logger = logging.getLogger(__name__)
 
 # -------------------- Setup -------------------- #
 load_dotenv()
-print("Initializing inference backend (optimized for memory)...")
 
-# Load models/scaler once (small enough to keep resident)
-MODELS = {
-    "label_5d": joblib.load("./models/xgb_model_label_5d.pkl"),
-    "label_20d": joblib.load("./models/xgb_model_label_20d.pkl"),
-    "label_60d": joblib.load("./models/xgb_model_label_60d.pkl"),
+MODEL_PATHS = {
+    "label_5d": "./models/xgb_model_label_5d.pkl",
+    "label_20d": "./models/xgb_model_label_20d.pkl",
+    "label_60d": "./models/xgb_model_label_60d.pkl",
 }
-SCALER = joblib.load("./models/scaler.pkl")
+SCALER_PATH = "./models/scaler.pkl"
 
-# -------------------- Lazy Loads -------------------- #
+# Models/scaler are unpickled on first use (or by preload()), never as a side
+# effect of importing this module; once loaded they stay resident
 @lru_cache(maxsize=1)
-def get_sentiment_pipeline():
-    """Load HuggingFace transformer pipeline once, only on first use."""
-    print("Loading HF sentiment pipeline into memory...")
-    return pipeline(
-        "sentiment-analysis",
-        model="mrm8488/distilroberta-finetuned-financial-news-sentiment-analysis",
-    )
+def get_models() -> dict:
+    logger.info("Initializing inference backend (optimized for memory)...")
+    return {label: joblib.load(path) for label, path in MODEL_PATHS.items()}
+
+@lru_cache(maxsize=1)
+def get_scaler():
+    return joblib.load(SCALER_PATH)
+
+@lru_cache(maxsize=1)
+def get_predictor():
+    """Scaled matrix -> {label: positive-class probabilities}."""
+    return make_predictor(get_models(), PREDICTION_BACKEND)
 
 def load_training_row(ticker: str, dt_target: pd.Timestamp):
     """
-    Load only the row you need from CSV instead of keeping entire file in memory.
-    Assumes 'final training.csv' has a 'ticker' and 'date' column.
+    Look up the pre-computed row for (ticker, date) in the binary feature store
+    built from 'final training.csv' (see app/feature_store.py).
     """
-    try:
-        for chunk in pd.read_csv("final training.csv", parse_dates=["date"], chunksize=5000):
-            row = chunk[(chunk["ticker"] == ticker) & (chunk["date"] == dt_target)]
-            if not row.empty:
-                return row.iloc[0].to_dict()
-    except FileNotFoundError:
+    store = get_feature_store()
+    if store is None:
         return None
-    return None
+    return store.get(ticker, dt_target)
 
 # -------------------- Fundamentals -------------------- #
 def fetch_fundamentals(ticker: str) -> dict:
+    """Fundamentals from the local cache (refreshed from `.info` once the TTL expires)."""
     try:
-        info = yf.Ticker(ticker).info
-        return {
-            "de_ratio": info.get("debtToEquity", 0.0),
-            "current_ratio": info.get("currentRatio", 0.0),
-            "quick_ratio": info.get("quickRatio", 0.0),
-            "roa": info.get("returnOnAssets", 0.0),
-            "roe": info.get("returnOnEquity", 0.0),
-            "profit_margin": info.get("profitMargins", 0.0),
-        }
+        return get_market_data().fundamentals.get(ticker)
     except Exception:
-        return {k: 0.0 for k in ["de_ratio", "current_ratio", "quick_ratio", "roa", "roe", "profit_margin"]}
+        return {k: 0.0 for k in FUNDAMENTAL_FIELDS}
+
+# -------------------- Sentiment & News -------------------- #
+def get_company_name(stock_ticker: str) -> str:
+    store = get_sentiment_store()
+    name = store.company_name(stock_ticker)
+    if name:
+        return name
+    try:
+        name = get_market_data().fetcher.info(stock_ticker).get("longName", "")
+    except Exception:
+        return ""
+    if name:
+        store.set_company_name(stock_ticker, name)
+    return name
+
+def _get_news(company_name: str, date: str, window: int, max_articles: int) -> list:
+    from gnews import GNews  # only needed when news has to be fetched
+    google_news = GNews(language="en", country="US", max_results=max_articles)
+    target_date = datetime.strptime(date, "%Y-%m-%d")
+    start_date = target_date - timedelta(days=window)
+    end_date = target_date + timedelta(days=window)
+
+    if start_date.date() == end_date.date():
+        end_date += timedelta(days=1)
+
+    google_news.start_date = (start_date.year, start_date.month, start_date.day)
+    google_news.end_date = (end_date.year, end_date.month, end_date.day)
+
+    with io_slot("news"), timed("news"):
+        news_results = google_news.get_news(company_name)
+    return news_results[:max_articles] if news_results else []
+
+def fetch_company_news(company_name: str, date: str, window: int = 3, max_articles: int = NEWS_MAX_ARTICLES) -> list:
+    try:
+        return _get_news(company_name, date, window, max_articles)
+    except Exception:
+        return []
+
+def _fetch_news_days(company_name: str, days: list) -> dict:
+    """Each day's articles; days whose fetch failed are left out so they are retried next time."""
+    by_day = {}
+    with ThreadPoolExecutor(max_workers=NEWS_FETCH_CONCURRENCY) as pool:
+        futures = {pool.submit(_get_news, company_name, day, 0, NEWS_MAX_ARTICLES): day for day in days}
+        for future, day in futures.items():
+            try:
+                by_day[day] = future.result()
+            except Exception as e:
+                logger.warning(f"⚠️ News fetch failed for {company_name} on {day}: {e}")
+    return by_day
 
-# -------------------- Sentiment -------------------- #
 def analyze_sentiment_with_hf(news_data: list) -> float:
-    """Run sentiment analysis with lazy-loaded HF pipeline."""
+    """Mean sentiment of a list of articles, scored in one batch by the shared engine."""
     if not news_data:
         return 0.0
-    
-    pipeline_obj = get_sentiment_pipeline()
-    total_score, count = 0, 0
-    for article in news_data:
-        try:
-            text_to_analyze = f"{article.get('title', '')}. {article.get('description', '')}"
-            sentiment = pipeline_obj(text_to_analyze)[0]
-            label, score = sentiment["label"].upper(), sentiment["score"]
-            mapped = score if label == "POSITIVE" else -score if label == "NEGATIVE" else 0.0
-            total_score += mapped
-            count += 1
-        except Exception:
-            continue
-    return round(total_score / count, 4) if count > 0 else 0.0
+    return get_sentiment_engine().score_groups({"articles": news_data})["articles"]
+
+def register_trading_days(ticker: str, trading_days: pd.DatetimeIndex, target_day: str, lookback_days: int = 5):
+    """
+    Record ticker's trading days (from its price history) in the sentiment
+    store, which takes one decay step per trading day: the lookback window,
+    plus everything since the store's last trading day so no gap goes unstepped.
+    """
+    store = get_sentiment_store()
+    since = (pd.Timestamp(target_day) - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+    last = store.last_trading_day(ticker)
+    if last is not None and last < since:
+        since = last
+    days = trading_days[(trading_days >= since) & (trading_days <= pd.Timestamp(target_day))]
+    store.add_trading_days(ticker, days.strftime("%Y-%m-%d"))
+
+def fetch_pending_news(ticker: str, target_date: str, lookback_days: int = 5) -> dict:
+    """
+    {day: articles} for the days in the lookback window that were never
+    fetched (plus today, whose news is still coming in). Nothing is scored.
+    """
+    company_name = get_company_name(ticker)
+    if not company_name:
+        return {}
+    target = pd.to_datetime(target_date)
+    days = [(target - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(lookback_days, -1, -1)]
+    fetched = get_sentiment_store().fetched_days(ticker, days[0], days[-1])
+    today = datetime.now().strftime("%Y-%m-%d")
+    pending = [day for day in days if day not in fetched or day >= today]
+    return _fetch_news_days(company_name, pending) if pending else {}
+
+def compute_sentiment_features(ticker: str, target_date: str, lookback_days: int = 5) -> tuple:
+    """
+    (decayed_sentiment, raw sentiment) for target_date from the sentiment store.
+    Only pending days hit GNews; articles already counted are skipped, so
+    each day costs only its new articles.
+    """
+    store = get_sentiment_store()
+    news = fetch_pending_news(ticker, target_date, lookback_days)
+    if news:
+        store.add_articles(ticker, news)
+    return store.sentiment_at(ticker, target_date)
+
+def attach_sentiment(features: list, news: dict):
+    """
+    Fill decayed_sentiment for feature rows fetched with sentiment=False,
+    given {ticker: fetch_pending_news(...)}. The new articles of every ticker
+    are scored in one engine call.
+    """
+    store = get_sentiment_store()
+    store.add_articles_many({ticker: by_day for ticker, by_day in news.items() if by_day})
+    for row in features:
+        if "decayed_sentiment" not in row:
+            row["decayed_sentiment"] = float(store.sentiment_at(row["ticker"], row["date"])[0])
+
+def backfill_sentiment(ticker: str, start: str, end: str):
+    """
+    Fill decayed_sentiment for every trading day in [start, end]: the trading
+    days come from the price history, missing calendar days' news is fetched,
+    all new articles are scored in one batch and the decay is recomputed in
+    one vectorized pass. Returns (trading days, decayed, raw) arrays.
+    """
+    store = get_sentiment_store()
+    trading_days = get_market_data().prices.history(ticker, start, end).index
+    store.add_trading_days(ticker, trading_days.strftime("%Y-%m-%d"))
+    company_name = get_company_name(ticker)
+    if company_name:
+        fetched = store.fetched_days(ticker, start, end)
+        days = [d.strftime("%Y-%m-%d") for d in pd.date_range(start, end, freq="D")]
+        pending = [day for day in days if day not in fetched]
+        if pending:
+            store.add_articles(ticker, _fetch_news_days(company_name, pending))
+    return store.decayed_range(ticker, start, end)
+
+# -------------------- Technicals -------------------- #
+def _adj_close(df: pd.DataFrame) -> pd.Series:
+    """Adjusted closes, sorted and de-duplicated, with missing values dropped."""
+    df = df.sort_index()
+    df = df[~df.index.duplicated(keep='last')]
+    close = df["Adj Close"]
+    # Newer yfinance returns (field, ticker) columns even for a single ticker
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+    return close.dropna()
+
+def _agrees_with(state: TickerFeatureState, close: pd.Series) -> bool:
+    """True when the state's last close matches the adjusted close for that day."""
+    day = pd.Timestamp(state.last_date)
+    if not state.closes or day not in close.index:
+        return False
+    return bool(np.isclose(close.loc[day], state.closes[-1], rtol=1e-6))
+
+def compute_features_for_inference(df: pd.DataFrame, fundamentals: dict, target_date: str,
+                                   state: TickerFeatureState = None) -> dict:
+    """
+    Technical features as of the last trading day on or before target_date,
+    plus fundamentals. With a rolling `state`, only bars newer than
+    state.last_date are applied (the state is advanced in place); without
+    one, the whole history in df is replayed.
+    """
+    close = _adj_close(df)
+    close = close[close.index <= pd.to_datetime(target_date)]
+    if close.empty:
+        raise ValueError(f"No trading data available on or before {target_date}")
+
+    bars = zip(close.index, close.to_numpy(dtype=float))
+    if state is None:
+        state = replay("", bars)
+    else:
+        advance(state, bars)
+
+    features = features_at(state)
+    features.update({k: float(v or 0.0) for k, v in fundamentals.items()})
+    return features
 
 # -------------------- Features -------------------- #
-def get_ticker_features(ticker: str, target_date: str, lookback_years: int = 2) -> dict:
+@timed("features")
+def get_ticker_features(ticker: str, target_date: str, lookback_years: int = 2, sentiment: bool = True) -> dict:
+    """
+    Feature row for ticker on target_date: from the feature store when it has
+    the row, otherwise computed from prices, fundamentals and news. With
+    sentiment=False a computed row is returned without decayed_sentiment
+    (see attach_sentiment).
+    """
     dt_target = pd.to_datetime(target_date)
 
     row = load_training_row(ticker, dt_target)
+    cache_result("feature_store", hits=bool(row), misses=not row)
     if row:
         features = row
         features['date'] = features['date'].strftime('%Y-%m-%d')
         features = {k: float(v) if isinstance(v, (int, float, np.number)) else v for k, v in features.items()}
         return features
 
-    # Fallback: build features on the fly
-    df = yf.download(ticker, period=f"{lookback_years}y", interval="1d", auto_adjust=False, progress=False)
+    # Fallback: build features on the fly from the local price cache (only bars
+    # it does not hold yet are downloaded). When the persisted rolling state is
+    # behind target_date, only the bars since its last date are applied.
     fundamentals = fetch_fundamentals(ticker)
-    features = compute_features_for_inference(df, fundamentals, target_date)
+    df = get_market_data().history(ticker, lookback_years=lookback_years, end=dt_target)
+    state_store = FeatureStateStore()
+    state = state_store.load(ticker)
+    target_day = dt_target.strftime('%Y-%m-%d')
+
+    close = _adj_close(df)
+    # Bars must overlap the state, otherwise a gap would go unnoticed, and agree with
+    # its last close, otherwise the history was re-adjusted (split/dividend) since
+    if state.last_date is not None and state.last_date <= target_day \
+            and not close.empty and close.index[0].strftime('%Y-%m-%d') <= state.last_date \
+            and _agrees_with(state, close):
+        features = compute_features_for_inference(df, fundamentals, target_date, state=state)
+    elif state.last_date is None or state.last_date <= target_day:
+        state = TickerFeatureState(ticker)
+        features = compute_features_for_inference(df, fundamentals, target_date, state=state)
+    else:
+        # Historical date behind the persisted state: compute without touching it
+        state = None
+        features = compute_features_for_inference(df, fundamentals, target_date)
+
+    if state is not None:
+        state_store.save(state)
+    register_trading_days(ticker, close.index, features["date"])
+    if not sentiment:
+        return features
     decayed_sentiment, _ = compute_sentiment_features(ticker, features["date"], lookback_days=5)
     features["decayed_sentiment"] = float(decayed_sentiment)
     return features
@@ -109,41 +294,133 @@ feature_cols = [
     "decayed_sentiment"
 ]
 
+HORIZON_WEIGHTS = {"label_5d": 0.3, "label_20d": 0.4, "label_60d": 0.3}
+
 # -------------------- Creditworthiness -------------------- #
-def calculate_creditworthiness_with_explain(features: dict, method: str = "weighted", include_shap: bool = False):
+def creditworthiness_from_prob(prob):
     """
-    Compute creditworthiness.
-    include_shap=False (default) to avoid memory-heavy SHAP at runtime.
+    Transform risk probability into a creditworthiness score (300–850 scale).
+    Accepts a scalar or a NumPy array of probabilities.
+    """
+    prob = np.clip(prob, 1e-6, 1 - 1e-6)
+    score = 800 / (1 + np.exp(5 * (prob - 0.5)))  # logistic curve
+    score = 300 + (score / 800) * 550
+    return np.round(score, 2)
+
+def to_feature_matrix(features) -> np.ndarray:
     """
-    df = pd.DataFrame([features])
-    X_scaled = SCALER.transform(df[feature_cols])
+    Coerce feature input into an (N, len(feature_cols)) float64 matrix.
+    Accepts a DataFrame, a list of feature dicts, a single dict, or an array
+    whose columns are already in feature_cols order.
+    """
+    if isinstance(features, pd.DataFrame):
+        X = features[feature_cols].to_numpy(dtype=np.float64)
+    elif isinstance(features, dict):
+        X = np.array([[features[c] for c in feature_cols]], dtype=np.float64)
+    elif isinstance(features, (list, tuple)) and features and isinstance(features[0], dict):
+        X = np.array([[row[c] for c in feature_cols] for row in features], dtype=np.float64)
+    else:
+        X = np.asarray(features, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+    if X.ndim != 2 or X.shape[1] != len(feature_cols):
+        raise ValueError(f"Expected features with {len(feature_cols)} columns {feature_cols}, got shape {X.shape}")
+    return X
 
-    probs, shap_metadata = {}, {}
-    for label, model in MODELS.items():
-        prob = model.predict_proba(X_scaled)[:, 1][0]
-        probs[label] = float(prob)
+def scale_features(X: np.ndarray) -> np.ndarray:
+    """Apply the fitted StandardScaler to a feature matrix (same arithmetic as scaler.transform)."""
+    scaler = get_scaler()
+    return (X - scaler.mean_) / scaler.scale_
 
-        if include_shap:
-            # SHAP is expensive, load only when explicitly needed
-            explainer = shap.TreeExplainer(model)
-            shap_values = explainer.shap_values(X_scaled)
-            shap_metadata[label] = {
-                "base_value": float(explainer.expected_value),
-                "feature_values": {f: float(v) for f, v in zip(feature_cols, X_scaled[0])},
-                "shap_values": {f: float(v) for f, v in zip(feature_cols, shap_values[0])}
-            }
+def score_scaled_batch(X_scaled: np.ndarray, method: str = "weighted"):
+    """
+    Predict every horizon once on an already-scaled matrix, using the
+    configured PREDICTION_BACKEND (see app/fast_predict.py).
+    Returns (creditworthiness array, {label: probability array}).
+    """
+    with timed("predict"):
+        probs = get_predictor()(X_scaled)
 
     if method == "weighted":
-        weights = {"label_5d": 0.3, "label_20d": 0.4, "label_60d": 0.3}
-        avg_prob = sum(probs[label] * weights[label] for label in probs)
+        avg_prob = sum(probs[label] * HORIZON_WEIGHTS[label] for label in probs)
     else:
-        avg_prob = np.mean(list(probs.values()))
+        avg_prob = np.mean(np.vstack(list(probs.values())), axis=0)
+
+    return creditworthiness_from_prob(avg_prob), probs
 
-    creditworthiness = creditworthiness_from_prob(avg_prob)
+def score_batch(features, method: str = "weighted"):
+    """
+    Vectorized scoring for N rows across all three horizons.
+
+    features: DataFrame / list of dicts / (N, 9) array in feature_cols order.
+    Returns (creditworthiness, probs) where creditworthiness has shape (N,)
+    and probs maps each horizon label to an aligned (N,) array.
+    """
+    X = to_feature_matrix(features)
+    return score_scaled_batch(scale_features(X), method)
+
+# -------------------- Explanations -------------------- #
+# TreeExplainers are built once per model and reused; results are memoized per row
+@lru_cache(maxsize=1)
+def get_shap_pool() -> ShapExplainerPool:
+    pool = ShapExplainerPool(get_models(), feature_cols)
+    track_lru("shap", pool.cache)
+    return pool
+
+def preload():
+    """
+    Load everything the scoring path would otherwise load on first use: the
+    models and scaler, the feature store, the SHAP explainers (and shap) and
+    the sentiment model (and transformers/torch). Called before forking
+    workers so they share the memory copy-on-write.
+    """
+    get_predictor()
+    get_scaler()
+    for name, warm in (("feature store", get_feature_store), ("SHAP explainers", lambda: get_shap_pool().warm()),
+                       ("sentiment model", lambda: get_sentiment_engine().warm())):
+        try:
+            warm()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not preload {name}; it will load on first use: {e}")
+
+def explain_batch(features) -> list:
+    """Per-row SHAP metadata for N rows, one explainer call per horizon (cache misses only)."""
+    return get_shap_pool().explain(scale_features(to_feature_matrix(features)))
+
+def generate_shap_summary(shap_metadata: dict, creditworthiness: float, ticker: str, top_n: int = 3) -> str:
+    """
+    Plain-language summary of the strongest drivers, weighting each horizon's
+    SHAP values the same way the probabilities are weighted.
+    """
+    if not shap_metadata:
+        return "No SHAP explanation available."
+
+    contributions = {f: 0.0 for f in feature_cols}
+    for label, meta in shap_metadata.items():
+        weight = HORIZON_WEIGHTS.get(label, 1.0 / len(shap_metadata))
+        for f, v in meta["shap_values"].items():
+            contributions[f] += weight * v
+
+    # Positive SHAP pushes default risk up, i.e. creditworthiness down
+    drivers = sorted(contributions.items(), key=lambda kv: abs(kv[1]), reverse=True)[:top_n]
+    parts = [f"{f} ({'raises' if v > 0 else 'lowers'} risk)" for f, v in drivers]
+    return f"{ticker} has a creditworthiness of {creditworthiness:.2f}. Main drivers: {', '.join(parts)}."
+
+def calculate_creditworthiness_with_explain(features: dict, method: str = "weighted", include_shap: bool = False):
+    """
+    Compute creditworthiness for a single feature dict (thin wrapper over score_batch).
+    include_shap=False (default) to avoid memory-heavy SHAP at runtime.
+    """
+    X_scaled = scale_features(to_feature_matrix(features))
+    scores, batch_probs = score_scaled_batch(X_scaled, method)
+    creditworthiness = float(scores[0])
+    probs = {label: float(p[0]) for label, p in batch_probs.items()}
 
     if include_shap:
+        shap_metadata = get_shap_pool().explain(X_scaled)[0]
         summary = generate_shap_summary(shap_metadata, creditworthiness, features.get("ticker", "this company"))
     else:
+        shap_metadata = {}
         summary = "SHAP not included (set include_shap=True to compute)."
 
     return creditworthiness, probs, shap_metadata, summary
@@ -0,0 +1,330 @@
+# app/jobs.py
+"""
+Persistent job queue and leader lock shared by the API and the scoring
+worker (app/worker.py).
+
+Backends:
+  mongo  : 'jobs' and 'locks' collections next to the scores (default)
+  sqlite : one local file, for running API and worker on a single machine
+
+A job moves queued -> running -> done | failed. A running job holds a lease
+that its worker renews; when a worker dies, the lease runs out and another
+worker claims the job again (up to max_attempts). A failed attempt can be
+requeued with a delay before it is claimable again. While a job is queued or
+running its dedupe_key is reserved, so enqueueing the same work twice (e.g.
+two requests for the same ticker and date) returns the existing job; once it
+has finished, recent_failure finds a failed one for the same work.
+
+The leader lock is a named row with an owner and an expiry: whoever holds
+it unexpired is the leader, and it renews the lock while it lives.
+"""
+import os
+import json
+import uuid
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from .locks import acquire_lock, release_lock
+from .config import JOB_QUEUE_BACKEND, JOB_QUEUE_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETENTION_SECONDS
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _iso(value) -> Optional[str]:
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromtimestamp(value, timezone.utc)
+    if value.tzinfo is not None:
+        # Read back from Mongo, times are naive UTC; freshly written ones are aware
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="seconds") + "Z"
+
+
+# -------------------- MongoDB -------------------- #
+class MongoJobQueue:
+    def __init__(self, db=None, lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        if db is None:
+            from .database import db
+        self.jobs = db.jobs
+        self.locks = db.locks
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+
+    def ensure_indexes(self):
+        # Only queued/running jobs carry active_key, so a finished job frees its key
+        self.jobs.create_index([("active_key", ASCENDING)], unique=True, sparse=True, name="active_key_unique")
+        self.jobs.create_index([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created")
+        self.jobs.create_index([("finished_at", ASCENDING)], expireAfterSeconds=int(JOB_RETENTION_SECONDS),
+                               name="finished_ttl")
+
+    @staticmethod
+    def _public(doc: Optional[Dict]) -> Optional[Dict]:
+        if doc is None:
+            return None
+        return {
+            "id": str(doc["_id"]), "kind": doc["kind"], "payload": doc["payload"], "status": doc["status"],
+            "attempts": doc.get("attempts", 0), "worker": doc.get("worker"),
+            "created_at": _iso(doc.get("created_at")), "finished_at": _iso(doc.get("finished_at")),
+            "result": doc.get("result"), "error": doc.get("error"),
+        }
+
+    def enqueue(self, kind: str, payload: Dict, dedupe_key: Optional[str] = None) -> Dict:
+        """Queue a job; returns it, or the queued/running job that already holds dedupe_key."""
+        now = _utcnow()
+        doc = {"kind": kind, "payload": payload, "status": "queued", "attempts": 0,
+               "created_at": now, "updated_at": now, "available_at": now}
+        if dedupe_key:
+            doc["active_key"] = dedupe_key
+        try:
+            self.jobs.insert_one(doc)
+        except DuplicateKeyError:
+            existing = self.jobs.find_one({"active_key": dedupe_key})
+            if existing is not None:
+                return self._public(existing)
+            # The holder finished in between; its key is free again
+            doc.pop("_id", None)
+            self.jobs.insert_one(doc)
+        return self._public(doc)
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """Take the oldest queued job, or a running one whose lease has expired."""
+        now = _utcnow()
+        doc = self.jobs.find_one_and_update(
+            {"$or": [{"status": "queued", "available_at": {"$lte": now}},
+                     {"status": "running", "lease_until": {"$lt": now}}]},
+            {"$set": {"status": "running", "worker": worker_id, "lease_until": now + self.lease, "updated_at": now},
+             "$inc": {"attempts": 1}},
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._public(doc)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend a running job's lease; False if the worker no longer owns it."""
+        now = _utcnow()
+        result = self.jobs.update_one(
+            {"_id": ObjectId(job_id), "worker": worker_id, "status": "running"},
+            {"$set": {"lease_until": now + self.lease, "updated_at": now}},
+        )
+        return result.matched_count == 1
+
+    def _finish(self, job_id: str, worker_id: str, fields: Dict, release: bool) -> bool:
+        now = _utcnow()
+        update = {"$set": dict(fields, updated_at=now)}
+        if release:
+            update["$set"]["finished_at"] = now
+            update["$unset"] = {"active_key": "", "lease_until": ""}
+        result = self.jobs.update_one(
+            {"_id": ObjectId(job_id), "worker": worker_id, "status": "running"}, update
+        )
+        return result.matched_count == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        return self._finish(job_id, worker_id, {"status": "done", "result": result, "error": None}, release=True)
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = False, delay: float = 0.0) -> bool:
+        """Record a failure; with retry the job goes back to the queue, claimable after delay seconds."""
+        if retry:
+            available_at = _utcnow() + timedelta(seconds=delay)
+            return self._finish(job_id, worker_id, {"status": "queued", "error": error, "available_at": available_at},
+                                release=False)
+        return self._finish(job_id, worker_id, {"status": "failed", "error": error}, release=True)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        try:
+            return self._public(self.jobs.find_one({"_id": ObjectId(job_id)}))
+        except (InvalidId, TypeError):
+            return None
+
+    def recent_failure(self, kind: str, payload: Dict, within_seconds: float) -> Optional[Dict]:
+        """The newest job for the same kind and payload that failed in the last within_seconds."""
+        doc = self.jobs.find_one(
+            {"kind": kind, "payload": payload, "status": "failed",
+             "finished_at": {"$gte": _utcnow() - timedelta(seconds=within_seconds)}},
+            sort=[("finished_at", -1)],
+        )
+        return self._public(doc)
+
+    def acquire_lock(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Take or renew the named lock; False while another owner holds it unexpired."""
+        return acquire_lock(self.locks, name, owner, ttl_seconds)
+
+    def release_lock(self, name: str, owner: str):
+        release_lock(self.locks, name, owner)
+
+
+# -------------------- SQLite -------------------- #
+class SqliteJobQueue:
+    def __init__(self, path: str = JOB_QUEUE_PATH, lease_seconds: float = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode; multi-statement updates take an explicit write lock (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL,
+                active_key TEXT UNIQUE, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT,
+                lease_until REAL, created_at REAL NOT NULL, updated_at REAL NOT NULL, available_at REAL NOT NULL,
+                finished_at REAL,
+                result TEXT, error TEXT);
+            CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+        """)
+
+    def ensure_indexes(self):
+        """Tables and indexes are created on open; drop finished jobs past retention."""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - JOB_RETENTION_SECONDS,))
+
+    @staticmethod
+    def _public(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        return {
+            "id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"]), "status": row["status"],
+            "attempts": row["attempts"], "worker": row["worker"],
+            "created_at": _iso(row["created_at"]), "finished_at": _iso(row["finished_at"]),
+            "result": json.loads(row["result"]) if row["result"] is not None else None, "error": row["error"],
+        }
+
+    def _row(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def enqueue(self, kind: str, payload: Dict, dedupe_key: Optional[str] = None) -> Dict:
+        """Queue a job; returns it, or the queued/running job that already holds dedupe_key."""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = None
+                if dedupe_key:
+                    existing = self._conn.execute("SELECT * FROM jobs WHERE active_key = ?", (dedupe_key,)).fetchone()
+                if existing is None:
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, kind, payload, status, active_key, created_at, updated_at, available_at) "
+                        "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                        (job_id, kind, json.dumps(payload), dedupe_key, now, now, now),
+                    )
+                    existing = self._row(job_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._public(existing)
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """Take the oldest queued job, or a running one whose lease has expired."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'running' AND lease_until < ?) ORDER BY created_at LIMIT 1", (now, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, updated_at = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (worker_id, now + self.lease, now, row["id"]),
+                    )
+                    row = self._row(row["id"])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._public(row)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend a running job's lease; False if the worker no longer owns it."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease, now, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, active_key = NULL, lease_until = NULL, "
+                "updated_at = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), now, now, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = False, delay: float = 0.0) -> bool:
+        """Record a failure; with retry the job goes back to the queue, claimable after delay seconds."""
+        now = time.time()
+        if retry:
+            sql = ("UPDATE jobs SET status = 'queued', error = ?, updated_at = ?, available_at = ? "
+                   "WHERE id = ? AND worker = ? AND status = 'running'")
+            params = (error, now, now + delay, job_id, worker_id)
+        else:
+            sql = ("UPDATE jobs SET status = 'failed', error = ?, active_key = NULL, lease_until = NULL, "
+                   "updated_at = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = 'running'")
+            params = (error, now, now, job_id, worker_id)
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._public(self._row(job_id))
+
+    def recent_failure(self, kind: str, payload: Dict, within_seconds: float) -> Optional[Dict]:
+        """The newest job for the same kind and payload that failed in the last within_seconds."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = 'failed' AND kind = ? AND payload = ? AND finished_at >= ? "
+                "ORDER BY finished_at DESC LIMIT 1",
+                (kind, json.dumps(payload), time.time() - within_seconds),
+            ).fetchone()
+        return self._public(row)
+
+    def acquire_lock(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Take or renew the named lock; False while another owner holds it unexpired."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO locks (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE locks.owner = excluded.owner OR locks.expires_at < ?",
+                (name, owner, now + ttl_seconds, now),
+            )
+        return cursor.rowcount == 1
+
+    def release_lock(self, name: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+
+@lru_cache(maxsize=1)
+def get_job_queue():
+    """The process-wide job queue for the configured backend."""
+    if JOB_QUEUE_BACKEND == "sqlite":
+        return SqliteJobQueue()
+    if JOB_QUEUE_BACKEND == "mongo":
+        return MongoJobQueue()
+    raise ValueError(f"Unknown JOB_QUEUE_BACKEND {JOB_QUEUE_BACKEND!r}; expected 'mongo' or 'sqlite'")
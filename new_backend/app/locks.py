@@ -0,0 +1,29 @@
+# app/locks.py
+"""
+Named leases in a Mongo collection: a document per lock with an owner and an
+expiry. Whoever holds a lock unexpired owns it and renews it by acquiring it
+again; a holder that dies loses it when it expires. Used by the job queue's
+leader lock (app/jobs.py) and by the latest_scores rebuild (app/database.py).
+"""
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+
+def acquire_lock(collection, name: str, owner: str, ttl_seconds: float) -> bool:
+    """Take or renew the named lock; False while another owner holds it unexpired."""
+    now = datetime.now(timezone.utc)
+    try:
+        collection.update_one(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        # The lock document exists and belongs to someone else
+        return False
+
+
+def release_lock(collection, name: str, owner: str):
+    collection.delete_one({"_id": name, "owner": owner})
@@ -0,0 +1,67 @@
+# app/log.py
+"""
+Logging for the 'app' logger hierarchy (every module logs through
+logging.getLogger(__name__); scripts outside the package use 'app.<name>').
+
+LOG_LEVEL picks the level (per-row messages are DEBUG, so they cost nothing
+by default) and LOG_FORMAT picks the output:
+  text : "2024-01-05 20:00:01 INFO app.tasks: message key=value ..."
+  json : one JSON object per line with the same fields
+
+Fields passed as logger.info(..., extra={"ticker": "AAPL", "seconds": 1.2})
+are appended as key=value pairs (or JSON keys).
+"""
+import sys
+import json
+import logging
+
+from .config import LOG_LEVEL, LOG_FORMAT
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED}
+
+
+class KeyValueFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> logging.Logger:
+    """Attach one stderr handler to the 'app' logger (idempotent)."""
+    logger = logging.getLogger("app")
+    logger.setLevel(level.upper())
+    if not any(getattr(h, "_app_handler", False) for h in logger.handlers):
+        handler = logging.StreamHandler(sys.stderr)
+        handler._app_handler = True
+        logger.addHandler(handler)
+        # Don't print twice when uvicorn/gunicorn also configure the root logger
+        logger.propagate = False
+    for handler in logger.handlers:
+        if getattr(handler, "_app_handler", False):
+            handler.setFormatter(JsonFormatter() if fmt == "json" else KeyValueFormatter())
+    return logger
@@ -1,14 +1,33 @@
 # app/main.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
-from typing import List, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+import time
+import asyncio
+import logging
 import pytz
 
 from . import database
-from .tasks import run_daily_scoring_job
-# --- UPDATED IMPORTS ---
-from .inference import get_ticker_features, calculate_creditworthiness_with_explain
+from .response_cache import (cached_json, invalidate_tickers, latest_key, ticker_key, normalize_date, lookup, store,
+                             generation, sync_score_writes, watch_score_writes, stop_watching_score_writes)
+from .pipeline import SingleFlight, CapacityExceeded
+from .config import COLD_COMPUTE_WORKERS, COLD_COMPUTE_MAX_IN_FLIGHT, PRELOAD_MODELS, SCORING_WORKER
+from .log import configure_logging
+from . import metrics
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# The scoring stack (app.inference / app.tasks: pandas, xgboost models, shap,
+# transformers, yfinance, gnews) is imported on first use, so workers that only
+# serve cached reads never load it -- unless PRELOAD_MODELS asks for it up front.
+if PRELOAD_MODELS:
+    from . import inference
+    inference.preload()
 
 # Initialize the FastAPI app
 app = FastAPI(
@@ -30,21 +49,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Retry-After", "Location"],
 )
 
+# --- METRICS ---
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route templates (/scores/{ticker}) keep the label set small
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started, method=request.method,
+            route=route.path if route is not None else "unmatched", status=status,
+        )
+
+# --- RESPONSE CACHE ---
+# Any score write (on-the-fly endpoint or daily job) drops that ticker's cached responses
+database.on_scores_written(invalidate_tickers)
+
+# --- ON-THE-FLY COMPUTATIONS ---
+# One computation per (ticker, date); concurrent requests for the same key share it
+COLD_COMPUTATIONS = SingleFlight(COLD_COMPUTE_WORKERS, COLD_COMPUTE_MAX_IN_FLIGHT, name="cold-score")
+
 # --- SCHEDULER SETUP ---
+# With SCORING_WORKER the cron and cold computations run in `python -m app.worker`
+# (one leader runs the cron); otherwise every API process schedules its own job.
 scheduler = BackgroundScheduler(timezone=pytz.timezone("Asia/Kolkata"))
 
+def run_daily_job():
+    from .tasks import run_daily_scoring_job
+    return run_daily_scoring_job()
+
 @app.on_event("startup")
 def start_scheduler():
-    scheduler.add_job(run_daily_scoring_job, 'cron', day_of_week='mon-fri', hour=20, minute=0)
+    database.ensure_indexes()
+    # Scores written by the worker or other API processes drop this process's cached responses
+    watch_score_writes()
+    if SCORING_WORKER:
+        from .jobs import get_job_queue
+        get_job_queue().ensure_indexes()
+        logger.info("Scoring worker mode: daily job and cold scores are queued for app.worker.")
+        return
+    scheduler.add_job(run_daily_job, 'cron', day_of_week='mon-fri', hour=20, minute=0)
     scheduler.start()
-    print("Scheduler started. Daily job scheduled for 8:00 PM IST (Mon-Fri).")
+    logger.info("Scheduler started. Daily job scheduled for 8:00 PM IST (Mon-Fri).")
 
 @app.on_event("shutdown")
 def shutdown_scheduler():
-    scheduler.shutdown()
-    print("Scheduler shut down.")
+    if scheduler.running:
+        scheduler.shutdown()
+    COLD_COMPUTATIONS.shutdown()
+    stop_watching_score_writes()
+    logger.info("Scheduler shut down.")
 
 
 # --- API ENDPOINTS ---
@@ -53,68 +115,212 @@ def read_root():
     """Root endpoint to check if the API is running."""
     return {"status": "Credit Intelligence API is running"}
 
+@app.get("/metrics", tags=["Status"], include_in_schema=False)
+def get_metrics():
+    """Stage timings, cache hit/miss counters and request latencies in the Prometheus text format."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Note: The response_model for these endpoints will now be a list of the new, complex objects
+# Read endpoints return pre-serialized JSON from the response cache (with ETag support)
 @app.get("/scores/latest", tags=["Scores"], response_model=List[Dict[str, Any]])
-def get_latest_scores():
+def get_latest_scores(request: Request):
     """Get the most recent creditworthiness score for all monitored tickers."""
-    scores = database.get_latest_scores()
-    if not scores:
-        raise HTTPException(status_code=404, detail="No scores found in the database.")
-    return scores
+    def produce():
+        scores = database.get_latest_scores()
+        if not scores:
+            raise HTTPException(status_code=404, detail="No scores found in the database.")
+        return scores
+    return cached_json(request, latest_key(), produce)
 
 @app.get("/scores/{ticker}", tags=["Scores"], response_model=List[Dict[str, Any]])
-def get_scores_for_ticker(ticker: str):
-    """Get the historical creditworthiness scores for a specific ticker."""
-    scores = database.get_scores_by_ticker(ticker.upper())
-    if not scores:
+def get_scores_for_ticker(
+    ticker: str,
+    request: Request,
+    start: Optional[str] = Query(None, description="Earliest date to include (YYYY-MM-DD)."),
+    end: Optional[str] = Query(None, description="Latest date to include (YYYY-MM-DD)."),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Maximum number of points to return."),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page."),
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. 'date,creditworthiness'."),
+    interval: Optional[str] = Query(None, description="'daily' (default), 'weekly' or 'monthly' averages."),
+):
+    """
+    Get the historical creditworthiness scores for a specific ticker, newest first.
+    When a page is full, the X-Next-Cursor header holds the cursor for the next one.
+    """
+    field_list = sorted({f.strip() for f in fields.split(",") if f.strip()}) if fields else None
+    params = (
+        normalize_date(start) if start else None, normalize_date(end) if end else None,
+        limit, normalize_date(cursor) if cursor else None,
+        tuple(field_list) if field_list else None, interval,
+    )
+    key = ticker_key(ticker, "history", *params)
+    cached = lookup(request, key)
+    if cached is not None:
+        return cached
+
+    # Taken before the read: a score written meanwhile keeps this body out of the cache
+    since = generation(key)
+    try:
+        scores = database.get_scores_by_ticker(
+            ticker.upper(), start=params[0], end=params[1], limit=limit, cursor=params[3],
+            fields=field_list, interval=interval,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not scores and cursor is None:
         raise HTTPException(status_code=404, detail=f"No scores found for ticker '{ticker}'.")
-    return scores
+
+    headers = {"X-Next-Cursor": scores[-1]["date"]} if limit and len(scores) == limit else None
+    return store(request, key, scores, headers, since=since)
 
 # --- HEAVILY UPDATED ENDPOINT WITH NEW INFERENCE LOGIC ---
 @app.get("/scores/{ticker}/{date}", tags=["Scores"], response_model=Dict[str, Any])
-def get_score_for_ticker_on_date(ticker: str, date: str):
+async def get_score_for_ticker_on_date(ticker: str, date: str, request: Request):
     """
     Get the creditworthiness score and explanation for a specific ticker and date.
-    If data is not in the DB, it's calculated on-the-fly.
+    If data is not in the DB, it's calculated on-the-fly. In scoring worker mode the
+    calculation is queued instead: the response is 202 with the job to poll at
+    /jobs/{job_id}, and once it is done this endpoint returns the stored score.
     """
     ticker_upper = ticker.upper()
-    score_data = database.get_score_for_date_or_earlier(ticker_upper, date)
-    
+    date = normalize_date(date)
+    key = ticker_key(ticker_upper, "date", date)
+
+    cached = lookup(request, key)
+    if cached is not None:
+        return cached
+
+    since = generation(key)
+    score_data = await run_in_threadpool(database.get_score_for_date_or_earlier, ticker_upper, date)
     if score_data:
-        print(f"Found cached data for {ticker_upper} in DB.")
-        return score_data
+        logger.debug(f"Found cached data for {ticker_upper} in DB.")
+        return store(request, key, score_data, since=since)
+
+    if SCORING_WORKER:
+        return await _queue_score(ticker_upper, date)
+
+    new_score_data = await _compute_cold(ticker_upper, date)
+    # Not cached when the computation's own write (or any other) bumped the generation;
+    # the next request reads the stored score back and caches that
+    return store(request, key, new_score_data, since=since)
+
+class Perturbation(BaseModel):
+    mode: str = Field("relative", description="'relative' (x * (1 + v)), 'absolute' (x + v) or 'set' (v).")
+    values: List[float] = Field(..., description="Values to sweep, e.g. [-0.2, 0, 0.2] for -20%/0/+20%.")
+
+class SensitivityRequest(BaseModel):
+    perturbations: Dict[str, Perturbation] = Field(
+        default_factory=dict, description="Feature -> values; the grid is their cartesian product.")
+    partial_dependence: List[str] = Field(
+        default_factory=list, description="Features to return partial-dependence curves for.")
+    pd_points: int = Field(20, ge=2, le=200, description="Points per partial-dependence curve.")
+    method: str = Field("weighted", description="'weighted' (horizon weights) or 'mean'.")
+
+@app.post("/scores/{ticker}/{date}/sensitivity", tags=["Scores"], response_model=Dict[str, Any])
+async def get_sensitivity(ticker: str, date: str, body: SensitivityRequest):
+    """
+    What-if analysis: the creditworthiness over a grid of feature perturbations
+    around the features of the ticker's score on that date, plus optional
+    partial-dependence curves over the cross section of tickers. The whole grid
+    is scored in one batch. A score that is not stored yet is calculated like
+    on GET /scores/{ticker}/{date}: shared with concurrent requests for it, or
+    queued in scoring worker mode (202 with the job to poll, then retry). A
+    score stored without a full feature row answers 409.
+    """
+    from . import sensitivity
+    ticker_upper = ticker.upper()
+    date = normalize_date(date)
+    perturbations = {name: {"mode": p.mode, "values": p.values} for name, p in body.perturbations.items()}
+    try:
+        sensitivity.validate_request(perturbations, body.partial_dependence, body.pd_points, body.method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        features = await run_in_threadpool(sensitivity.base_features, ticker_upper, date)
+        if features is None:
+            if SCORING_WORKER:
+                return await _queue_score(ticker_upper, date)
+            score_data = await _compute_cold(ticker_upper, date)
+            features = sensitivity.base_features(ticker_upper, date, stored=score_data)
+    except sensitivity.IncompleteFeatures as e:
+        # Recomputing would read the same stored document back (and requeue it forever)
+        raise HTTPException(status_code=409, detail=str(e))
+
+    try:
+        result = await run_in_threadpool(
+            sensitivity.sensitivity, features, perturbations, body.partial_dependence, body.pd_points, body.method
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ticker": ticker_upper, "date": features["date"], "method": body.method, **result}
+
+@app.get("/jobs/{job_id}", tags=["Jobs"], response_model=Dict[str, Any])
+def get_job(job_id: str):
+    """
+    Status of a queued computation: queued, running, done (with the score
+    document as 'result') or failed (with 'error').
+    """
+    from .jobs import get_job_queue
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job with id '{job_id}'.")
+    if job["status"] == "done" and job["kind"] == "score_ticker":
+        # Don't wait for the watcher: the client reads the score next. Each write drops the cache once.
+        sync_score_writes()
+    return job
+
+async def _queue_score(ticker_upper: str, date: str) -> JSONResponse:
+    """
+    Scoring worker mode: 202 with the job computing (ticker, date) to poll. A job
+    for it that just failed is not requeued; it answers 404 like the on-the-fly path.
+    """
+    from .worker import enqueue_score_job
+    job = await run_in_threadpool(enqueue_score_job, ticker_upper, date)
+    if job["status"] == "failed":
+        logger.warning(f"Score job {job['id']} for {ticker_upper} on {date} failed recently: {job['error']}")
+        raise HTTPException(
+            status_code=404,
+            detail=f"Could not fetch or calculate data for ticker '{ticker_upper}'. It may be an invalid symbol."
+        )
+    location = f"/jobs/{job['id']}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job["id"], "status": job["status"], "poll": location},
+        headers={"Location": location, "Retry-After": "2"},
+    )
+
+async def _compute_cold(ticker_upper: str, date: str) -> Dict[str, Any]:
+    """
+    The on-the-fly score for (ticker, date), computed on the bounded cold executor
+    and shared with concurrent requests for it; 503 with Retry-After when full.
+    """
+    try:
+        computation = COLD_COMPUTATIONS.submit((ticker_upper, date), _compute_score_on_the_fly, ticker_upper, date)
+    except CapacityExceeded:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many scores are being calculated right now. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+    # Shielded: a client that disconnects must not cancel the computation other requests share
+    return await asyncio.shield(asyncio.wrap_future(computation))
 
-    print(f"Data for {ticker_upper} not found in DB. Calculating on-the-fly...")
+def _compute_score_on_the_fly(ticker_upper: str, date: str) -> Dict[str, Any]:
+    """Runs on the bounded cold-computation executor, never on the event loop."""
+    logger.info(f"Data for {ticker_upper} not found in DB. Calculating on-the-fly...")
+    from .tasks import score_ticker_on_date
     try:
-        # 1. Get features using the new logic (which includes sentiment)
-        features = get_ticker_features(ticker_upper, date)
-        features["ticker"] = ticker_upper
-
-        # 2. Calculate score and explanations
-        creditworthiness, probs, shap_metadata = calculate_creditworthiness_with_explain(features, method="weighted")
-
-        # 3. Prepare the full data object
-        new_score_data = {
-            "ticker": ticker_upper,
-            "date": features['date'],
-            "creditworthiness": creditworthiness,
-            "risk_probs": probs,
-            "shap_explanations": shap_metadata,
-            "features": {k: v for k, v in features.items() if k not in ['ticker', 'date']}
-        }
-
-        # 4. Save to DB and return
-        database.save_score_data(new_score_data.copy())
-        return new_score_data
+        return score_ticker_on_date(ticker_upper, date)
 
     except ValueError as e:
-        print(f"Error calculating on-the-fly for {ticker_upper}: {e}")
+        logger.warning(f"Error calculating on-the-fly for {ticker_upper}: {e}")
         raise HTTPException(
             status_code=404, 
             detail=f"Could not fetch or calculate data for ticker '{ticker_upper}'. It may be an invalid symbol."
         )
     except Exception as e:
-        print(f"A general error occurred during on-the-fly calculation for {ticker_upper}: {e}")
+        logger.exception(f"A general error occurred during on-the-fly calculation for {ticker_upper}: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"An internal error occurred while calculating the score for '{ticker_upper}'."
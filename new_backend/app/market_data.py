@@ -0,0 +1,375 @@
+# app/market_data.py
+"""
+Local cache of daily OHLCV bars and fundamentals in front of yfinance.
+
+Prices are kept per ticker in a columnar .npz file (one array per field plus
+the bar dates). A lookup only fetches the date ranges the file does not
+cover yet; in practice that is the bars since the last cached one, re-fetched
+at most once per PRICE_CACHE_REFRESH_SECONDS. Coverage only grows by the bars
+a download actually returned, so an empty or partial download is retried on
+the next lookup. Every delta fetch overlaps one settled cached bar; if its
+Adj Close changed (a split or dividend re-adjusted the history), the ticker's
+file is dropped and rebuilt. Fundamentals from `.info` are kept per ticker
+for FUNDAMENTALS_TTL_SECONDS.
+
+All network access goes through a fetcher object with two methods:
+
+    download(tickers, start, end) -> {ticker: DataFrame of PRICE_COLUMNS, date-indexed}
+    info(ticker)                  -> dict (the yfinance `.info` payload)
+
+YFinanceFetcher is the production one; anything with the same methods (e.g.
+an offline stand-in) can be passed to MarketData instead.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import MARKET_DATA_CACHE_DIR, PRICE_CACHE_REFRESH_SECONDS, FUNDAMENTALS_TTL_SECONDS
+from .pipeline import io_slot, with_retry
+from .metrics import timed, cache_result
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# yfinance `.info` key for each fundamental feature
+FUNDAMENTAL_FIELDS = {
+    "de_ratio": "debtToEquity",
+    "current_ratio": "currentRatio",
+    "quick_ratio": "quickRatio",
+    "roa": "returnOnAssets",
+    "roe": "returnOnEquity",
+    "profit_margin": "profitMargins",
+}
+
+
+def fundamentals_from_info(info: Dict) -> Dict[str, float]:
+    return {name: info.get(key, 0.0) for name, key in FUNDAMENTAL_FIELDS.items()}
+
+
+def _day(value) -> int:
+    """Days since epoch for a date-like value."""
+    if isinstance(value, str):
+        value = value[:10]
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def _day_str(day: int) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def _tmp_path(path: str) -> str:
+    """Temp file next to path, unique per process and thread, for atomic os.replace writes."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _today() -> int:
+    return _day(datetime.now().strftime('%Y-%m-%d'))
+
+
+# -------------------- Fetchers -------------------- #
+class YFinanceFetcher:
+    """Fetch from Yahoo Finance, holding the shared per-service I/O slots."""
+
+    def download(self, tickers: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+        with io_slot("prices"):
+            # yfinance treats `end` as exclusive
+            end_exclusive = _day_str(_day(end) + 1)
+            df = yf.download(tickers, start=start, end=end_exclusive, interval="1d", auto_adjust=False,
+                             group_by="ticker", threads=True, progress=False)
+        return split_download(df, tickers)
+
+    def info(self, ticker: str) -> Dict:
+        import yfinance as yf
+        with io_slot("fundamentals"):
+            return yf.Ticker(ticker).info
+
+
+def split_download(df: pd.DataFrame, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """Split a (possibly multi-ticker) yf.download frame into one OHLCV frame per ticker."""
+    out = {}
+    if df is None or df.empty:
+        return out
+    if isinstance(df.columns, pd.MultiIndex):
+        for level in range(df.columns.nlevels):
+            present = set(df.columns.get_level_values(level))
+            if any(t in present for t in tickers):
+                for ticker in tickers:
+                    if ticker in present:
+                        out[ticker] = df.xs(ticker, axis=1, level=level)
+                break
+    elif len(tickers) == 1:
+        out[tickers[0]] = df
+    return {
+        t: frame.reindex(columns=PRICE_COLUMNS).dropna(how="all")
+        for t, frame in out.items()
+    }
+
+
+# -------------------- Price cache -------------------- #
+class _PriceFile:
+    """In-memory copy of one ticker's cache file."""
+
+    def __init__(self, days: np.ndarray, columns: Dict[str, np.ndarray],
+                 covered_from: Optional[int], covered_to: Optional[int], checked_at: float,
+                 requested: Optional[Tuple[int, int]] = None):
+        self.days = days
+        self.columns = columns
+        # Span of the cached bars
+        self.covered_from = covered_from
+        self.covered_to = covered_to
+        self.checked_at = checked_at
+        # Range asked for by the downloads since checked_at; non-trading days in it
+        # are not asked for again until the refresh interval passes
+        self.requested = requested
+
+    @classmethod
+    def empty(cls) -> "_PriceFile":
+        return cls(np.empty(0, np.int64), {c: np.empty(0) for c in PRICE_COLUMNS}, None, None, 0.0)
+
+
+class PriceCache:
+    def __init__(self, cache_dir: str, fetcher, refresh_seconds: float = PRICE_CACHE_REFRESH_SECONDS):
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher
+        self.refresh_seconds = refresh_seconds
+        self._files: Dict[str, _PriceFile] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.fetches = 0
+
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticker}.npz")
+
+    def _load(self, ticker: str) -> _PriceFile:
+        cached = self._files.get(ticker)
+        if cached is not None:
+            return cached
+        try:
+            with np.load(self._path(ticker)) as data:
+                meta = json.loads(str(data["meta"]))
+                cached = _PriceFile(
+                    data["days"], {c: data[c] for c in PRICE_COLUMNS},
+                    meta["covered_from"], meta["covered_to"], meta["checked_at"],
+                    tuple(meta["requested"]) if meta.get("requested") else None,
+                )
+        except (FileNotFoundError, KeyError, ValueError):
+            cached = _PriceFile.empty()
+        self._files[ticker] = cached
+        return cached
+
+    def _save(self, ticker: str, entry: _PriceFile):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta = {"covered_from": entry.covered_from, "covered_to": entry.covered_to, "checked_at": entry.checked_at,
+                "requested": entry.requested}
+        tmp = _tmp_path(self._path(ticker))
+        with open(tmp, "wb") as fh:
+            np.savez(fh, days=entry.days, meta=np.array(json.dumps(meta)), **entry.columns)
+        os.replace(tmp, self._path(ticker))
+        self._files[ticker] = entry
+
+    def missing_ranges(self, ticker: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Inclusive day ranges that must be fetched to answer [start, end]. Each
+        range overlaps the cached bars, so a healthy download is never empty
+        and adjusted closes can be compared.
+        """
+        entry = self._load(ticker)
+        if entry.covered_from is None:
+            return [(start, end)]
+        fresh = time.time() - entry.checked_at <= self.refresh_seconds
+
+        def asked(lo: int, hi: int) -> bool:
+            return fresh and entry.requested is not None and entry.requested[0] <= lo and hi <= entry.requested[1]
+
+        ranges = []
+        if start < entry.covered_from and not asked(start, entry.covered_from - 1):
+            ranges.append((start, entry.covered_from))
+        # Today's bar is provisional until the close, so it is re-checked once the refresh interval passes
+        stale = end >= _today() and not fresh
+        if (end > entry.covered_to and not asked(entry.covered_to + 1, end)) or (end >= entry.covered_to and stale):
+            # Re-fetch from the last settled bar, so a provisional intraday bar gets replaced
+            # and there is always a settled bar to compare
+            tail_start = int(entry.days[-2]) if len(entry.days) > 1 else entry.covered_to
+            ranges.append((min(tail_start, end), end))
+        return ranges
+
+    def merge(self, ticker: str, frame: Optional[pd.DataFrame], start: int, end: int) -> bool:
+        """
+        Merge fetched bars for [start, end] into the cache (newer values win).
+        Coverage grows only by the bars received; an empty frame changes nothing.
+        Returns False, leaving the cache untouched, when a settled cached bar's
+        Adj Close differs from the fetched one.
+        """
+        if frame is None or frame.empty:
+            return True
+        entry = self._load(ticker)
+        frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+        new_days = frame.index.values.astype("datetime64[D]").astype(np.int64)
+        new_columns = {c: frame[c].to_numpy(np.float64) if c in frame else np.full(len(new_days), np.nan)
+                       for c in PRICE_COLUMNS}
+
+        # Bars cached before the day they were checked on were final then
+        _, old_idx, new_idx = np.intersect1d(entry.days, new_days, return_indices=True)
+        settled = entry.days[old_idx] < _day(datetime.fromtimestamp(entry.checked_at).strftime('%Y-%m-%d'))
+        if not np.allclose(entry.columns["Adj Close"][old_idx[settled]], new_columns["Adj Close"][new_idx[settled]],
+                           rtol=1e-6, equal_nan=True):
+            return False
+
+        keep = ~np.isin(entry.days, new_days)
+        days = np.concatenate([entry.days[keep], new_days])
+        order = np.argsort(days, kind="stable")
+        columns = {c: np.concatenate([entry.columns[c][keep], new_columns[c]])[order] for c in PRICE_COLUMNS}
+        days = days[order]
+
+        fresh = time.time() - entry.checked_at <= self.refresh_seconds
+        requested = (start, end)
+        if fresh and entry.requested is not None:
+            requested = (min(entry.requested[0], start), max(entry.requested[1], end))
+        self._save(ticker, _PriceFile(days, columns, int(days[0]), int(days[-1]), time.time(), requested))
+        return True
+
+    def _apply(self, ticker: str, frame: Optional[pd.DataFrame], start: int, end: int):
+        """merge(), rebuilding the ticker's whole cache when its adjusted history changed."""
+        if self.merge(ticker, frame, start, end):
+            return
+        entry = self._load(ticker)
+        start, end = min(start, entry.covered_from), max(end, entry.covered_to)
+        logger.info(f"Adjusted closes changed for {ticker}; rebuilding its price cache.", extra={"ticker": ticker})
+        self._files[ticker] = _PriceFile.empty()
+        try:
+            os.remove(self._path(ticker))
+        except FileNotFoundError:
+            pass
+        self.merge(ticker, self._fetch([ticker], start, end).get(ticker), start, end)
+
+    def _fetch(self, tickers: List[str], start: int, end: int) -> Dict[str, pd.DataFrame]:
+        self.fetches += 1
+        with timed("prices"):
+            return with_retry(self.fetcher.download, tickers, _day_str(start), _day_str(end))
+
+    def history(self, ticker: str, start, end=None) -> pd.DataFrame:
+        """Daily bars for ticker in [start, end] (end defaults to today), fetching only what is missing."""
+        start_day = _day(start)
+        end_day = _today() if end is None else _day(end)
+        with self._lock(ticker):
+            missing = self.missing_ranges(ticker, start_day, end_day)
+            cache_result("prices", hits=not missing, misses=bool(missing))
+            for lo, hi in missing:
+                self._apply(ticker, self._fetch([ticker], lo, hi).get(ticker), lo, hi)
+            entry = self._load(ticker)
+        mask = (entry.days >= start_day) & (entry.days <= end_day)
+        index = pd.DatetimeIndex(entry.days[mask].astype("datetime64[D]").astype("datetime64[ns]"), name="Date")
+        return pd.DataFrame({c: entry.columns[c][mask] for c in PRICE_COLUMNS}, index=index)
+
+    def prefetch(self, tickers: Iterable[str], start, end=None) -> int:
+        """
+        Bring several tickers up to date with as few downloads as possible:
+        tickers missing the same range are fetched in one multi-ticker call.
+        Returns the number of download calls made.
+        """
+        start_day = _day(start)
+        end_day = _today() if end is None else _day(end)
+        groups: Dict[Tuple[int, int], List[str]] = {}
+        for ticker in tickers:
+            with self._lock(ticker):
+                for rng in self.missing_ranges(ticker, start_day, end_day):
+                    groups.setdefault(rng, []).append(ticker)
+        for (lo, hi), batch in groups.items():
+            frames = self._fetch(batch, lo, hi)
+            for ticker in batch:
+                with self._lock(ticker):
+                    # A ticker left out of the download keeps its coverage and is fetched on its next lookup
+                    self._apply(ticker, frames.get(ticker), lo, hi)
+        return len(groups)
+
+
+# -------------------- Fundamentals cache -------------------- #
+class FundamentalsCache:
+    """`.info`-derived fundamentals per ticker, refreshed after ttl seconds."""
+
+    def __init__(self, cache_dir: str, fetcher, ttl: float = FUNDAMENTALS_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self._memory: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticker}.json")
+
+    def _load(self, ticker: str) -> Optional[Dict]:
+        entry = self._memory.get(ticker)
+        if entry is None:
+            try:
+                with open(self._path(ticker)) as fh:
+                    entry = json.load(fh)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+            self._memory[ticker] = entry
+        return entry
+
+    def get(self, ticker: str) -> Dict[str, float]:
+        """Cached fundamentals; on a failed refresh the stale copy is served if there is one."""
+        entry = self._load(ticker)
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+            cache_result("fundamentals", hits=1)
+            return dict(entry["values"])
+        cache_result("fundamentals", misses=1)
+        try:
+            self.fetches += 1
+            with timed("fundamentals"):
+                values = fundamentals_from_info(self.fetcher.info(ticker))
+        except Exception:
+            if entry is not None:
+                logger.warning(f"⚠️ Fundamentals refresh failed for {ticker}; serving cached values.")
+                return dict(entry["values"])
+            raise
+        entry = {"fetched_at": time.time(), "values": values}
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = _tmp_path(self._path(ticker))
+            with open(tmp, "w") as fh:
+                json.dump(entry, fh)
+            os.replace(tmp, self._path(ticker))
+            self._memory[ticker] = entry
+        return dict(values)
+
+
+# -------------------- Facade -------------------- #
+class MarketData:
+    def __init__(self, fetcher=None, cache_dir: str = MARKET_DATA_CACHE_DIR,
+                 refresh_seconds: float = PRICE_CACHE_REFRESH_SECONDS,
+                 fundamentals_ttl: float = FUNDAMENTALS_TTL_SECONDS):
+        self.fetcher = fetcher if fetcher is not None else YFinanceFetcher()
+        self.prices = PriceCache(os.path.join(cache_dir, "prices"), self.fetcher, refresh_seconds)
+        self.fundamentals = FundamentalsCache(os.path.join(cache_dir, "fundamentals"), self.fetcher,
+                                              fundamentals_ttl)
+
+    def history(self, ticker: str, lookback_years: int = 2, end=None) -> pd.DataFrame:
+        end_day = _today() if end is None else _day(end)
+        return self.prices.history(ticker, _day_str(end_day - 365 * lookback_years), _day_str(end_day))
+
+    def prefetch(self, tickers: Iterable[str], lookback_years: int = 2, end=None) -> int:
+        end_day = _today() if end is None else _day(end)
+        return self.prices.prefetch(tickers, _day_str(end_day - 365 * lookback_years), _day_str(end_day))
+
+
+@lru_cache(maxsize=1)
+def get_market_data() -> MarketData:
+    """Process-wide cache backed by yfinance."""
+    return MarketData()
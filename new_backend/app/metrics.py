@@ -0,0 +1,194 @@
+# app/metrics.py
+"""
+In-process counters and histograms, exposed in the Prometheus text format
+by GET /metrics (and by the scoring worker on WORKER_METRICS_PORT).
+
+Every process keeps its own values; with several gunicorn workers each
+scrape reaches one of them, so aggregate with sum()/rate() by instance
+as usual for multi-process exporters.
+
+  credit_stage_seconds{stage}              hot-path stages: prices, fundamentals, news,
+                                           sentiment_model, features, predict, shap,
+                                           mongo_read, mongo_write, score_ticker,
+                                           sensitivity
+  credit_cache_requests_total{cache,result} hit / miss per cache
+  credit_ticker_fetch_seconds{ticker}      per-ticker feature fetch in the daily job
+  credit_daily_job_stage_seconds{stage}    daily job stages (prefetch, fetch, score, ...)
+  credit_jobs_seconds{kind,outcome}        queued jobs run by app.worker
+  credit_http_request_seconds{method,route,status}
+"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for a 1 ms cache read and a multi-minute daily job
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                   120.0, 300.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[Tuple, float]]]] = []
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def add_collector(self, collect: Callable[[], Iterable[Tuple[Tuple, float]]]):
+        """Values read at scrape time (e.g. an LRUCache's own hit/miss counters)."""
+        self._collectors.append(collect)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        for collect in self._collectors:
+            for key, value in collect():
+                values[key] = values.get(key, 0.0) + value
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_label_str(self.labelnames, k)} {_number(v)}" for k, v in sorted(values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {k: (list(counts), total) for k, (counts, total) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_label_str(names, key + (le,))} {cumulative}")
+            labels = _label_str(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "credit_stage_seconds", "Wall-clock seconds per hot-path stage.", ["stage"]))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "credit_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"]))
+TICKER_FETCH_SECONDS = REGISTRY.register(Histogram(
+    "credit_ticker_fetch_seconds", "Per-ticker feature fetch time in the daily job.", ["ticker"]))
+DAILY_JOB_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "credit_daily_job_stage_seconds", "Seconds per stage of the daily scoring job.", ["stage"]))
+STAGE_FAILURES = REGISTRY.register(Counter(
+    "credit_stage_failures_total", "Stages that failed and were skipped with a degraded result.", ["stage"]))
+JOB_SECONDS = REGISTRY.register(Histogram(
+    "credit_jobs_seconds", "Queued jobs run by the scoring worker, by kind and outcome.", ["kind", "outcome"]))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "credit_http_request_seconds", "API request latency.", ["method", "route", "status"]))
+
+
+def timed(stage: str):
+    """Context manager recording one hot-path stage in credit_stage_seconds."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def cache_result(cache: str, hits: int = 0, misses: int = 0):
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=cache, result="miss")
+
+
+def track_lru(cache: str, lru):
+    """Report an LRUCache's own hit/miss counters as credit_cache_requests_total{cache=...}."""
+    CACHE_REQUESTS.add_collector(lambda: (((cache, "hit"), lru.hits), ((cache, "miss"), lru.misses)))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def serve(port: int, host: str = "0.0.0.0"):
+    """Serve GET /metrics from a daemon thread (for processes without the API, e.g. app.worker)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode("utf-8")
+            self.send_response(200 if self.path.split("?")[0] == "/metrics" else 404)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
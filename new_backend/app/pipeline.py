@@ -0,0 +1,135 @@
+# app/pipeline.py
+"""
+Helpers for running network-bound work concurrently: per-stage concurrency
+limits, retry with exponential backoff, request coalescing, and simple
+stage timers.
+"""
+import time
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from .config import (
+    PRICE_FETCH_CONCURRENCY, FUNDAMENTALS_FETCH_CONCURRENCY, NEWS_FETCH_CONCURRENCY,
+    FETCH_RETRIES, FETCH_BACKOFF_SECONDS,
+)
+
+# One bounded semaphore per external service, shared by every thread in the process
+_IO_LIMITS = {
+    "prices": threading.BoundedSemaphore(PRICE_FETCH_CONCURRENCY),
+    "fundamentals": threading.BoundedSemaphore(FUNDAMENTALS_FETCH_CONCURRENCY),
+    "news": threading.BoundedSemaphore(NEWS_FETCH_CONCURRENCY),
+}
+
+
+@contextmanager
+def io_slot(kind: str):
+    """Hold one of the limited slots for an external fetch ('prices', 'fundamentals', 'news')."""
+    semaphore = _IO_LIMITS[kind]
+    with semaphore:
+        yield
+
+
+def with_retry(fn: Callable, *args, attempts: int = FETCH_RETRIES, backoff: float = FETCH_BACKOFF_SECONDS,
+               retry_on=(Exception,), give_up_on=(ValueError,), **kwargs):
+    """
+    Call fn(*args, **kwargs), retrying on transient errors with exponential
+    backoff plus jitter. ValueError (bad symbol / no data) is not retried.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except give_up_on:
+            raise
+        except retry_on:
+            if attempt == attempts:
+                raise
+            time.sleep(backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25))
+
+
+class CapacityExceeded(RuntimeError):
+    """Raised when a SingleFlight already has its maximum number of computations running."""
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time on a bounded executor.
+    Concurrent callers asking for the same key get the same Future; new keys
+    are refused with CapacityExceeded once max_in_flight are pending. The
+    executor is started on first use, and again after shutdown() (an app
+    shut down and started again in the same process).
+    """
+
+    def __init__(self, max_workers: int, max_in_flight: int, name: str = "singleflight"):
+        self._max_workers = max_workers
+        self._name = name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_in_flight = max_in_flight
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            if len(self._in_flight) >= self._max_in_flight:
+                raise CapacityExceeded(f"{len(self._in_flight)} computations already in flight")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix=self._name)
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def dedupe(items: Iterable[str]) -> List[str]:
+    """Drop repeated entries while keeping the first-seen order."""
+    return list(dict.fromkeys(items))
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock seconds per named stage; with a histogram (see
+    app/metrics.py), each stage is also observed under its stage label.
+    """
+
+    def __init__(self, histogram=None):
+        self.timings: Dict[str, float] = {}
+        self._histogram = histogram
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+            if self._histogram is not None:
+                self._histogram.observe(seconds, stage=name)
+
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def report(self) -> str:
+        parts = [f"{name}={seconds:.2f}s" for name, seconds in self.timings.items()]
+        parts.append(f"total={self.total():.2f}s")
+        return ", ".join(parts)
@@ -0,0 +1,224 @@
+# app/response_cache.py
+"""
+In-process cache of serialized JSON responses for the read endpoints.
+
+Entries hold the response body as bytes plus its ETag, so a hit skips
+Mongo, Pydantic validation and JSON encoding; a client that sends the ETag
+back in If-None-Match gets an empty 304. Entries expire after a TTL and are
+dropped as soon as a score for their ticker is written: directly when this
+process wrote it, otherwise when watch_score_writes next sees the write's
+stamp in Mongo (every RESPONSE_CACHE_SYNC_SECONDS).
+
+Every invalidation also bumps a generation counter per ticker (and one for
+/scores/latest). A handler takes generation(key) before it reads Mongo and
+passes it to store(); if the ticker was invalidated in between, the body
+may predate the write and is served but not cached.
+"""
+import json
+import math
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Hashable, Iterable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from .cache import LRUCache
+from .config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_SYNC_SECONDS
+from .metrics import track_lru
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE = LRUCache(RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS)
+track_lru("response", RESPONSE_CACHE)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Optional[dict] = None
+
+
+def normalize_ticker(ticker: str) -> str:
+    return ticker.strip().upper()
+
+
+def normalize_date(date_str: str) -> str:
+    """'2024-1-5' and '2024-01-05' share a cache entry; unparseable input is kept as-is."""
+    try:
+        return datetime.strptime(date_str.strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return date_str.strip()
+
+
+def latest_key() -> Hashable:
+    return ("latest",)
+
+
+def ticker_key(ticker: str, *params) -> Hashable:
+    """Key for any response scoped to one ticker; params distinguish the variants."""
+    return ("ticker", normalize_ticker(ticker)) + tuple(params)
+
+
+# -------------------- Generations -------------------- #
+_generation_lock = threading.Lock()
+_generations: Dict[str, int] = {}
+
+
+def _scope(key: Hashable) -> str:
+    """The generation a key belongs to: its ticker, or 'latest'."""
+    return key[1] if key[0] == "ticker" else key[0]
+
+
+def generation(key: Hashable) -> int:
+    """Current generation of key's ticker; take it before reading the data to be cached."""
+    with _generation_lock:
+        return _generations.get(_scope(key), 0)
+
+
+def _finite(value):
+    """value with every NaN/inf float replaced by None, at any depth."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def serialize(payload, headers: Optional[dict] = None) -> CachedResponse:
+    try:
+        body = json.dumps(payload, separators=(",", ":"), default=str, allow_nan=False)
+    except ValueError:
+        # NaN/inf are not valid JSON; they are served as null
+        body = json.dumps(_finite(payload), separators=(",", ":"), default=str, allow_nan=False)
+    body = body.encode("utf-8")
+    return CachedResponse(body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"', headers)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _respond(request: Request, entry: CachedResponse) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **(entry.headers or {})}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def lookup(request: Request, key: Hashable) -> Optional[Response]:
+    """The cached response for key, or None on a miss."""
+    entry = RESPONSE_CACHE.get(key)
+    return _respond(request, entry) if entry is not None else None
+
+
+def store(request: Request, key: Hashable, payload, headers: Optional[dict] = None,
+          since: Optional[int] = None) -> Response:
+    """
+    Serialize payload (plus any extra response headers), cache it under key and
+    return it. since is the generation(key) taken before payload was read; if
+    key's ticker has been invalidated since, payload is returned uncached.
+    """
+    entry = serialize(payload, headers)
+    with _generation_lock:
+        if since is None or _generations.get(_scope(key), 0) == since:
+            RESPONSE_CACHE.set(key, entry)
+    return _respond(request, entry)
+
+
+def cached_json(request: Request, key: Hashable, produce: Callable[[], object]) -> Response:
+    """
+    Serve key from the cache, or call produce() and cache its serialized result.
+    Exceptions from produce() (e.g. HTTPException 404) propagate and are not cached.
+    """
+    response = lookup(request, key)
+    if response is not None:
+        return response
+    since = generation(key)
+    return store(request, key, produce(), since=since)
+
+
+def invalidate_tickers(tickers: Iterable[str]) -> int:
+    """Drop /scores/latest and every cached response for the given tickers."""
+    tickers = {normalize_ticker(t) for t in tickers}
+    with _generation_lock:
+        for scope in tickers | {_scope(latest_key())}:
+            _generations[scope] = _generations.get(scope, 0) + 1
+    return RESPONSE_CACHE.discard_where(lambda key: key == latest_key() or (key[0] == "ticker" and key[1] in tickers))
+
+
+# -------------------- Cross-process invalidation -------------------- #
+# Stamps are re-read with this overlap, so a write stamped just before a newer one
+# that was already read is not missed; _seen_writes keeps each write dropping once
+_SYNC_OVERLAP = timedelta(seconds=30)
+_sync_lock = threading.Lock()
+_seen_writes: Dict[str, datetime] = {}
+_sync_since: Optional[datetime] = None
+
+
+def sync_score_writes() -> int:
+    """
+    Drop the cached responses of tickers whose scores were written (by any
+    process) since the last check, each write once. Returns how many tickers.
+    """
+    global _sync_since
+    from . import database
+    with _sync_lock:
+        changed = set()
+        for stamp in database.get_score_writes_since(_sync_since):
+            ticker, written_at = stamp["_id"], stamp["written_at"]
+            if _seen_writes.get(ticker) != written_at:
+                _seen_writes[ticker] = written_at
+                changed.add(ticker)
+            if _sync_since is None or written_at - _SYNC_OVERLAP > _sync_since:
+                _sync_since = written_at - _SYNC_OVERLAP
+    if changed:
+        invalidate_tickers(changed)
+    return len(changed)
+
+
+_watch_lock = threading.Lock()
+_watch_thread: Optional[threading.Thread] = None
+_watch_stop = threading.Event()
+
+
+def watch_score_writes(interval: float = RESPONSE_CACHE_SYNC_SECONDS) -> threading.Thread:
+    """
+    Run sync_score_writes every interval seconds on a daemon thread, one per
+    process: an app started again (e.g. another TestClient) reuses the running one.
+    """
+    global _watch_thread, _watch_stop
+    with _watch_lock:
+        if _watch_thread is not None and _watch_thread.is_alive() and not _watch_stop.is_set():
+            return _watch_thread
+        # A thread still winding down after stop_watching_score_writes() keeps its own event
+        stop = _watch_stop = threading.Event()
+
+        def loop():
+            failing = False
+            while not stop.is_set():
+                try:
+                    sync_score_writes()
+                    failing = False
+                except Exception as e:
+                    if not failing:
+                        logger.warning(f"⚠️ Could not check for score writes; cached responses expire by TTL: {e}")
+                    failing = True
+                stop.wait(interval)
+
+        _watch_thread = threading.Thread(target=loop, name="response-cache-sync", daemon=True)
+        _watch_thread.start()
+        return _watch_thread
+
+
+def stop_watching_score_writes():
+    """Stop the watch_score_writes thread after its current check."""
+    with _watch_lock:
+        _watch_stop.set()
@@ -0,0 +1,219 @@
+# app/rolling_features.py
+"""
+Incremental technical features.
+
+Per ticker we keep the last 61 closes plus O(1) rolling accumulators, so a
+new daily bar updates vol_5d/20d/60d, drawdown_60d and prev_return_5d/20d/60d
+without re-reading history. Definitions match the pandas versions used in
+training:
+
+    ret            = close.pct_change()
+    vol_Nd         = ret.rolling(N).std()
+    drawdown_60d   = close / close.rolling(60, min_periods=1).max() - 1
+    prev_return_Nd = close.pct_change(N)
+
+State is persisted per ticker as a small JSON file between runs.
+"""
+import os
+import json
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+from .config import FEATURE_STATE_DIR
+
+VOL_WINDOWS = (5, 20, 60)
+RETURN_WINDOWS = (5, 20, 60)
+DRAWDOWN_WINDOW = 60
+# Enough closes for the longest lookback (close_{t-60})
+HISTORY_LENGTH = max(max(RETURN_WINDOWS) + 1, DRAWDOWN_WINDOW)
+
+TECHNICAL_FEATURES = (
+    [f"vol_{n}d" for n in VOL_WINDOWS]
+    + ["drawdown_60d"]
+    + [f"prev_return_{n}d" for n in RETURN_WINDOWS]
+)
+
+
+class RollingStd:
+    """Sample standard deviation (ddof=1) over a fixed window, updated in O(1) per value."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x: float):
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            n = len(self.values)
+            if n == 0:
+                self.mean, self.m2 = 0.0, 0.0
+            else:
+                # Welford removal
+                old_mean = self.mean
+                self.mean = old_mean - (old - old_mean) / n
+                self.m2 -= (old - old_mean) * (old - self.mean)
+        self.values.append(x)
+        n = len(self.values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+
+    def std(self) -> float:
+        if len(self.values) < self.window:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+
+class RollingMax:
+    """Maximum over the last `window` values via a monotonic deque (amortized O(1))."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.index = 0
+        self.candidates = deque()  # (index, value), values strictly decreasing
+
+    def push(self, x: float):
+        while self.candidates and self.candidates[-1][1] <= x:
+            self.candidates.pop()
+        self.candidates.append((self.index, x))
+        if self.candidates[0][0] <= self.index - self.window:
+            self.candidates.popleft()
+        self.index += 1
+
+    def max(self) -> float:
+        return self.candidates[0][1] if self.candidates else math.nan
+
+
+class TickerFeatureState:
+    """Rolling state for one ticker; feed daily closes in date order with update()."""
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.last_date: Optional[str] = None
+        self.closes = deque(maxlen=HISTORY_LENGTH)
+        self._vols = {n: RollingStd(n) for n in VOL_WINDOWS}
+        self._max = RollingMax(DRAWDOWN_WINDOW)
+
+    def update(self, date: str, close: float) -> bool:
+        """Apply one bar. Bars on or before last_date, or with a missing close, are ignored."""
+        if close is None or math.isnan(close) or (self.last_date is not None and date <= self.last_date):
+            return False
+        if self.closes:
+            ret = close / self.closes[-1] - 1.0
+            for stat in self._vols.values():
+                stat.push(ret)
+        self.closes.append(close)
+        self._max.push(close)
+        self.last_date = date
+        return True
+
+    def features(self) -> Dict[str, float]:
+        if not self.closes:
+            return {name: math.nan for name in TECHNICAL_FEATURES}
+        close = self.closes[-1]
+        out = {f"vol_{n}d": self._vols[n].std() for n in VOL_WINDOWS}
+        out["drawdown_60d"] = close / self._max.max() - 1.0
+        for n in RETURN_WINDOWS:
+            out[f"prev_return_{n}d"] = close / self.closes[-1 - n] - 1.0 if len(self.closes) > n else math.nan
+        return out
+
+    # -------------------- Persistence -------------------- #
+    def to_dict(self) -> Dict:
+        return {"ticker": self.ticker, "last_date": self.last_date, "closes": list(self.closes)}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TickerFeatureState":
+        """Rebuild the accumulators from the saved closes (at most HISTORY_LENGTH pushes)."""
+        state = cls(data["ticker"])
+        closes = data.get("closes", [])
+        previous = None
+        for close in closes:
+            if previous is not None:
+                ret = close / previous - 1.0
+                for stat in state._vols.values():
+                    stat.push(ret)
+            state.closes.append(close)
+            state._max.push(close)
+            previous = close
+        state.last_date = data.get("last_date")
+        return state
+
+
+# Per state file, shared by every FeatureStateStore in the process
+_save_locks: Dict[str, threading.Lock] = {}
+_save_locks_guard = threading.Lock()
+
+
+def _save_lock(path: str) -> threading.Lock:
+    with _save_locks_guard:
+        return _save_locks.setdefault(path, threading.Lock())
+
+
+class FeatureStateStore:
+    """One JSON file per ticker under FEATURE_STATE_DIR."""
+
+    def __init__(self, state_dir: str = FEATURE_STATE_DIR):
+        self.state_dir = state_dir
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.state_dir, f"{ticker}.json")
+
+    def load(self, ticker: str) -> TickerFeatureState:
+        try:
+            with open(self._path(ticker)) as fh:
+                return TickerFeatureState.from_dict(json.load(fh))
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return TickerFeatureState(ticker)
+
+    def save(self, state: TickerFeatureState):
+        """
+        Atomically replace the ticker's state file. Writers are serialized per
+        ticker and each writes its own temp file (unique per process and
+        thread), so concurrent saves never interleave; a state older than the
+        one already on disk is not written back over it.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._path(state.ticker)
+        with _save_lock(path):
+            stored = self.load(state.ticker).last_date
+            if stored is not None and state.last_date is not None and stored > state.last_date:
+                return
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as fh:
+                json.dump(state.to_dict(), fh)
+            os.replace(tmp, path)
+
+
+def _as_day(value) -> str:
+    if isinstance(value, str):
+        return value[:10]
+    return value.strftime('%Y-%m-%d')
+
+
+def replay(ticker: str, bars: Iterable[Tuple[object, float]]) -> TickerFeatureState:
+    """Build a fresh state from (date, close) bars in date order."""
+    state = TickerFeatureState(ticker)
+    for date, close in bars:
+        state.update(_as_day(date), float(close))
+    return state
+
+
+def advance(state: TickerFeatureState, bars: Iterable[Tuple[object, float]], until: Optional[str] = None) -> int:
+    """Feed the bars newer than state.last_date (and not after `until`); returns how many were applied."""
+    applied = 0
+    for date, close in bars:
+        day = _as_day(date)
+        if until is not None and day > until:
+            break
+        applied += state.update(day, float(close))
+    return applied
+
+
+def features_at(state: TickerFeatureState) -> Dict:
+    out = state.features()
+    out["date"] = state.last_date
+    return out
@@ -0,0 +1,230 @@
+# app/sensitivity.py
+"""
+What-if / sensitivity analysis for one ticker and date.
+
+A request perturbs some of feature_cols, each over a list of values:
+  relative : x * (1 + v)   e.g. [-0.2, 0, 0.2] for -20% / unchanged / +20%
+  absolute : x + v
+  set      : v
+The grid is the cartesian product of those lists (first feature varying
+slowest), so a 2-feature request with 40 x 25 values is a 1,000-point surface.
+
+Optional partial-dependence curves vary one feature over an evenly spaced
+range (5th-95th percentile of the cross section, widened to include the
+ticker's own value) and average the creditworthiness over the cross section
+of tickers in the feature store on that date; the ticker's own curve is
+returned next to it.
+
+The base row, the grid and every curve are stacked into one matrix, scaled
+once and scored for all three horizons in a single score_scaled_batch call,
+so a 1,000-point grid costs one predict pass instead of 1,000 scoring calls.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import database
+from .config import SENSITIVITY_MAX_POINTS, SENSITIVITY_PD_POPULATION
+from .feature_store import get_feature_store
+from .inference import feature_cols, scale_features, score_scaled_batch
+from .metrics import timed
+
+MODES = ("relative", "absolute", "set")
+METHODS = ("weighted", "mean")
+
+
+# -------------------- Grid -------------------- #
+def _column(name: str) -> int:
+    try:
+        return feature_cols.index(name)
+    except ValueError:
+        raise ValueError(f"Unknown feature '{name}'; expected one of {feature_cols}")
+
+
+def _perturbed_values(base: float, mode: str, values: Sequence[float]) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 1 or not len(values) or not np.isfinite(values).all():
+        raise ValueError("Perturbation values must be a non-empty list of finite numbers.")
+    if mode == "relative":
+        return base * (1.0 + values)
+    if mode == "absolute":
+        return base + values
+    if mode == "set":
+        return values
+    raise ValueError(f"Unknown perturbation mode '{mode}'; expected one of {MODES}")
+
+
+def perturbation_grid(base_row: np.ndarray, perturbations: Dict[str, Dict]):
+    """
+    Build the cartesian product of the perturbed values around base_row
+    (validated with validate_request first).
+    perturbations: {feature: {"mode": "relative", "values": [...]}}.
+    Returns (feature names, grid shape, axes, (N, len(feature_cols)) matrix).
+    """
+    names = list(perturbations)
+    axes = [
+        _perturbed_values(base_row[_column(name)], spec.get("mode", "relative"), spec.get("values", ()))
+        for name, spec in perturbations.items()
+    ]
+    shape = tuple(len(axis) for axis in axes)
+    X = np.repeat(base_row[None, :], int(np.prod(shape, dtype=np.int64)), axis=0)
+    for name, mesh in zip(names, np.meshgrid(*axes, indexing="ij")):
+        X[:, _column(name)] = mesh.ravel()
+    return names, shape, axes, X
+
+
+# -------------------- Partial dependence -------------------- #
+def cross_section(date: str) -> np.ndarray:
+    """
+    feature_cols rows for the tickers in the feature store on (or just before)
+    date, evenly subsampled to SENSITIVITY_PD_POPULATION. Empty without a store.
+    """
+    store = get_feature_store()
+    if store is None:
+        return np.empty((0, len(feature_cols)))
+    _, _, matrix = store.cross_section(date)
+    columns = [store.columns.index(c) for c in feature_cols]
+    population = matrix[:, columns].astype(np.float64)
+    population = population[np.isfinite(population).all(axis=1)]
+    if len(population) > SENSITIVITY_PD_POPULATION:
+        keep = np.linspace(0, len(population) - 1, SENSITIVITY_PD_POPULATION).round().astype(int)
+        population = population[keep]
+    return population
+
+
+def curve_values(population: np.ndarray, column: int, base_value: float, points: int) -> np.ndarray:
+    """Evenly spaced values over the cross section's 5th-95th percentile, including base_value."""
+    lo, hi = np.percentile(population[:, column], [5, 95]) if len(population) else (base_value, base_value)
+    lo, hi = min(lo, base_value), max(hi, base_value)
+    if hi - lo < 1e-12:
+        # No spread to follow: +/-50% around the ticker's own value
+        span = abs(base_value) * 0.5 or 1.0
+        lo, hi = base_value - span, base_value + span
+    return np.linspace(lo, hi, points)
+
+
+def _curve_matrix(rows: np.ndarray, column: int, values: np.ndarray) -> np.ndarray:
+    """rows repeated once per value, with column set to that value (value-major)."""
+    X = np.tile(rows, (len(values), 1))
+    X[:, column] = np.repeat(values, len(rows))
+    return X
+
+
+def validate_request(perturbations: Dict[str, Dict], partial_dependence: Sequence[str] = (),
+                     pd_points: int = 20, method: str = "weighted"):
+    """Check a request before any data is fetched. Raises ValueError."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'; expected one of {METHODS}")
+    size = 1
+    for name, spec in perturbations.items():
+        _column(name)
+        size *= len(_perturbed_values(0.0, spec.get("mode", "relative"), spec.get("values", ())))
+    if size > SENSITIVITY_MAX_POINTS:
+        raise ValueError(f"The grid has {size} points; at most {SENSITIVITY_MAX_POINTS} are allowed.")
+    for name in partial_dependence:
+        _column(name)
+    if partial_dependence and pd_points < 2:
+        raise ValueError("pd_points must be at least 2.")
+
+
+# -------------------- Sweep -------------------- #
+def _rounded(values: np.ndarray, digits: int = 6) -> List[float]:
+    return np.round(values, digits).tolist()
+
+
+def sensitivity(features: Dict, perturbations: Dict[str, Dict], partial_dependence: Sequence[str] = (),
+                pd_points: int = 20, method: str = "weighted") -> Dict:
+    """
+    Score a perturbation grid (and optional partial-dependence curves) around
+    one feature row in a single batch. Raises ValueError on a bad request.
+    """
+    validate_request(perturbations, partial_dependence, pd_points, method)
+    missing = [c for c in feature_cols if features.get(c) is None]
+    if missing:
+        raise ValueError(f"The base features for {features.get('date')} have no value for {missing}.")
+    base_row = np.array([float(features[c]) for c in feature_cols])
+    names, shape, axes, grid = perturbation_grid(base_row, perturbations)
+
+    blocks, curves = [base_row[None, :], grid], []
+    if partial_dependence:
+        population = cross_section(features["date"])
+        if not len(population):
+            population = base_row[None, :]
+        for name in dict.fromkeys(partial_dependence):
+            column = _column(name)
+            values = curve_values(population, column, base_row[column], pd_points)
+            curves.append((name, values, len(population)))
+            blocks += [_curve_matrix(base_row[None, :], column, values), _curve_matrix(population, column, values)]
+
+    with timed("sensitivity"):
+        X = np.vstack(blocks)
+        scores, probs = score_scaled_batch(scale_features(X), method)
+
+    base_score = float(scores[0])
+    grid_scores = scores[1:1 + len(grid)]
+    grid_probs = {label: p[1:1 + len(grid)] for label, p in probs.items()}
+    lowest, highest = int(np.argmin(grid_scores)), int(np.argmax(grid_scores))
+
+    result = {
+        "base": {
+            "features": {c: float(v) for c, v in zip(feature_cols, base_row)},
+            "creditworthiness": base_score,
+            "risk_probs": {label: round(float(p[0]), 6) for label, p in probs.items()},
+        },
+        "grid": {
+            "features": names,
+            "shape": list(shape),
+            "axes": {name: _rounded(axis) for name, axis in zip(names, axes)},
+            "points": len(grid),
+            "creditworthiness": grid_scores.tolist(),
+            "risk_probs": {label: _rounded(p) for label, p in grid_probs.items()},
+            "min": {"creditworthiness": float(grid_scores[lowest]), "index": lowest,
+                    "delta": round(float(grid_scores[lowest]) - base_score, 2)},
+            "max": {"creditworthiness": float(grid_scores[highest]), "index": highest,
+                    "delta": round(float(grid_scores[highest]) - base_score, 2)},
+        },
+    }
+
+    if curves:
+        result["partial_dependence"] = {}
+        offset = 1 + len(grid)
+        for name, values, population_size in curves:
+            own = scores[offset:offset + len(values)]
+            offset += len(values)
+            averaged = scores[offset:offset + len(values) * population_size].reshape(len(values), population_size)
+            offset += len(values) * population_size
+            result["partial_dependence"][name] = {
+                "values": _rounded(values),
+                "creditworthiness": np.round(averaged.mean(axis=1), 2).tolist(),
+                "ticker": own.tolist(),
+                "population": population_size,
+            }
+    return result
+
+
+class IncompleteFeatures(LookupError):
+    """A score is stored for the ticker and date, but without a full feature row."""
+
+
+def base_features(ticker: str, date: str, stored: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    The feature row behind the score served for (ticker, date): the features of
+    the stored score on or before date (or of the score document passed in).
+    None when no score is stored; the caller computes one the way it computes
+    any missing score, never inline here. Raises IncompleteFeatures when the
+    stored score lacks some of feature_cols (a legacy document without its
+    explanation, or a feature that was missing when it was scored), since
+    computing it again would only read the same document back.
+    """
+    if stored is None:
+        stored = database.get_score_for_date_or_earlier(ticker, date)
+    if not stored:
+        return None
+    features = stored.get("features") or {}
+    missing = [c for c in feature_cols if c not in features]
+    if missing:
+        raise IncompleteFeatures(
+            f"The score stored for '{ticker}' on {stored['date']} has no value for {', '.join(missing)}, "
+            f"so there is no feature row to analyse."
+        )
+    return dict(features, ticker=ticker, date=stored["date"])
@@ -0,0 +1,171 @@
+# app/sentiment.py
+"""
+Batched news sentiment scoring.
+
+All texts handed to the engine are deduplicated, looked up in a
+content-hash keyed on-disk cache, and only the misses are tokenized in
+padded, truncated batches and run through the model under
+torch.inference_mode. Scores use the same mapping as the old per-article
+pipeline: +p for POSITIVE, -p for NEGATIVE, 0 for NEUTRAL.
+"""
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from .config import (
+    SENTIMENT_MODEL, SENTIMENT_BATCH_SIZE, SENTIMENT_MAX_LENGTH,
+    SENTIMENT_NUM_THREADS, SENTIMENT_CACHE_PATH,
+)
+from .metrics import timed, cache_result
+
+logger = logging.getLogger(__name__)
+
+
+def article_text(article: Dict) -> str:
+    """The text scored for a news article (title plus description)."""
+    return f"{article.get('title', '')}. {article.get('description', '')}"
+
+
+# -------------------- Disk cache -------------------- #
+class SentimentCache:
+    """SQLite-backed map of content hash -> sentiment score, fronted by a dict."""
+
+    def __init__(self, path: str = SENTIMENT_CACHE_PATH):
+        self.path = path
+        self._memory: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sentiment (key TEXT PRIMARY KEY, score REAL NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        found = {k: self._memory[k] for k in keys if k in self._memory}
+        missing = [k for k in keys if k not in found]
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, score FROM sentiment WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+        self._memory.update(found)
+        return found
+
+    def set_many(self, scores: Dict[str, float]):
+        if not scores:
+            return
+        self._memory.update(scores)
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO sentiment (key, score) VALUES (?, ?)", scores.items())
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+
+
+# -------------------- Engine -------------------- #
+class SentimentEngine:
+    def __init__(self, model_name: str = SENTIMENT_MODEL, tokenizer=None, model=None,
+                 batch_size: int = SENTIMENT_BATCH_SIZE, max_length: int = SENTIMENT_MAX_LENGTH,
+                 num_threads: int = SENTIMENT_NUM_THREADS, cache: Optional[SentimentCache] = None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.num_threads = num_threads
+        self.cache = cache
+        self._tokenizer = tokenizer
+        self._model = model
+        self._signs: Optional[List[float]] = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Load tokenizer/model on first use (transformers and torch are imported here, not at startup)."""
+        if self._signs is not None:
+            return
+        with self._lock:
+            if self._signs is not None:
+                return
+            import torch
+            if self._model is None:
+                from transformers import AutoTokenizer, AutoModelForSequenceClassification
+                logger.info("Loading HF sentiment model into memory...")
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self._model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            self._model.eval()
+            if self.num_threads > 0:
+                torch.set_num_threads(self.num_threads)
+            id2label = self._model.config.id2label
+            self._signs = [
+                1.0 if id2label[i].upper() == "POSITIVE" else -1.0 if id2label[i].upper() == "NEGATIVE" else 0.0
+                for i in range(len(id2label))
+            ]
+
+    def warm(self):
+        """Load the tokenizer and model now instead of on the first scored text."""
+        self._load()
+
+    def _key(self, text: str) -> str:
+        payload = f"{self.model_name}\x00{self.max_length}\x00{text}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _run_model(self, texts: List[str]) -> List[float]:
+        import torch
+        self._load()
+        signs = torch.tensor(self._signs)
+        # Length-sorted batches keep padding to a minimum
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        scores = [0.0] * len(texts)
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                idx = order[start:start + self.batch_size]
+                encoded = self._tokenizer(
+                    [texts[i] for i in idx], padding=True, truncation=True,
+                    max_length=self.max_length, return_tensors="pt",
+                )
+                probs = torch.softmax(self._model(**encoded).logits, dim=-1)
+                top_prob, top_label = probs.max(dim=-1)
+                for i, value in zip(idx, (top_prob * signs[top_label]).tolist()):
+                    scores[i] = value
+        return scores
+
+    def score_texts(self, texts: Iterable[str]) -> List[float]:
+        """Score texts; duplicates and previously seen texts never reach the model."""
+        texts = list(texts)
+        keys = [self._key(t) for t in texts]
+        unique = dict(zip(keys, texts))
+        known = self.cache.get_many(list(unique)) if self.cache is not None else {}
+        pending = [k for k in unique if k not in known]
+        cache_result("sentiment", hits=len(unique) - len(pending), misses=len(pending))
+        if pending:
+            with timed("sentiment_model"):
+                fresh = dict(zip(pending, self._run_model([unique[k] for k in pending])))
+            if self.cache is not None:
+                self.cache.set_many(fresh)
+            known.update(fresh)
+        return [known[k] for k in keys]
+
+    def score_groups(self, groups: Dict[Hashable, List[Dict]]) -> Dict[Hashable, float]:
+        """
+        Mean sentiment per group (e.g. per ticker or per ticker/day) for lists of
+        news articles, scoring every article of every group in one pass.
+        """
+        flat = [(key, article_text(a)) for key, articles in groups.items() for a in articles]
+        scores = self.score_texts(text for _, text in flat)
+        totals: Dict[Hashable, List[float]] = {key: [] for key in groups}
+        for (key, _), score in zip(flat, scores):
+            totals[key].append(score)
+        return {key: round(sum(v) / len(v), 4) if v else 0.0 for key, v in totals.items()}
+
+
+@lru_cache(maxsize=1)
+def get_sentiment_engine() -> SentimentEngine:
+    """Process-wide engine with the on-disk cache; the model itself loads on first use."""
+    return SentimentEngine(cache=SentimentCache(SENTIMENT_CACHE_PATH))
@@ -0,0 +1,286 @@
+# app/sentiment_store.py
+"""
+Per-ticker news sentiment per trading day with an incrementally maintained decay.
+
+Tables (SQLite):
+  articles : (ticker, article_key) -> day, score     every article counted once
+  daily    : (ticker, day) -> total, count           one row per fetched calendar day
+  trading  : (ticker, day) -> sentiment, decayed     one row per trading day
+  companies: ticker -> company name used for the news query
+
+A trading row's sentiment is the mean score of the articles dated after the
+previous trading row, up to and including its own day (0.0 without news), so
+news from weekends and holidays counts towards the next trading day.
+decayed_sentiment takes one decay step per trading row, as 'final training.csv'
+was built (add_decayed_sentiment_per_ticker with gap_aware=False):
+
+    decayed_t = decayed_{t-1} * decay + scale * sentiment_t
+
+so a new trading day only needs the previous row. Any change to an earlier
+row (new articles, a newly registered trading day) re-rolls the rows after
+it in one vectorized pass (decay_series).
+"""
+import os
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import SENTIMENT_STORE_PATH, SENTIMENT_DECAY, SENTIMENT_DECAY_SCALE
+from .sentiment import article_text, get_sentiment_engine
+
+# Closed-form decay is evaluated in blocks so decay**-k stays well inside float range
+_DECAY_BLOCK = 256
+# Below this, decay**-k over a block leaves float range; such a fast decay uses the plain recurrence
+_MIN_BLOCK_POWER = 1e-280
+
+
+def _day(value) -> int:
+    if isinstance(value, str):
+        value = value[:10]
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def _day_str(day: int) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def check_decay(decay: float):
+    if not 0.0 < decay <= 1.0:
+        raise ValueError(f"Sentiment decay must be in (0, 1], got {decay}")
+
+
+def decay_series(values: np.ndarray, decay: float, scale: float = 1.0, initial: float = 0.0) -> np.ndarray:
+    """
+    out[t] = out[t-1] * decay + scale * values[t], with out[-1] = initial,
+    for consecutive trading rows. Vectorized: within a block,
+    out[j] = decay**(j+1) * carry + decay**j * cumsum(scale * values[k] * decay**-k).
+    Raises ValueError unless 0 < decay <= 1.
+    """
+    check_decay(decay)
+    values = np.asarray(values, dtype=np.float64) * scale
+    out = np.empty_like(values)
+    carry = float(initial)
+    if decay ** (_DECAY_BLOCK - 1) < _MIN_BLOCK_POWER:
+        for t, value in enumerate(values):
+            carry = out[t] = carry * decay + value
+        return out
+    for start in range(0, len(values), _DECAY_BLOCK):
+        block = values[start:start + _DECAY_BLOCK]
+        powers = decay ** np.arange(len(block), dtype=np.float64)
+        out[start:start + len(block)] = decay * powers * carry + powers * np.cumsum(block / powers)
+        carry = out[start + len(block) - 1]
+    return out
+
+
+def article_key(article: Dict) -> str:
+    """Articles are identified by URL, or by a hash of their text when there is none."""
+    url = (article.get("url") or "").strip()
+    if url:
+        return url
+    return "sha256:" + hashlib.sha256(article_text(article).encode("utf-8")).hexdigest()
+
+
+class SentimentStore:
+    def __init__(self, path: str = SENTIMENT_STORE_PATH, engine=None,
+                 decay: float = SENTIMENT_DECAY, scale: float = SENTIMENT_DECAY_SCALE):
+        self.path = path
+        check_decay(decay)
+        self.decay = decay
+        self.scale = scale
+        self._engine = engine
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                ticker TEXT NOT NULL, article_key TEXT NOT NULL, day TEXT NOT NULL, score REAL NOT NULL,
+                PRIMARY KEY (ticker, article_key));
+            CREATE TABLE IF NOT EXISTS daily (
+                ticker TEXT NOT NULL, day TEXT NOT NULL, total REAL NOT NULL, count INTEGER NOT NULL,
+                PRIMARY KEY (ticker, day));
+            CREATE TABLE IF NOT EXISTS trading (
+                ticker TEXT NOT NULL, day TEXT NOT NULL, sentiment REAL NOT NULL DEFAULT 0.0,
+                decayed REAL, PRIMARY KEY (ticker, day));
+            CREATE TABLE IF NOT EXISTS companies (ticker TEXT PRIMARY KEY, name TEXT NOT NULL);
+        """)
+        self._conn.commit()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = get_sentiment_engine()
+        return self._engine
+
+    # -------------------- Companies -------------------- #
+    def company_name(self, ticker: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT name FROM companies WHERE ticker = ?", (ticker,)).fetchone()
+        return row[0] if row else None
+
+    def set_company_name(self, ticker: str, name: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO companies (ticker, name) VALUES (?, ?)", (ticker, name))
+            self._conn.commit()
+
+    # -------------------- Writes -------------------- #
+    def fetched_days(self, ticker: str, start: str, end: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day FROM daily WHERE ticker = ? AND day BETWEEN ? AND ?", (ticker, start, end)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def add_articles(self, ticker: str, articles_by_day: Dict[str, List[Dict]]) -> int:
+        """
+        Record the news fetched for some days (an empty list marks a day with no
+        news). Articles already stored for the ticker are skipped, the rest are
+        scored in one batch. Returns how many new articles were counted.
+        """
+        return self.add_articles_many({ticker: articles_by_day})[ticker]
+
+    def add_articles_many(self, news: Dict[str, Dict[str, List[Dict]]]) -> Dict[str, int]:
+        """
+        add_articles for several tickers ({ticker: {day: articles}}): the new
+        articles of every ticker are scored in a single engine call. Returns
+        how many new articles were counted per ticker.
+        """
+        fresh = {ticker: self._unseen(ticker, by_day) for ticker, by_day in news.items() if by_day}
+        flat = [article_text(a) for articles in fresh.values() for _, a in articles.values()]
+        scores = iter(self.engine.score_texts(flat) if flat else [])
+        for ticker, articles in fresh.items():
+            self._record(ticker, list(news[ticker]), articles, [next(scores) for _ in articles])
+        return {ticker: len(fresh.get(ticker, ())) for ticker in news}
+
+    def _unseen(self, ticker: str, articles_by_day: Dict[str, List[Dict]]) -> Dict[str, Tuple[str, Dict]]:
+        """{article_key: (day, article)} for the articles not yet stored for ticker."""
+        fresh: Dict[str, Tuple[str, Dict]] = {}
+        for day, articles in articles_by_day.items():
+            for article in articles:
+                fresh.setdefault(article_key(article), (day, article))
+        with self._lock:
+            keys = list(fresh)
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                known = self._conn.execute(
+                    f"SELECT article_key FROM articles WHERE ticker = ? AND article_key IN ({','.join('?' * len(chunk))})",
+                    [ticker, *chunk],
+                ).fetchall()
+                for (key,) in known:
+                    fresh.pop(key, None)
+        return fresh
+
+    def _record(self, ticker: str, days: List[str], fresh: Dict[str, Tuple[str, Dict]], scores: List[float]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO articles (ticker, article_key, day, score) VALUES (?, ?, ?, ?)",
+                [(ticker, key, day, score) for (key, (day, _)), score in zip(fresh.items(), scores)],
+            )
+            # Aggregates are recomputed from the articles table, so a concurrent
+            # writer that scored the same article cannot count it twice
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO daily (ticker, day, total, count) VALUES (?, ?, 0.0, 0)",
+                [(ticker, day) for day in days],
+            )
+            self._conn.execute(
+                f"""UPDATE daily SET
+                        total = (SELECT COALESCE(SUM(score), 0.0) FROM articles a
+                                 WHERE a.ticker = daily.ticker AND a.day = daily.day),
+                        count = (SELECT COUNT(*) FROM articles a
+                                 WHERE a.ticker = daily.ticker AND a.day = daily.day)
+                    WHERE ticker = ? AND day IN ({','.join('?' * len(days))})""",
+                [ticker, *days],
+            )
+            self._roll_forward(ticker, min(days))
+            self._conn.commit()
+
+    def add_trading_days(self, ticker: str, days) -> int:
+        """
+        Register trading days (YYYY-MM-DD) for ticker; only these get a decay
+        step. Returns how many were new; the rows from the earliest new one on
+        are re-rolled.
+        """
+        days = sorted({str(day)[:10] for day in days})
+        if not days:
+            return 0
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO trading (ticker, day) VALUES (?, ?)",
+                                   [(ticker, day) for day in days])
+            added = self._conn.total_changes - before
+            if added:
+                first = self._conn.execute(
+                    f"SELECT MIN(day) FROM trading WHERE ticker = ? AND decayed IS NULL AND day IN "
+                    f"({','.join('?' * len(days))})", [ticker, *days],
+                ).fetchone()[0]
+                self._roll_forward(ticker, first)
+            self._conn.commit()
+        return added
+
+    def last_trading_day(self, ticker: str) -> Optional[str]:
+        with self._lock:
+            return self._conn.execute("SELECT MAX(day) FROM trading WHERE ticker = ?", (ticker,)).fetchone()[0]
+
+    def _roll_forward(self, ticker: str, from_day: str):
+        """
+        Recompute sentiment and decayed for every trading row on or after the
+        first one that holds news of from_day (caller holds the lock).
+        """
+        prev = self._conn.execute(
+            "SELECT day, decayed FROM trading WHERE ticker = ? AND day < ? ORDER BY day DESC LIMIT 1",
+            (ticker, from_day),
+        ).fetchone()
+        rows = [r[0] for r in self._conn.execute(
+            "SELECT day FROM trading WHERE ticker = ? AND day >= ? ORDER BY day", (ticker, from_day),
+        ).fetchall()]
+        if not rows:
+            return
+        # The first trading row on record only holds its own day's news
+        lower = prev[0] if prev else _day_str(_day(rows[0]) - 1)
+        news = self._conn.execute(
+            "SELECT day, SUM(score), COUNT(*) FROM articles WHERE ticker = ? AND day > ? AND day <= ? GROUP BY day",
+            (ticker, lower, rows[-1]),
+        ).fetchall()
+        totals, counts = np.zeros(len(rows)), np.zeros(len(rows), dtype=np.int64)
+        if news:
+            # Each news day belongs to the first trading row on or after it
+            slot = np.searchsorted(np.array(rows), np.array([n[0] for n in news]), side="left")
+            np.add.at(totals, slot, [n[1] for n in news])
+            np.add.at(counts, slot, [n[2] for n in news])
+        sentiment = np.round(np.divide(totals, counts, out=np.zeros(len(rows)), where=counts > 0), 4)
+        decayed = decay_series(sentiment, self.decay, self.scale, initial=(prev[1] or 0.0) if prev else 0.0)
+        self._conn.executemany(
+            "UPDATE trading SET sentiment = ?, decayed = ? WHERE ticker = ? AND day = ?",
+            [(float(v), float(d), ticker, day) for v, d, day in zip(sentiment, decayed, rows)],
+        )
+
+    # -------------------- Reads -------------------- #
+    def sentiment_at(self, ticker: str, day: str) -> Tuple[float, float]:
+        """(decayed_sentiment, raw sentiment) of the last trading row on or before day."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sentiment, decayed FROM trading WHERE ticker = ? AND day <= ? ORDER BY day DESC LIMIT 1",
+                (ticker, str(day)[:10]),
+            ).fetchone()
+        if row is None:
+            return 0.0, 0.0
+        return row[1] or 0.0, row[0]
+
+    def decayed_range(self, ticker: str, start: str, end: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(trading days, decayed_sentiment, raw sentiment) for the trading rows in [start, end]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, decayed, sentiment FROM trading WHERE ticker = ? AND day BETWEEN ? AND ? ORDER BY day",
+                (ticker, start, end),
+            ).fetchall()
+        days = np.array([r[0] for r in rows], dtype="datetime64[D]")
+        return days, np.array([r[1] or 0.0 for r in rows]), np.array([r[2] for r in rows], dtype=np.float64)
+
+
+@lru_cache(maxsize=1)
+def get_sentiment_store() -> SentimentStore:
+    return SentimentStore(SENTIMENT_STORE_PATH)
@@ -0,0 +1,220 @@
+# app/worker.py
+"""
+Scoring worker: runs the daily cron and on-demand score jobs outside the
+API processes.
+
+    python -m app.worker            (from new_backend/, with SCORING_WORKER=true on the API)
+
+Any number of workers can run. Each one pulls jobs from the shared queue
+(app/jobs.py) one at a time, renewing the job's lease while it works. The
+cron only fires on the worker that holds the leader lock, and the daily job
+it enqueues is keyed by date, so it runs once per day however many workers
+(or API processes) exist.
+
+Job kinds:
+  daily_scoring : tasks.run_daily_scoring_job()
+  score_ticker  : tasks.score_ticker_on_date(payload["ticker"], payload["date"])
+"""
+import os
+import json
+import time
+import signal
+import socket
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict
+
+import pytz
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from . import database
+from .jobs import get_job_queue
+from .metrics import JOB_SECONDS
+from .config import (JOB_LEASE_SECONDS, JOB_POLL_SECONDS, JOB_RETRY_SECONDS, JOB_FAILURE_REUSE_SECONDS, PRELOAD_MODELS,
+                     WORKER_METRICS_PORT)
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_TIMEZONE = pytz.timezone("Asia/Kolkata")
+LEADER_LOCK = "scoring-cron"
+
+
+def enqueue_daily_job(queue=None, day: str = None) -> Dict:
+    """Queue today's daily scoring run (a no-op while that day's run is queued or running)."""
+    queue = queue or get_job_queue()
+    day = day or datetime.now(SCHEDULER_TIMEZONE).strftime('%Y-%m-%d')
+    return queue.enqueue("daily_scoring", {"date": day}, dedupe_key=f"daily:{day}")
+
+
+def enqueue_score_job(ticker: str, date: str, queue=None) -> Dict:
+    """
+    Queue an on-the-fly score for (ticker, date); concurrent requests share one
+    job. A job for it that failed in the last JOB_FAILURE_REUSE_SECONDS (e.g. an
+    invalid symbol) is returned instead, so repeated requests don't requeue it.
+    """
+    queue = queue or get_job_queue()
+    payload = {"ticker": ticker, "date": date}
+    failed = queue.recent_failure("score_ticker", payload, JOB_FAILURE_REUSE_SECONDS)
+    if failed is not None:
+        return failed
+    return queue.enqueue("score_ticker", payload, dedupe_key=f"score:{ticker}:{date}")
+
+
+def _run_daily(payload: Dict):
+    from .tasks import run_daily_scoring_job
+    return run_daily_scoring_job()
+
+
+def _run_score(payload: Dict):
+    from .tasks import score_ticker_on_date
+    document = score_ticker_on_date(payload["ticker"], payload["date"])
+    # Stored on the job as plain JSON (dates as strings, numpy scalars as floats)
+    return json.loads(json.dumps(document, default=str))
+
+
+HANDLERS: Dict[str, Callable[[Dict], object]] = {
+    "daily_scoring": _run_daily,
+    "score_ticker": _run_score,
+}
+
+
+class ScoringWorker:
+    def __init__(self, queue=None, worker_id: str = None, poll_seconds: float = JOB_POLL_SECONDS,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        self.queue = queue or get_job_queue()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._current = None
+        self.is_leader = False
+
+    # -------------------- Leadership -------------------- #
+    def _renew_leadership(self):
+        was_leader = self.is_leader
+        try:
+            self.is_leader = self.queue.acquire_lock(LEADER_LOCK, self.worker_id, self.lease_seconds)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not renew the leader lock: {e}")
+            self.is_leader = False
+        if self.is_leader != was_leader:
+            logger.info(f"{'👑 Became' if self.is_leader else 'ℹ️ No longer'} the cron leader ({self.worker_id}).")
+
+    def _on_cron(self):
+        if not self.is_leader:
+            return
+        job = enqueue_daily_job(self.queue)
+        logger.info(f"🗓️ Daily scoring job {job['id']} queued.")
+
+    def _heartbeat_loop(self):
+        # Renews the leader lock and the current job's lease well before either expires
+        interval = self.lease_seconds / 3
+        while not self._stop.wait(interval):
+            self._renew_leadership()
+            job = self._current
+            if job is not None and not self.queue.heartbeat(job["id"], self.worker_id):
+                logger.warning(f"⚠️ Lost the lease on job {job['id']}; another worker may run it again.")
+
+    # -------------------- Jobs -------------------- #
+    def run_job(self, job: Dict):
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            self.queue.fail(job["id"], self.worker_id, f"Unknown job kind '{job['kind']}'")
+            return
+        if job["attempts"] > self.queue.max_attempts:
+            # Reclaimed after its workers kept dying mid-run
+            self.queue.fail(job["id"], self.worker_id, "Gave up after repeated lost leases")
+            return
+
+        started = time.perf_counter()
+        self._current = job
+        fields = {"job_id": job["id"], "kind": job["kind"], "attempt": job["attempts"]}
+        outcome = "failed"
+        try:
+            result = handler(job["payload"])
+        except ValueError as e:
+            # Bad symbol / no data: retrying will not help
+            self.queue.fail(job["id"], self.worker_id, str(e))
+            logger.error(f"❌ Job {job['id']} ({job['kind']} {job['payload']}) failed: {e}", extra=fields)
+        except Exception as e:
+            retry = job["attempts"] < self.queue.max_attempts
+            delay = JOB_RETRY_SECONDS * 2 ** (job["attempts"] - 1)
+            self.queue.fail(job["id"], self.worker_id, str(e), retry=retry, delay=delay)
+            outcome = "retry" if retry else "failed"
+            logger.error(f"❌ Job {job['id']} ({job['kind']} {job['payload']}) failed"
+                         f"{f', retrying in {delay:.0f}s' if retry else ''}: {e}", extra=fields)
+        else:
+            self.queue.complete(job["id"], self.worker_id, result)
+            outcome = "done"
+            logger.info(f"✅ Job {job['id']} ({job['kind']} {job['payload']}) done in "
+                        f"{time.perf_counter() - started:.2f}s.", extra=fields)
+        finally:
+            self._current = None
+            JOB_SECONDS.observe(time.perf_counter() - started, kind=job["kind"], outcome=outcome)
+
+    def run_once(self) -> bool:
+        """Claim and run one job; False when the queue was empty."""
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def run(self):
+        # The worker writes scores too, and may be started before any API process
+        database.ensure_indexes()
+        self.queue.ensure_indexes()
+        self._renew_leadership()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True)
+        heartbeat.start()
+
+        scheduler = BackgroundScheduler(timezone=SCHEDULER_TIMEZONE)
+        scheduler.add_job(self._on_cron, 'cron', day_of_week='mon-fri', hour=20, minute=0)
+        scheduler.start()
+        logger.info(f"Scoring worker {self.worker_id} started. Daily job scheduled for 8:00 PM IST (Mon-Fri) "
+                    f"on the leader.")
+        try:
+            while not self._stop.is_set():
+                try:
+                    busy = self.run_once()
+                except Exception as e:
+                    logger.warning(f"⚠️ Job queue unavailable: {e}")
+                    busy = False
+                if not busy:
+                    self._stop.wait(self.poll_seconds)
+        finally:
+            scheduler.shutdown()
+            if self.is_leader:
+                self.queue.release_lock(LEADER_LOCK, self.worker_id)
+            logger.info("Scoring worker shut down.")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the scoring worker, or queue a job for it.")
+    parser.add_argument("--enqueue-daily", action="store_true", help="queue today's daily scoring run and exit")
+    parser.add_argument("--score", nargs=2, metavar=("TICKER", "DATE"), help="queue one on-the-fly score and exit")
+    args = parser.parse_args()
+
+    if args.enqueue_daily:
+        print(enqueue_daily_job())
+    elif args.score:
+        print(enqueue_score_job(args.score[0].upper(), args.score[1]))
+    else:
+        from .log import configure_logging
+        configure_logging()
+        if WORKER_METRICS_PORT:
+            from .metrics import serve
+            serve(WORKER_METRICS_PORT)
+        if PRELOAD_MODELS:
+            from . import inference
+            inference.preload()
+        worker = ScoringWorker()
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        worker.run()
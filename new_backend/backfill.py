@@ -1,81 +1,305 @@
 # backfill_historical_data.py (CSV-First Logic)
+"""
+Streaming, resumable backfill of historical scores from a feature file
+('final training.csv' by default, or any CSV / Parquet file with the
+feature columns).
 
-import pandas as pd
-from datetime import datetime, timedelta
+The file is read in chunks; each chunk is scored in one vectorized pass
+(plus a batched SHAP pass), written with bulk upserts, and then a
+checkpoint is recorded. A rerun with the same arguments resumes after the
+last checkpointed chunk. With SHAP enabled and --workers > 1, chunks are
+scored in a process pool while the parent writes them in file order.
+With --sentiment, the news sentiment store is then filled over the same
+dates for the same tickers (one news fetch per missing day), so scores
+computed on the fly afterwards decay from real news history.
+
+Usage (from new_backend/):
+    python backfill.py [--file "final training.csv"] [--start 2023-01-01] [--end 2024-12-31]
+                       [--tickers AAPL,MSFT] [--workers 4] [--chunk-size 5000]
+                       [--no-shap] [--overwrite] [--restart] [--sentiment]
+"""
+import os
+import json
 import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
 
 # Import only the necessary functions from your app
-from app.inference import calculate_creditworthiness_with_explain
-from app.database import save_score_data
+from app.config import TRAINING_CSV_PATH, BACKFILL_CHUNK_SIZE, BACKFILL_CHECKPOINT_PATH
+from app.inference import score_batch, explain_batch
+from app.database import ensure_indexes, build_score_document, save_scores_bulk
+from app.log import configure_logging
 
-def run_historical_backfill_from_csv():
+logger = logging.getLogger("app.backfill")
+
+
+# -------------------- Reading -------------------- #
+def iter_feature_chunks(path: str, chunk_size: int, skip_rows: int = 0) -> Iterator[pd.DataFrame]:
     """
-    Calculates and stores scores using only the pre-computed data from
-    'final training.csv' for the last 2 years. This is the correct and
-    efficient way to populate historical data.
+    Yield the feature file in chunks of at most chunk_size raw rows, starting
+    after skip_rows rows. Parquet files are read batch by batch (row groups
+    before skip_rows are not read at all).
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        row_groups = []
+        for i in range(parquet.num_row_groups):
+            rows = parquet.metadata.row_group(i).num_rows
+            if skip_rows >= rows and not row_groups:
+                skip_rows -= rows
+            else:
+                row_groups.append(i)
+        for batch in parquet.iter_batches(batch_size=chunk_size, row_groups=row_groups):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows).to_pandas()
+            skip_rows = 0
+        return
+    reader = pd.read_csv(path, chunksize=chunk_size, skiprows=range(1, skip_rows + 1))
+    for chunk in reader:
+        yield chunk
+
+
+def select_rows(chunk: pd.DataFrame, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp],
+                tickers: Optional[set]) -> pd.DataFrame:
+    chunk = chunk[chunk["ticker"].notna()].copy()
+    chunk["date"] = pd.to_datetime(chunk["date"])
+    mask = pd.Series(True, index=chunk.index)
+    if start is not None:
+        mask &= chunk["date"] >= start
+    if end is not None:
+        mask &= chunk["date"] <= end
+    if tickers:
+        mask &= chunk["ticker"].isin(tickers)
+    return chunk[mask]
+
+
+# -------------------- Scoring -------------------- #
+def score_chunk(chunk: pd.DataFrame, include_shap: bool) -> List[Dict]:
+    """Score (and optionally explain) one chunk; returns the score documents."""
+    if chunk.empty:
+        return []
+    scores, probs = score_batch(chunk, method="weighted")
+    explanations = explain_batch(chunk) if include_shap else [{}] * len(chunk)
+    chunk = chunk.assign(date=chunk["date"].dt.strftime('%Y-%m-%d'))
+    return [
+        build_score_document(
+            features,
+            float(scores[i]),
+            {label: float(p[i]) for label, p in probs.items()},
+            explanations[i],
+        )
+        for i, features in enumerate(chunk.to_dict("records"))
+    ]
+
+
+# -------------------- Checkpoints -------------------- #
+def _run_key(path: str, start: Optional[str], end, tickers, include_shap: bool, chunk_size: int) -> Dict:
+    stat = os.stat(path)
+    return {
+        "file": os.path.abspath(path), "mtime": stat.st_mtime, "size": stat.st_size,
+        "start": start,
+        "end": str(end.date()) if end is not None else None,
+        "tickers": sorted(tickers) if tickers else None,
+        "include_shap": include_shap, "chunk_size": chunk_size,
+    }
+
+
+def _fresh_checkpoint(run_key: Dict, start: Optional[str] = None) -> Dict:
+    return {"run": run_key, "start": start, "rows_read": 0, "rows_written": 0, "last_ticker": None,
+            "last_date": None, "finished": False}
+
+
+def load_checkpoint(path: str, run_key: Dict, start: Optional[str] = None) -> Dict:
+    """The saved progress for this exact run, or a fresh one starting at start."""
+    try:
+        with open(path) as fh:
+            checkpoint = json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        checkpoint = None
+    if checkpoint and checkpoint.get("run") == run_key:
+        return checkpoint
+    if checkpoint:
+        logger.info("ℹ️ Checkpoint belongs to a different file or arguments; starting from the beginning.")
+    return _fresh_checkpoint(run_key, start)
+
+
+def save_checkpoint(path: str, checkpoint: Dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(checkpoint, fh, indent=2)
+    os.replace(tmp, path)
+
+
+# -------------------- Backfill -------------------- #
+def _scored_chunks(chunks: Iterator[Tuple[int, pd.DataFrame]], include_shap: bool,
+                   workers: int) -> Iterator[Tuple[int, pd.DataFrame, List[Dict]]]:
+    """Yield (raw rows, selected rows, documents) per chunk, in file order."""
+    if workers <= 1 or not include_shap:
+        for raw_rows, chunk in chunks:
+            yield raw_rows, chunk, score_chunk(chunk, include_shap)
+        return
+    # SHAP dominates: fan chunks out to processes, keeping a bounded window in flight
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for raw_rows, chunk in chunks:
+            pending.append((raw_rows, chunk, pool.submit(score_chunk, chunk, include_shap)))
+            if len(pending) >= workers * 2:
+                raw, selected, future = pending.pop(0)
+                yield raw, selected, future.result()
+        for raw, selected, future in pending:
+            yield raw, selected, future.result()
+
+
+def run_streaming_backfill(path: str = TRAINING_CSV_PATH, start: Optional[str] = None, end: Optional[str] = None,
+                           tickers: Optional[List[str]] = None, workers: int = 1,
+                           chunk_size: int = BACKFILL_CHUNK_SIZE, include_shap: bool = True,
+                           overwrite: bool = False, checkpoint_path: str = BACKFILL_CHECKPOINT_PATH,
+                           restart: bool = False, lookback_days: Optional[int] = None) -> Dict:
     """
-    print("🚀 Starting CSV-based historical data backfill.")
+    Score every row of the feature file within [start, end] (and tickers, if
+    given), chunk by chunk, resuming from the checkpoint of an interrupted
+    run with the same arguments. Without start, lookback_days picks a start
+    relative to today; it is resolved once and kept in the checkpoint, so a
+    resume on a later day continues the same run. Returns the final checkpoint.
+    """
+    end_ts = pd.Timestamp(end) if end else None
+    ticker_set = set(tickers) if tickers else None
+    # The run is identified by what was asked for, not by the date a relative start resolves to
+    start_spec = start or (f"{lookback_days}d" if lookback_days else None)
+    run_key = _run_key(path, start_spec, end_ts, ticker_set, include_shap, chunk_size)
+    resolved = start or ((datetime.now() - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+                         if lookback_days else None)
+    checkpoint = _fresh_checkpoint(run_key, resolved) if restart else \
+        load_checkpoint(checkpoint_path, run_key, resolved)
+    start = checkpoint["start"] = checkpoint.get("start", resolved)
+    start_ts = pd.Timestamp(start) if start else None
+    if checkpoint["finished"]:
+        logger.info(f"ℹ️ This backfill already finished ({checkpoint['rows_written']} rows); use --restart to run it again.")
+        return checkpoint
+    if checkpoint["rows_read"]:
+        logger.info(f"Resuming after {checkpoint['rows_read']} rows "
+                    f"(last {checkpoint['last_ticker']} {checkpoint['last_date']}).")
+
+    ensure_indexes()
+    skip = checkpoint["rows_read"]
+    chunks = (
+        (len(raw), select_rows(raw, start_ts, end_ts, ticker_set))
+        for raw in iter_feature_chunks(path, chunk_size, skip_rows=skip)
+    )
+
+    started = time.perf_counter()
+    rows_this_run = 0
+    for raw_rows, chunk, documents in _scored_chunks(chunks, include_shap, workers):
+        counts = save_scores_bulk(documents, overwrite=overwrite) if documents else {}
+        checkpoint["rows_read"] += raw_rows
+        checkpoint["rows_written"] += len(documents)
+        if documents:
+            checkpoint["last_ticker"] = documents[-1]["ticker"]
+            checkpoint["last_date"] = documents[-1]["date"]
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        rows_this_run += len(documents)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Chunk done: {len(documents)}/{raw_rows} rows selected "
+                    f"(inserted {counts.get('inserted', 0)}, updated {counts.get('updated', 0)}, "
+                    f"existing {counts.get('existing', 0)}) | {checkpoint['rows_read']} rows read | "
+                    f"{rows_this_run / elapsed if elapsed else 0:.0f} rows/s")
+
+    checkpoint["finished"] = True
+    save_checkpoint(checkpoint_path, checkpoint)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Backfilled {rows_this_run} rows in {elapsed:.2f}s "
+                f"({rows_this_run / elapsed if elapsed else 0:.0f} rows/s, workers={workers}, shap={include_shap}).")
+    return checkpoint
+
 
+def _file_tickers(path: str) -> List[str]:
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        column = pq.read_table(path, columns=["ticker"]).column("ticker").to_pandas()
+    else:
+        column = pd.read_csv(path, usecols=["ticker"])["ticker"]
+    return sorted(column.dropna().astype(str).unique())
+
+
+def backfill_news_sentiment(path: str, start: str, end: Optional[str] = None,
+                            tickers: Optional[List[str]] = None) -> int:
+    """
+    Fill the news sentiment store over [start, end] (default: today) for
+    tickers, or every ticker in the feature file. Returns how many were filled.
+    """
+    from app.inference import backfill_sentiment
+    end = end or datetime.now().strftime('%Y-%m-%d')
+    filled = 0
+    for ticker in tickers or _file_tickers(path):
+        try:
+            days, decayed, _ = backfill_sentiment(ticker, start, end)
+        except Exception as e:
+            logger.error(f"❌ Sentiment backfill failed for {ticker}: {e}", extra={"ticker": ticker})
+            continue
+        filled += 1
+        logger.info(f"Sentiment for {ticker}: {len(days)} days, latest decayed_sentiment "
+                    f"{decayed[-1] if len(decayed) else 0.0:.4f}.", extra={"ticker": ticker})
+    return filled
+
+
+def run_historical_backfill_from_csv(include_shap: bool = True):
+    """
+    Calculates and stores scores using only the pre-computed data from
+    'final training.csv' for the last 2 years, via the streaming backfill.
+    """
+    logger.info("🚀 Starting CSV-based historical data backfill.")
     try:
-        # 1. Load the pre-computed training data
-        print("Loading 'final training.csv'...")
-        training_df = pd.read_csv("final training.csv", parse_dates=["date"])
-        print(f"Loaded {len(training_df)} rows from CSV.")
-
-        # 2. Define the date range and filter the dataframe
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365 * 2)
-        
-        df_to_process = training_df[training_df["date"] >= start_date].copy()
-        print(f"Processing {len(df_to_process)} rows from the last 2 years.")
-
-        if df_to_process.empty:
-            print("⚠️ No data found in 'final training.csv' for the last 2 years. Backfill complete.")
-            return
-
-        # 3. Iterate through each row of the filtered dataframe
-        for index, row in df_to_process.iterrows():
-            try:
-                # 4. Extract features directly from the row
-                features = row.to_dict()
-                
-                # Ensure date is a string in the correct format for the database
-                features['date'] = features['date'].strftime('%Y-%m-%d')
-                
-                ticker = features.get("ticker")
-                if not ticker:
-                    print(f"⚠️ Skipping row {index} due to missing ticker.")
-                    continue
-
-                print(f"Processing {ticker} for date {features['date']} from CSV...")
-
-                # 5. Calculate score and explanations using the data from the CSV row
-                creditworthiness, probs, shap_metadata = calculate_creditworthiness_with_explain(features, method="weighted")
-                
-                # 6. Prepare the full data object for storage
-                score_data = {
-                    "ticker": ticker,
-                    "date": features['date'],
-                    "creditworthiness": creditworthiness,
-                    "risk_probs": probs,
-                    "shap_explanations": shap_metadata,
-                    "features": {k: v for k, v in features.items() if k not in ['ticker', 'date']}
-                }
-                
-                # 7. Save to DB
-                save_score_data(score_data)
-
-            except Exception as e:
-                print(f"❌ Error processing row {index} for ticker {features.get('ticker', 'N/A')}: {e}")
-        
+        run_streaming_backfill(TRAINING_CSV_PATH, lookback_days=365 * 2, include_shap=include_shap)
     except FileNotFoundError:
-        print("❌ CRITICAL ERROR: 'final training.csv' not found. Cannot run backfill.")
+        logger.critical(f"❌ CRITICAL ERROR: '{TRAINING_CSV_PATH}' not found. Cannot run backfill.")
         return
     except Exception as e:
-        print(f"❌ A major error occurred during the backfill process: {e}")
+        logger.exception(f"❌ A major error occurred during the backfill process: {e}")
+        return
 
-    print("\n✅✅ CSV-based historical data backfill finished! ✅✅")
+    logger.info("✅✅ CSV-based historical data backfill finished! ✅✅")
 
 
 if __name__ == "__main__":
-    run_historical_backfill_from_csv()
+    parser = argparse.ArgumentParser(description="Stream historical scores from a feature file into MongoDB.")
+    parser.add_argument("--file", default=TRAINING_CSV_PATH, help="CSV or Parquet file with feature columns")
+    parser.add_argument("--start", help="first date to score (YYYY-MM-DD); default: 2 years ago")
+    parser.add_argument("--end", help="last date to score (YYYY-MM-DD)")
+    parser.add_argument("--tickers", help="comma-separated tickers to include")
+    parser.add_argument("--workers", type=int, default=1, help="scoring processes when SHAP is enabled")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    parser.add_argument("--no-shap", action="store_true", help="skip SHAP explanations")
+    parser.add_argument("--overwrite", action="store_true", help="replace existing scores")
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    parser.add_argument("--sentiment", action="store_true",
+                        help="then fill the news sentiment store over the same dates (fetches news)")
+    args = parser.parse_args()
+
+    configure_logging()
+    tickers = [t.strip().upper() for t in args.tickers.split(",")] if args.tickers else None
+    checkpoint = run_streaming_backfill(
+        args.file,
+        start=args.start,
+        lookback_days=None if args.start else 365 * 2,
+        end=args.end,
+        tickers=tickers,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        include_shap=not args.no_shap,
+        overwrite=args.overwrite,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+    )
+    if args.sentiment:
+        backfill_news_sentiment(args.file, checkpoint["start"], args.end, tickers)
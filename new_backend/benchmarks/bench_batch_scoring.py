@@ -0,0 +1,51 @@
+# benchmarks/bench_batch_scoring.py
+"""
+Rows/sec of score_batch for batch sizes 1..10k, against the per-row
+calculate_creditworthiness_with_explain loop the backfill used to run.
+
+Run from new_backend/:
+    python -m benchmarks.bench_batch_scoring
+"""
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from app.config import TRAINING_CSV_PATH
+from app.inference import feature_cols, score_batch, calculate_creditworthiness_with_explain
+
+
+def _rows_per_sec(fn, n_rows: int, min_seconds: float = 0.5) -> float:
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return runs * n_rows / elapsed
+
+
+def main(batch_sizes, per_row_rows: int):
+    df = pd.read_csv(TRAINING_CSV_PATH)
+    X = df[feature_cols].to_numpy(np.float64)
+    # Tile the training rows so the largest batch is always available
+    reps = int(np.ceil(max(batch_sizes) / len(X)))
+    X = np.tile(X, (reps, 1))
+
+    records = df.head(per_row_rows).to_dict("records")
+    per_row = _rows_per_sec(lambda: [calculate_creditworthiness_with_explain(r) for r in records], len(records))
+    print(f"{'per-row wrapper loop':<24}{per_row:>14,.0f} rows/sec")
+
+    for n in batch_sizes:
+        batch = X[:n]
+        rate = _rows_per_sec(lambda: score_batch(batch), n)
+        print(f"{'score_batch n=' + str(n):<24}{rate:>14,.0f} rows/sec   ({rate / per_row:,.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--per-row-rows", type=int, default=200)
+    args = parser.parse_args()
+    main(args.batch_sizes, args.per_row_rows)
@@ -0,0 +1,116 @@
+# benchmarks/bench_fast_predict.py
+"""
+Parity and latency of the prediction backends in app/fast_predict.py.
+
+Every backend is checked against XGBClassifier.predict_proba on all rows
+of 'final training.csv' (plus a copy with injected missing values), for the
+shipped models and for a small early-stopped model fitted on those rows; the
+script exits non-zero if any probability differs by more than --tolerance.
+Latency is reported per call for a few batch sizes. The suite's score
+group runs the same parity check (assert_parity) before timing anything.
+
+Run from new_backend/:
+    python -m benchmarks.bench_fast_predict [--tolerance 1e-6]
+"""
+import sys
+import time
+import argparse
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import TRAINING_CSV_PATH
+from app.fast_predict import PREDICTION_BACKENDS, CompiledEnsemble, make_predictor
+from app.inference import get_models, feature_cols, scale_features
+
+
+def _seconds_per_call(fn, min_seconds: float = 0.3) -> float:
+    fn()
+    runs, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        fn()
+        runs += 1
+    return (time.perf_counter() - start) / runs
+
+
+def _predictors(models: Optional[Dict] = None) -> Dict[str, Callable]:
+    models = models or get_models()
+    predictors = {backend: make_predictor(models, backend) for backend in PREDICTION_BACKENDS}
+    predictors["compiled (walk only)"] = CompiledEnsemble(models).predict_proba
+    return predictors
+
+
+def _with_missing(X: np.ndarray) -> np.ndarray:
+    X_missing = X.copy()
+    X_missing[::7, 3] = np.nan
+    X_missing[::11, 8] = np.nan
+    return X_missing
+
+
+def _early_stopped_model(X: np.ndarray):
+    """A classifier whose early stopping kept fewer trees than it fitted (best_iteration is set)."""
+    from xgboost import XGBClassifier
+
+    # Noise labels: the validation loss turns up after a few rounds
+    y = np.random.default_rng(0).integers(0, 2, len(X))
+    half = len(X) // 2
+    n_estimators = 200
+    model = XGBClassifier(n_estimators=n_estimators, max_depth=3, learning_rate=0.3,
+                          early_stopping_rounds=5, random_state=0)
+    model.fit(X[:half], y[:half], eval_set=[(X[half:], y[half:])], verbose=False)
+    assert model.best_iteration < n_estimators - 1, "early stopping did not trigger"
+    return model
+
+
+def parity(X: np.ndarray, predictors: Optional[Dict[str, Callable]] = None) -> Dict[Tuple[str, str], float]:
+    """Max |probability difference| from XGBClassifier.predict_proba per (backend, data), scaled X."""
+    model_sets = {
+        "": predictors or _predictors(),
+        ", early-stopped": _predictors({"early_stopped": _early_stopped_model(X)}),
+    }
+    worst = {}
+    for suffix, backends in model_sets.items():
+        for data, name in ((X, "training rows"), (_with_missing(X), "with missing values")):
+            expected = backends["xgboost"](data)
+            for backend, predict in backends.items():
+                got = predict(data)
+                worst[backend, name + suffix] = max(
+                    float(np.abs(got[label] - expected[label]).max()) for label in expected
+                )
+    return worst
+
+
+def assert_parity(X: np.ndarray, tolerance: float = 1e-6):
+    """Raise AssertionError when any backend is further than tolerance from XGBoost."""
+    failed = {f"{backend} / {name}": diff for (backend, name), diff in parity(X).items() if diff > tolerance}
+    assert not failed, f"Prediction backends differ from XGBoost predict_proba by more than {tolerance:g}: {failed}"
+
+
+def main(tolerance: float, batch_sizes) -> bool:
+    X = scale_features(pd.read_csv(TRAINING_CSV_PATH)[feature_cols].to_numpy(np.float64))
+    predictors = _predictors()
+
+    ok = True
+    print(f"rows: {len(X)}   tolerance: {tolerance:g}")
+    for (backend, name), worst in parity(X, predictors).items():
+        ok &= worst <= tolerance
+        print(f"  {backend:<22} {name:<35} max |diff| = {worst:.2e}")
+
+    print("\nlatency per call:")
+    header = "".join(f"{'n=' + str(n):>12}" for n in batch_sizes)
+    print(f"  {'backend':<22}{header}")
+    for backend, predict in predictors.items():
+        cells = "".join(f"{_seconds_per_call(lambda: predict(X[:n])) * 1e6:>10.1f}us" for n in batch_sizes)
+        print(f"  {backend:<22}{cells}")
+
+    print("✅ All backends within tolerance." if ok else "❌ Parity check failed.")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+    sys.exit(0 if main(args.tolerance, args.batch_sizes) else 1)
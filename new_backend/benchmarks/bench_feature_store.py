@@ -0,0 +1,86 @@
+# benchmarks/bench_feature_store.py
+"""
+Compare the legacy chunked CSV scan in load_training_row against the
+memory-mapped feature store, and check that scoring the store's rows gives
+exactly the scores of the CSV's own values (the store keeps them as float64).
+
+Run from new_backend/:
+    python -m benchmarks.bench_feature_store [--lookups 200]
+"""
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from app.config import TRAINING_CSV_PATH
+from app.feature_store import get_feature_store, refresh_feature_store
+
+
+def legacy_load_training_row(ticker: str, dt_target: pd.Timestamp):
+    """The original implementation: re-parse the CSV in 5000-row chunks."""
+    for chunk in pd.read_csv(TRAINING_CSV_PATH, parse_dates=["date"], chunksize=5000):
+        row = chunk[(chunk["ticker"] == ticker) & (chunk["date"] == dt_target)]
+        if not row.empty:
+            return row.iloc[0].to_dict()
+    return None
+
+
+def _time_lookups(fn, queries) -> float:
+    start = time.perf_counter()
+    for ticker, date in queries:
+        fn(ticker, date)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def score_parity(store) -> float:
+    """Largest creditworthiness difference between scoring the store's rows and the CSV's values."""
+    from app.inference import feature_cols, score_batch
+    df = pd.read_csv(TRAINING_CSV_PATH, parse_dates=["date"])
+    df = df.dropna(subset=["ticker", "date"]).drop_duplicates(["ticker", "date"], keep="last")
+    stored = [store.get(ticker, date) for ticker, date in zip(df["ticker"], df["date"])]
+    from_store, _ = score_batch(np.array([[row[c] for c in feature_cols] for row in stored], dtype=np.float64))
+    from_csv, _ = score_batch(df[feature_cols].to_numpy(np.float64))
+    return float(np.nanmax(np.abs(from_store - from_csv)))
+
+
+def main(lookups: int, legacy_lookups: int) -> bool:
+    df = pd.read_csv(TRAINING_CSV_PATH, usecols=["ticker", "date"], parse_dates=["date"])
+    rng = random.Random(0)
+    pairs = list(zip(df["ticker"], df["date"]))
+    queries = [rng.choice(pairs) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    refresh_feature_store(force=True)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = get_feature_store()
+    len(store)
+    open_s = time.perf_counter() - start
+
+    store_get = _time_lookups(store.get, queries)
+    store_latest = _time_lookups(store.get_latest, queries)
+    legacy = _time_lookups(legacy_load_training_row, queries[:legacy_lookups])
+    parity = score_parity(store)
+
+    print(f"rows in store              : {len(store)}")
+    print(f"build (one-off)            : {build_s * 1e3:10.2f} ms")
+    print(f"open + mmap                : {open_s * 1e3:10.2f} ms")
+    print(f"legacy chunked scan        : {legacy * 1e6:10.1f} us/lookup  ({legacy_lookups} lookups)")
+    print(f"store.get                  : {store_get * 1e6:10.1f} us/lookup  ({lookups} lookups)")
+    print(f"store.get_latest           : {store_latest * 1e6:10.1f} us/lookup  ({lookups} lookups)")
+    print(f"speedup (get vs legacy)    : {legacy / store_get:10.0f}x")
+    print(f"score diff, store vs CSV   : {parity:10.2e}")
+    print("✅ Store rows score exactly like the CSV." if parity == 0.0 else "❌ Store rows score differently.")
+    return parity == 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--legacy-lookups", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(0 if main(args.lookups, args.legacy_lookups) else 1)
@@ -0,0 +1,106 @@
+# benchmarks/bench_latest_scores.py
+"""
+/scores/latest read latency as score history grows: the old whole-collection
+$sort/$group aggregation versus reading the latest_scores view.
+
+Runs against mongomock by default (pure Python, so absolute numbers are
+pessimistic); pass --uri to use a real mongod. The legacy aggregation is
+skipped above --legacy-max documents because on mongomock it grows into
+minutes.
+
+Run from new_backend/:
+    python -m benchmarks.bench_latest_scores [--sizes 10000 100000 1000000] [--uri mongodb://...]
+"""
+import os
+import time
+import argparse
+import contextlib
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+from app import database
+
+LEGACY_PIPELINE = [
+    {"$sort": {"date": -1}},
+    {"$group": {
+        "_id": "$ticker",
+        "latest_creditworthiness": {"$first": "$creditworthiness"},
+        "date": {"$first": "$date"},
+        "features": {"$first": "$features"},
+    }},
+    {"$project": {
+        "_id": 0,
+        "ticker": "$_id",
+        "creditworthiness": "$latest_creditworthiness",
+        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+        "features": 1,
+    }},
+]
+
+
+def _database(uri):
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri)
+        client.drop_database("credit_intelligence_bench")
+        return client.credit_intelligence_bench
+    import mongomock
+    return mongomock.MongoClient().credit_intelligence_bench
+
+
+def _documents(n: int, n_tickers: int = 40):
+    start = datetime(2000, 1, 1)
+    for i in range(n):
+        yield {
+            "ticker": f"T{i % n_tickers:02d}",
+            "date": start + timedelta(days=i // n_tickers),
+            "creditworthiness": 600.0 + i % 250,
+            "risk_probs": {"label_5d": 0.1, "label_20d": 0.2, "label_60d": 0.3},
+            "features": {"vol_5d": 0.01, "vol_20d": 0.02, "decayed_sentiment": 0.1},
+        }
+
+
+def _median_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return sorted(samples)[len(samples) // 2]
+
+
+def main(sizes, uri: str, legacy_max: int, repeats: int):
+    print(f"{'history docs':>14}{'legacy aggregate':>20}{'latest_scores view':>22}")
+    for n in sizes:
+        db = _database(uri)
+        database.scores_collection = db.scores
+        database.explanations_collection = db.explanations
+        database.latest_scores_collection = db.latest_scores
+        database.score_writes_collection = db.score_writes
+        database.locks_collection = db.locks
+        # Seed history directly, before indexing (mongomock checks unique indexes
+        # per insert); the write path itself is covered by bench_mongo_writes
+        db.scores.insert_many(_documents(n))
+        database.ensure_indexes()
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            database.rebuild_latest_scores()
+
+        legacy = "skipped"
+        if n <= legacy_max:
+            legacy = f"{_median_ms(lambda: list(db.scores.aggregate(LEGACY_PIPELINE)), repeats):.2f} ms"
+        view = _median_ms(database.get_latest_scores, repeats)
+        print(f"{n:>14,}{legacy:>20}{view:>19.2f} ms")
+
+    if uri:
+        db.client.drop_database("credit_intelligence_bench")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--uri", default=None)
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.uri, args.legacy_max, args.repeats)
@@ -0,0 +1,76 @@
+# benchmarks/bench_market_data.py
+"""
+Exercise the local OHLCV / fundamentals cache against an offline fetcher
+with a simulated round-trip latency, and count the downloads it avoids.
+
+Scenarios, for --tickers tickers:
+  legacy   : one 2-year download plus one `.info` call per ticker (old path)
+  cold     : empty cache, per-ticker history()
+  warm     : same request again (served from disk / memory)
+  next day : one more trading day requested; only the delta is fetched
+  batched  : the daily job's prefetch() for the following day, all tickers at once
+
+Run from new_backend/:
+    python -m benchmarks.bench_market_data [--tickers 12] [--latency-ms 250]
+"""
+import time
+import argparse
+import tempfile
+
+from app.market_data import MarketData
+from benchmarks.stubs import StubMarketFetcher
+
+DAY_0 = "2025-06-02"  # a Monday
+DAY_1 = "2025-06-03"
+DAY_2 = "2025-06-04"
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(n_tickers: int, latency_ms: float):
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    latency = latency_ms / 1e3
+
+    legacy = StubMarketFetcher(latency)
+    _, legacy_s = _timed(lambda: [(legacy.download([t], "2023-06-02", DAY_0), legacy.info(t)) for t in tickers])
+
+    fetcher = StubMarketFetcher(latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        market = MarketData(fetcher, cache_dir=tmp, fundamentals_ttl=86400)
+
+        def run(end):
+            before = len(fetcher.download_calls), fetcher.info_calls
+            _, seconds = _timed(lambda: [
+                (market.history(t, lookback_years=2, end=end), market.fundamentals.get(t)) for t in tickers
+            ])
+            return seconds, len(fetcher.download_calls) - before[0], fetcher.info_calls - before[1]
+
+        cold = run(DAY_0)
+        warm = run(DAY_0)
+        next_day = run(DAY_1)
+
+        before = len(fetcher.download_calls)
+        calls, batched_s = _timed(lambda: market.prefetch(tickers, end=DAY_2))
+        _, after_s = _timed(lambda: [market.history(t, lookback_years=2, end=DAY_2) for t in tickers])
+        bars = len(market.history(tickers[0], lookback_years=2, end=DAY_2))
+
+    print(f"tickers / bars per ticker  : {n_tickers} / {bars}   (simulated latency {latency_ms:.0f} ms)")
+    print(f"legacy (2y + .info each)   : {legacy_s:8.3f} s   downloads={n_tickers}  info={n_tickers}")
+    for name, (seconds, downloads, infos) in (("cold cache", cold), ("warm cache", warm), ("next day (delta)", next_day)):
+        print(f"{name:<27}: {seconds:8.3f} s   downloads={downloads}  info={infos}")
+    print(f"batched prefetch next day  : {batched_s:8.3f} s   downloads={calls} "
+          f"(+ {after_s * 1e3:.1f} ms to read all histories)")
+    delta = fetcher.download_calls[before]
+    print(f"  batch request            : {len(delta[0])} tickers, {delta[1]} .. {delta[2]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=12)
+    parser.add_argument("--latency-ms", type=float, default=250.0)
+    args = parser.parse_args()
+    main(args.tickers, args.latency_ms)
@@ -0,0 +1,154 @@
+# benchmarks/bench_mongo_writes.py
+"""
+Score-write throughput: the old find_one + insert_one per document versus
+save_scores_bulk (unordered upserts on the unique (ticker, date) index).
+
+Both paths write to a collection with the same unique (ticker, date) index.
+save_scores_bulk also fans out to explanations, latest_scores and
+score_writes, so its throughput is reported twice: for the scores writes
+alone (comparable with the old path) and for the whole write.
+
+Runs against an in-process mongomock collection by default. mongomock has
+no network, so every collection call is charged a simulated round trip
+(--rtt-ms, 5 ms by default: a nearby Atlas cluster) to model the
+per-request cost of a remote mongod/Atlas. mongomock also checks unique
+indexes by scanning in Python, a per-document CPU cost a real mongod does
+not have; at small --rtt-ms it hides the round-trip savings. Pass --uri to
+measure a real mongod instead (a throwaway database is created and
+dropped, and no latency is simulated).
+
+Run from new_backend/:
+    python -m benchmarks.bench_mongo_writes [--rows 2000] [--rtt-ms 5] [--uri mongodb://localhost:27017]
+"""
+import os
+import time
+import argparse
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+from pymongo import ASCENDING
+
+from app import database
+
+
+def _documents(n: int):
+    start = datetime(2020, 1, 1)
+    tickers = [f"T{i:02d}" for i in range(40)]
+    return [
+        {
+            "ticker": tickers[i % len(tickers)],
+            "date": start + timedelta(days=i // len(tickers)),
+            "creditworthiness": 700.0,
+            "risk_probs": {"label_5d": 0.1, "label_20d": 0.2, "label_60d": 0.3},
+            "shap_explanations": {},
+            "features": {"vol_5d": 0.01, "vol_20d": 0.02},
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_save(collection, data):
+    existing_doc = collection.find_one({"ticker": data["ticker"], "date": data["date"]})
+    if not existing_doc:
+        collection.insert_one(dict(data))
+
+
+class RoundTripCollection:
+    """Wraps a collection, counting calls and their time and sleeping rtt seconds on each one."""
+
+    def __init__(self, collection, rtt: float):
+        self._collection = collection
+        self._rtt = rtt
+        self.round_trips = 0
+        self.seconds = 0.0
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self.round_trips += 1
+            start = time.perf_counter()
+            try:
+                time.sleep(self._rtt)
+                return attr(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+        return call
+
+
+def _fresh_collection(uri, rtt, name="scores"):
+    if uri:
+        from pymongo import MongoClient
+        collection = MongoClient(uri).credit_intelligence_bench[name]
+        collection.drop()
+        return RoundTripCollection(collection, 0.0)
+    import mongomock
+    return RoundTripCollection(mongomock.MongoClient().credit_intelligence_bench[name], rtt)
+
+
+def main(rows: int, uri: str, batch_size: int, rtt_ms: float):
+    docs = _documents(rows)
+    rtt = rtt_ms / 1e3
+
+    collection = _fresh_collection(uri, rtt, "legacy_scores")
+    # The same unique index ensure_indexes() puts on scores, so both paths pay for it
+    collection.create_index([("ticker", ASCENDING), ("date", ASCENDING)], unique=True, name="ticker_date_unique")
+    collection.round_trips = 0
+    start = time.perf_counter()
+    for doc in docs:
+        legacy_save(collection, doc)
+    legacy = rows / (time.perf_counter() - start)
+    legacy_trips = collection.round_trips
+
+    database.scores_collection = _fresh_collection(uri, rtt)
+    database.explanations_collection = _fresh_collection(uri, rtt, "explanations")
+    database.latest_scores_collection = _fresh_collection(uri, rtt, "latest_scores")
+    database.score_writes_collection = _fresh_collection(uri, rtt, "score_writes")
+    database.locks_collection = _fresh_collection(uri, rtt, "locks")
+    fan_out = (database.explanations_collection, database.latest_scores_collection, database.score_writes_collection)
+    collections = (database.scores_collection,) + fan_out
+    database.ensure_indexes()
+    for collection in collections:
+        collection.round_trips = 0
+        collection.seconds = 0.0
+    start = time.perf_counter()
+    database.save_scores_bulk(docs, batch_size=batch_size)
+    bulk = rows / (time.perf_counter() - start)
+    hot = rows / database.scores_collection.seconds
+    hot_trips = database.scores_collection.round_trips
+    fan_out_trips = sum(collection.round_trips for collection in fan_out)
+    fan_out_seconds = sum(collection.seconds for collection in fan_out)
+    start = time.perf_counter()
+    database.save_scores_bulk(docs, batch_size=batch_size)
+    rerun = rows / (time.perf_counter() - start)
+
+    backend = f"mongod {uri}" if uri else f"mongomock + {rtt_ms:g} ms simulated round trip"
+    print(f"backend                         : {backend}")
+    print(f"find_one + insert_one           : {legacy:>10,.0f} docs/sec  {legacy_trips:>6} round trips")
+    print(f"bulk upsert, scores only        : {hot:>10,.0f} docs/sec  {hot_trips:>6} round trips  "
+          f"({hot / legacy:.1f}x)")
+    print(f"  + explanations/latest/stamps  : {fan_out_seconds * 1e3:>10,.1f} ms        {fan_out_trips:>6} round trips")
+    print(f"{f'bulk upsert total (batch={batch_size})':<32}: {bulk:>10,.0f} docs/sec  "
+          f"{hot_trips + fan_out_trips:>6} round trips  ({bulk / legacy:.1f}x)")
+    print(f"bulk upsert re-run (all exist)  : {rerun:>10,.0f} docs/sec")
+    print(f"documents after re-run          : {database.scores_collection.count_documents({}):>10,}")
+    if not uri:
+        print("note: mongomock scans in Python to enforce unique indexes, a CPU cost per document that a real "
+              "mongod does not have; at a small --rtt-ms it outweighs the saved round trips. Use --uri for "
+              "absolute numbers.")
+
+    if uri:
+        database.scores_collection.database.client.drop_database("credit_intelligence_bench")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--uri", default=None)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    main(args.rows, args.uri, args.batch_size, args.rtt_ms)
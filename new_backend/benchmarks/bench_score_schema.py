@@ -0,0 +1,167 @@
+# benchmarks/bench_score_schema.py
+"""
+Storage and read latency of the legacy score documents (features and
+shap_explanations embedded) versus the compact schema (hot scores plus
+explanations arrays), on real scores with SHAP from 'final training.csv'.
+
+The legacy collection is then migrated with migrate_scores.migrate and
+every detail read is checked against the original document.
+
+Runs against mongomock by default (pure Python, so latencies mostly track
+document size and absolute numbers are pessimistic); pass --uri to use a
+real mongod, which also reports collStats sizes.
+
+Run from new_backend/:
+    python -m benchmarks.bench_score_schema [--tickers 4] [--uri mongodb://...]
+"""
+import os
+import time
+import argparse
+import contextlib
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+import bson
+import numpy as np
+import pandas as pd
+
+from app import database
+from app.config import TRAINING_CSV_PATH
+from backfill import score_chunk, select_rows
+from migrate_scores import collection_stats, migrate
+
+
+def _database(uri):
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri)
+        client.drop_database("credit_intelligence_bench")
+        return client.credit_intelligence_bench
+    import mongomock
+    return mongomock.MongoClient().credit_intelligence_bench
+
+
+def _use(db, prefix: str):
+    database.scores_collection = db[f"{prefix}_scores"]
+    database.explanations_collection = db[f"{prefix}_explanations"]
+    database.latest_scores_collection = db[f"{prefix}_latest_scores"]
+    database.score_writes_collection = db[f"{prefix}_score_writes"]
+    database.locks_collection = db[f"{prefix}_locks"]
+    database.ensure_indexes()
+
+
+def _median_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return float(np.median(samples))
+
+
+def _bytes(collection) -> int:
+    return sum(len(bson.encode(doc)) for doc in collection.find({}))
+
+
+def main(n_tickers: int, uri: str, repeats: int):
+    rows = pd.read_csv(TRAINING_CSV_PATH)
+    tickers = sorted(rows["ticker"].dropna().unique())[:n_tickers]
+    documents = score_chunk(select_rows(rows, None, None, set(tickers)), include_shap=True)
+    for doc in documents:
+        doc["date"] = pd.Timestamp(doc["date"]).to_pydatetime()
+    db = _database(uri)
+
+    # Legacy: the documents exactly as they used to be stored
+    legacy = db.legacy_scores
+    legacy.insert_many([dict(doc) for doc in documents])
+    _use(db, "compact")
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        database.save_scores_bulk(documents)
+
+    legacy_bytes = _bytes(legacy)
+    hot_bytes = _bytes(database.scores_collection)
+    explanation_bytes = _bytes(database.explanations_collection)
+    n = len(documents)
+    print(f"{n:,} scores with SHAP for {len(tickers)} tickers")
+    print(f"{'BSON bytes / score':<36}{'legacy':>12}{'compact':>12}")
+    print(f"{'  scores (every list/history read)':<36}{legacy_bytes / n:>12,.0f}{hot_bytes / n:>12,.0f}"
+          f"   ({1 - hot_bytes / legacy_bytes:.0%} smaller)")
+    print(f"{'  scores + explanations':<36}{legacy_bytes / n:>12,.0f}{(hot_bytes + explanation_bytes) / n:>12,.0f}"
+          f"   ({1 - (hot_bytes + explanation_bytes) / legacy_bytes:.0%} smaller)")
+    if uri:
+        print(f"collStats legacy scores : {collection_stats(legacy)}")
+        print(f"collStats compact scores: {collection_stats(database.scores_collection)}")
+        print(f"collStats explanations  : {collection_stats(database.explanations_collection)}")
+
+    # Reads: the legacy queries as they were, returning whole documents
+    ticker = tickers[0]
+    days = [doc["date"].strftime("%Y-%m-%d") for doc in documents if doc["ticker"] == ticker]
+    it = iter(range(10 ** 9))
+
+    def legacy_history(limit=None):
+        pipeline = [{"$match": {"ticker": ticker}}, {"$sort": {"date": -1}}]
+        if limit:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$addFields": {"_id": {"$toString": "$_id"}, "date": database._DATE_STRING}})
+        return list(legacy.aggregate(pipeline))
+
+    def legacy_detail():
+        day = pd.Timestamp(days[next(it) % len(days)]).to_pydatetime()
+        doc = next(legacy.find({"ticker": ticker, "date": {"$lte": day}}).sort("date", -1).limit(1), None)
+        doc["_id"] = str(doc["_id"])
+        doc["date"] = doc["date"].strftime("%Y-%m-%d")
+        return doc
+
+    reads = {
+        "history (full)": (
+            legacy_history,
+            lambda: database.get_scores_by_ticker(ticker),
+        ),
+        "history (limit=100)": (
+            lambda: legacy_history(limit=100),
+            lambda: database.get_scores_by_ticker(ticker, limit=100),
+        ),
+        "detail (one date)": (
+            legacy_detail,
+            lambda: database.get_score_for_date_or_earlier(ticker, days[next(it) % len(days)]),
+        ),
+    }
+    print(f"\n{'read (median ms)':<36}{'legacy':>12}{'compact':>12}")
+    for name, (old, new) in reads.items():
+        old_ms, new_ms = _median_ms(old, repeats), _median_ms(new, repeats)
+        print(f"{'  ' + name:<36}{old_ms:>12.2f}{new_ms:>12.2f}   ({old_ms / new_ms:.1f}x)")
+
+    # Migrate the legacy collection in place and compare every detail read
+    migrated_explanations = db.legacy_explanations
+    database.scores_collection = legacy
+    database.explanations_collection = migrated_explanations
+    database.latest_scores_collection = db.legacy_latest_scores
+    database.score_writes_collection = db.legacy_score_writes
+    database.locks_collection = db.legacy_locks
+    database.ensure_indexes()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        start = time.perf_counter()
+        count = migrate(batch_size=1000)
+        seconds = time.perf_counter() - start
+    mismatches = 0
+    for doc in documents:
+        served = database.get_score_for_date_or_earlier(doc["ticker"], doc["date"].strftime("%Y-%m-%d"))
+        expected = {f: doc["features"][f] for f in database.EXPLANATION_FEATURES}
+        if served["features"] != expected or served["shap_explanations"] != doc["shap_explanations"] \
+                or served["creditworthiness"] != doc["creditworthiness"]:
+            mismatches += 1
+    print(f"\nmigrated {count:,} legacy documents in {seconds:.2f}s; "
+          f"{legacy.count_documents({'features': {'$exists': True}})} still legacy; "
+          f"{mismatches} detail reads differ from the original")
+
+    if uri:
+        db.client.drop_database("credit_intelligence_bench")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=4)
+    parser.add_argument("--uri", default=None)
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+    main(args.tickers, args.uri, args.repeats)
@@ -0,0 +1,71 @@
+# benchmarks/bench_sentiment.py
+"""
+CPU articles/sec for news sentiment: the old one-pipeline-call-per-article
+loop versus SentimentEngine (deduplicated, length-sorted padded batches
+under inference_mode, with the content-hash cache cold and then warm).
+
+Uses a randomly initialised RoBERTa stand-in so it runs offline.
+
+Run from new_backend/:
+    python -m benchmarks.bench_sentiment [--articles 400] [--batch-size 32] [--threads 0]
+"""
+import time
+import argparse
+
+from transformers import pipeline
+
+from app.sentiment import SentimentCache, SentimentEngine, article_text
+from benchmarks.stubs import build_stub_sentiment_model, stub_articles
+
+
+def legacy_score(pipeline_obj, articles) -> float:
+    """The old analyze_sentiment_with_hf loop: one pipeline call per article."""
+    total_score, count = 0, 0
+    for article in articles:
+        sentiment = pipeline_obj(article_text(article))[0]
+        label, score = sentiment["label"].upper(), sentiment["score"]
+        total_score += score if label == "POSITIVE" else -score if label == "NEGATIVE" else 0.0
+        count += 1
+    return total_score / count
+
+
+def main(n_articles: int, batch_size: int, max_length: int, threads: int, hidden: int, layers: int):
+    tokenizer, model = build_stub_sentiment_model(hidden_size=hidden, layers=layers)
+    articles = stub_articles(n_articles)
+    unique = len({article_text(a) for a in articles})
+
+    legacy_pipe = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=-1)
+    start = time.perf_counter()
+    legacy_score(legacy_pipe, articles)
+    legacy = n_articles / (time.perf_counter() - start)
+
+    engine = SentimentEngine(model_name="stub", tokenizer=tokenizer, model=model, batch_size=batch_size,
+                             max_length=max_length, num_threads=threads, cache=SentimentCache(":memory:"))
+    groups = {f"T{i % 40}": [] for i in range(40)}
+    for i, article in enumerate(articles):
+        groups[f"T{i % 40}"].append(article)
+
+    start = time.perf_counter()
+    engine.score_groups(groups)
+    cold = n_articles / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    engine.score_groups(groups)
+    warm = n_articles / (time.perf_counter() - start)
+
+    print(f"articles / unique texts        : {n_articles} / {unique}")
+    print(f"per-article pipeline loop      : {legacy:>10,.1f} articles/sec")
+    print(f"engine, cold cache             : {cold:>10,.1f} articles/sec  ({cold / legacy:.1f}x)")
+    print(f"engine, warm cache             : {warm:>10,.1f} articles/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--hidden", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=4)
+    args = parser.parse_args()
+    main(args.articles, args.batch_size, args.max_length, args.threads, args.hidden, args.layers)
@@ -0,0 +1,81 @@
+# benchmarks/bench_sentiment_store.py
+"""
+Count the sentiment work done by the news/decay store against the old
+"refetch and rescore the 5-day window" approach, and time the vectorized
+decayed_sentiment backfill against the row-by-row recurrence.
+
+A counting stand-in (StubSentimentEngine) replaces the sentiment model, so
+only texts that reach the model are counted; news is synthetic (stub_articles), with each day's
+articles still returned by the feed on the following days.
+
+Run from new_backend/:
+    python -m benchmarks.bench_sentiment_store [--days 60] [--per-day 5] [--backfill-days 3650]
+"""
+import os
+import time
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.sentiment_store import SentimentStore, decay_series
+from benchmarks.stubs import StubSentimentEngine, stub_articles
+
+
+def _news_feed(days, per_day):
+    """Per day: that day's articles, plus the previous day's again (feeds overlap)."""
+    fresh = {}
+    for i, day in enumerate(days):
+        articles = stub_articles(per_day, seed=i, repeat_ratio=0.0)
+        fresh[day] = [dict(a, url=f"https://news.example/{day}/{j}") for j, a in enumerate(articles)]
+    return {day: fresh[day] + (fresh[days[i - 1]] if i else []) for i, day in enumerate(days)}
+
+
+def main(n_days: int, per_day: int, backfill_days: int, lookback: int = 5):
+    start = date(2025, 1, 1)
+    days = [(start + timedelta(days=i)).isoformat() for i in range(n_days)]
+    feed = _news_feed(days, per_day)
+
+    # Old path: every daily run re-scores the whole lookback window
+    legacy_texts = sum(
+        len(feed[days[j]]) for i in range(n_days) for j in range(max(0, i - lookback), i + 1)
+    )
+
+    engine = StubSentimentEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SentimentStore(os.path.join(tmp, "news.sqlite3"), engine=engine)
+        started = time.perf_counter()
+        for day in days:
+            store.add_trading_days("AAPL", [day])
+            store.add_articles("AAPL", {day: feed[day]})
+            store.sentiment_at("AAPL", day)
+        incremental_s = (time.perf_counter() - started) / n_days
+
+        values = np.random.default_rng(0).normal(0, 0.3, backfill_days)
+        started = time.perf_counter()
+        loop, prev = [], 0.0
+        for v in values:
+            prev = prev * store.decay + v
+            loop.append(prev)
+        loop_s = time.perf_counter() - started
+        started = time.perf_counter()
+        vectorized = decay_series(values, store.decay)
+        vector_s = time.perf_counter() - started
+
+    print(f"days / new articles per day : {n_days} / {per_day}")
+    print(f"texts scored, 5-day rescore : {legacy_texts}")
+    print(f"texts scored, store         : {engine.texts}")
+    print(f"store update + read         : {incremental_s * 1e3:8.2f} ms/day")
+    print(f"backfill {backfill_days} days, loop     : {loop_s * 1e3:8.2f} ms")
+    print(f"backfill {backfill_days} days, vectorized: {vector_s * 1e3:8.2f} ms "
+          f"(max abs diff {np.abs(vectorized - np.array(loop)).max():.1e})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--per-day", type=int, default=5)
+    parser.add_argument("--backfill-days", type=int, default=3650)
+    args = parser.parse_args()
+    main(args.days, args.per_day, args.backfill_days)
@@ -0,0 +1,61 @@
+# benchmarks/bench_shap.py
+"""
+Single-row SHAP latency with a fresh TreeExplainer per call (the old path)
+versus the shared explainer pool, cold and memoized, plus batch rows/sec.
+
+Run from new_backend/:
+    python -m benchmarks.bench_shap
+"""
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import shap
+
+from app.config import TRAINING_CSV_PATH
+from app.inference import get_models, get_shap_pool, scale_features, to_feature_matrix
+
+
+def _per_call_ms(fn, rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        fn(row)
+    return (time.perf_counter() - start) / len(rows) * 1e3
+
+
+def legacy_explain(X_row: np.ndarray):
+    for model in get_models().values():
+        explainer = shap.TreeExplainer(model)
+        explainer.shap_values(X_row)
+
+
+def main(single_rows: int, batch_rows: int):
+    df = pd.read_csv(TRAINING_CSV_PATH)
+    X = scale_features(to_feature_matrix(df))
+    singles = [X[i:i + 1] for i in range(single_rows)]
+
+    legacy = _per_call_ms(legacy_explain, singles)
+    pool = get_shap_pool()
+    pool.explain(X[-1:])  # build the explainers once
+    cold = _per_call_ms(pool.explain, singles)
+    warm = _per_call_ms(pool.explain, singles)
+
+    pool.cache.clear()
+    batch = X[:batch_rows]
+    start = time.perf_counter()
+    pool.shap_values(batch)
+    batch_rate = len(batch) / (time.perf_counter() - start)
+
+    print(f"{'new explainer per call':<28}{legacy:>10.2f} ms/row")
+    print(f"{'pooled explainer, uncached':<28}{cold:>10.2f} ms/row")
+    print(f"{'pooled explainer, memoized':<28}{warm:>10.2f} ms/row")
+    print(f"{'pooled batch n=' + str(len(batch)):<28}{batch_rate:>10,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--single-rows", type=int, default=50)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.single_rows, args.batch_rows)
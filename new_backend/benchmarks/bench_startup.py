@@ -0,0 +1,132 @@
+# benchmarks/bench_startup.py
+"""
+Import time and per-worker memory of the API under three start-up modes,
+each measured in a fresh interpreter that forks --workers workers the way
+gunicorn does:
+
+  eager    : every worker imports the whole scoring stack itself (models,
+             shap, transformers/torch), as `import app.main` used to
+  lazy     : workers import app.main only; the scoring stack loads in a
+             worker on its first cold request
+  preload  : PRELOAD_MODELS=true -- the master imports and warms everything
+             once, freezes the GC, then forks
+
+For each worker, RSS and private (unshared) memory come from
+/proc/self/smaps_rollup: "idle" is right after start-up (enough to serve
+cached reads), "after cold" is after the scoring stack is in use.
+
+Run from new_backend/ (Linux only):
+    python -m benchmarks.bench_startup [--workers 2] [--json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+
+def _memory_mb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": round(fields.get("Rss", 0.0), 1),
+        "private": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1),
+    }
+
+
+def _warm_scoring_stack():
+    from app import inference
+    inference.preload()
+
+
+def _worker(mode: str, write_fd: int):
+    started = time.perf_counter()
+    if mode in ("eager", "lazy"):
+        import app.main  # noqa: F401
+    if mode == "eager":
+        _warm_scoring_stack()
+    result = {"import_s": round(time.perf_counter() - started, 3), "idle": _memory_mb()}
+    started = time.perf_counter()
+    _warm_scoring_stack()
+    result["cold_request_s"] = round(time.perf_counter() - started, 3)
+    result["after_cold"] = _memory_mb()
+    os.write(write_fd, (json.dumps(result) + "\n").encode())
+
+
+def run_scenario(mode: str, workers: int) -> dict:
+    """Runs inside a fresh interpreter: optional preload in the master, then fork the workers."""
+    import gc
+
+    out = {"mode": mode, "master_import_s": 0.0}
+    if mode == "preload":
+        os.environ["PRELOAD_MODELS"] = "true"
+        started = time.perf_counter()
+        import app.main  # noqa: F401
+        out["master_import_s"] = round(time.perf_counter() - started, 3)
+        gc.freeze()
+    out["master"] = _memory_mb()
+
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            # Silence model-loading chatter in the workers
+            sys.stdout = open(os.devnull, "w")
+            try:
+                _worker(mode, write_fd)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as fh:
+        out["workers"] = [json.loads(line) for line in fh]
+    for pid in pids:
+        os.waitpid(pid, 0)
+    return out
+
+
+def main(workers: int, as_json: bool):
+    env = dict(os.environ)
+    # The Mongo client connects lazily; any well-formed URI lets app.main import
+    env["MONGO_URI"] = env.get("MONGO_URI") or "mongodb://localhost:27017"
+    env.pop("PRELOAD_MODELS", None)
+
+    results = []
+    for mode in ("eager", "lazy", "preload"):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--scenario", mode, "--workers", str(workers)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':<9}{'master import':>15}{'worker import':>15}{'idle RSS':>11}{'idle private':>14}"
+          f"{'cold request':>14}{'RSS after':>11}{'private after':>15}")
+    for r in results:
+        for i, w in enumerate(r["workers"]):
+            print(f"{r['mode'] if i == 0 else '':<9}"
+                  f"{r['master_import_s'] if i == 0 else '':>14}{'s' if i == 0 else ' '}"
+                  f"{w['import_s']:>14}s{w['idle']['rss']:>9.0f}MB{w['idle']['private']:>12.0f}MB"
+                  f"{w['cold_request_s']:>13}s{w['after_cold']['rss']:>9.0f}MB{w['after_cold']['private']:>13.0f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--scenario", choices=["eager", "lazy", "preload"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario, args.workers)))
+    else:
+        main(args.workers, args.json)
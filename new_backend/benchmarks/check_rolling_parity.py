@@ -0,0 +1,128 @@
+# benchmarks/check_rolling_parity.py
+"""
+Parity check for the incremental rolling-window features.
+
+For every ticker in 'final training.csv' the closes are fed bar by bar
+through TickerFeatureState (saving and reloading the state halfway, as
+between two daily runs) and each day's features are compared with a
+vectorized pandas recomputation over the same closes. NaN positions must
+match exactly; values must agree to within floating-point rounding.
+
+Also times the per-bar update against recomputing the full window history
+for one new day, which is what the on-the-fly path used to do. The suite's
+features group runs the same check (assert_parity) before timing anything.
+
+Run from new_backend/:
+    python -m benchmarks.check_rolling_parity [--atol 1e-12] [--rtol 1e-9]
+"""
+import sys
+import time
+import argparse
+import tempfile
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from app.config import TRAINING_CSV_PATH
+from app.rolling_features import (
+    TECHNICAL_FEATURES, VOL_WINDOWS, RETURN_WINDOWS, DRAWDOWN_WINDOW,
+    TickerFeatureState, FeatureStateStore,
+)
+
+
+def pandas_features(close: pd.Series) -> pd.DataFrame:
+    """The vectorized definitions used to build the training set."""
+    ret = close.pct_change()
+    out = {f"vol_{n}d": ret.rolling(n).std() for n in VOL_WINDOWS}
+    out["drawdown_60d"] = close / close.rolling(DRAWDOWN_WINDOW, min_periods=1).max() - 1.0
+    for n in RETURN_WINDOWS:
+        out[f"prev_return_{n}d"] = close.pct_change(n)
+    return pd.DataFrame(out, index=close.index)[TECHNICAL_FEATURES]
+
+
+def incremental_features(ticker: str, close: pd.Series, store: FeatureStateStore) -> np.ndarray:
+    rows = []
+    half = len(close) // 2
+    state = TickerFeatureState(ticker)
+    for i, (date, value) in enumerate(zip(close.index.strftime('%Y-%m-%d'), close.to_numpy(float))):
+        if i == half:
+            store.save(state)
+            state = store.load(ticker)
+        state.update(date, value)
+        feats = state.features()
+        rows.append([feats[name] for name in TECHNICAL_FEATURES])
+    return np.array(rows, dtype=np.float64)
+
+
+def _closes(df: pd.DataFrame = None) -> pd.DataFrame:
+    if df is None:
+        df = pd.read_csv(TRAINING_CSV_PATH, usecols=["date", "ticker", "close"], parse_dates=["date"])
+    else:
+        df = df[["date", "ticker", "close"]].assign(date=lambda d: pd.to_datetime(d["date"]))
+    return df.dropna(subset=["ticker", "close"]).drop_duplicates(["ticker", "date"], keep="last")
+
+
+def parity(df: pd.DataFrame, atol: float, rtol: float) -> Dict:
+    """
+    Compares incremental and pandas features for every ticker of df (date,
+    ticker, close). Returns the first mismatch per ticker under 'mismatches',
+    plus bar counts, the largest difference and the time spent on each path.
+    """
+    mismatches, bars, worst = [], 0, 0.0
+    update_s = recompute_s = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeatureStateStore(tmp)
+        for ticker, group in df.sort_values("date").groupby("ticker"):
+            close = group.set_index("date")["close"].astype(float)
+            expected = pandas_features(close).to_numpy(np.float64)
+
+            start = time.perf_counter()
+            actual = incremental_features(ticker, close, store)
+            update_s += time.perf_counter() - start
+
+            start = time.perf_counter()
+            pandas_features(close)
+            recompute_s += time.perf_counter() - start
+
+            nan_match = np.array_equal(np.isnan(expected), np.isnan(actual))
+            finite = ~np.isnan(expected)
+            diff = np.abs(expected[finite] - actual[finite])
+            close_enough = np.allclose(actual[finite], expected[finite], rtol=rtol, atol=atol)
+            worst = max(worst, float(diff.max()) if diff.size else 0.0)
+            bars += len(close)
+            if not (nan_match and close_enough):
+                bad = np.argwhere(~np.isclose(actual, expected, rtol=rtol, atol=atol, equal_nan=True))
+                i, j = bad[0]
+                mismatches.append(f"{ticker} {close.index[i].date()} {TECHNICAL_FEATURES[j]}: "
+                                  f"incremental={actual[i, j]!r} pandas={expected[i, j]!r}")
+    return {"mismatches": mismatches, "tickers": df["ticker"].nunique(), "bars": bars, "worst": worst,
+            "update_s": update_s, "recompute_s": recompute_s}
+
+
+def assert_parity(df: pd.DataFrame = None, atol: float = 1e-12, rtol: float = 1e-9):
+    """Raise AssertionError when the incremental features drift from pandas for any ticker."""
+    mismatches = parity(_closes(df), atol, rtol)["mismatches"]
+    assert not mismatches, f"Incremental rolling features differ from pandas: {mismatches}"
+
+
+def main(atol: float, rtol: float) -> bool:
+    result = parity(_closes(), atol, rtol)
+    for mismatch in result["mismatches"]:
+        print(f"❌ {mismatch}")
+
+    ok, bars, tickers = not result["mismatches"], result["bars"], result["tickers"]
+    print(f"tickers / bars             : {tickers} / {bars}")
+    print(f"max abs difference         : {result['worst']:.3e}")
+    print(f"incremental update         : {result['update_s'] / bars * 1e6:10.1f} us/bar")
+    print(f"pandas full recompute      : {result['recompute_s'] / tickers * 1e3:10.2f} ms/ticker-day")
+    print("✅ Incremental features match pandas." if ok else "❌ Parity check failed.")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--atol", type=float, default=1e-12)
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    args = parser.parse_args()
+    sys.exit(0 if main(args.atol, args.rtol) else 1)
@@ -0,0 +1,98 @@
+# benchmarks/check_sentiment_parity.py
+"""
+Parity check for decayed_sentiment in the news sentiment store.
+
+For every ticker in 'final training.csv' each row's sentiment_score is
+turned into articles scored at exactly that value: one dated on the
+trading day itself and, when the calendar day before it is not a trading
+day (weekend, holiday), one dated on that day, which the store must fold
+into the trading row. Trading days and articles are fed in two halves, with
+the second half's news arriving before its trading days are registered, as
+between two daily runs. The store's decayed_sentiment per trading row must
+match the CSV column to within floating-point rounding.
+
+Run from new_backend/:
+    python -m benchmarks.check_sentiment_parity [--atol 1e-9]
+"""
+import sys
+import argparse
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.config import TRAINING_CSV_PATH, SENTIMENT_DECAY, SENTIMENT_DECAY_SCALE
+from app.sentiment import article_text
+from app.sentiment_store import SentimentStore
+
+
+class PresetEngine:
+    """Stands in for SentimentEngine: every article text has a preset score."""
+
+    def __init__(self):
+        self.scores = {}
+
+    def score_texts(self, texts):
+        return [self.scores[t] for t in texts]
+
+
+def articles_for(ticker: str, days: pd.Series, scores: pd.Series, engine: PresetEngine):
+    """{day: articles} reproducing each trading row's sentiment_score."""
+    trading = set(days)
+    news = {}
+    for day, score in zip(days, scores):
+        if score == 0.0:
+            continue
+        dated = [day]
+        before = day - timedelta(days=1)
+        if before not in trading:
+            dated.append(before)
+        for when in dated:
+            article = {"title": f"{ticker} {when.date()}", "description": "", "url": f"{ticker}/{when.date()}"}
+            engine.scores[article_text(article)] = float(score)
+            news.setdefault(when.strftime("%Y-%m-%d"), []).append(article)
+    return news
+
+
+def main(atol: float) -> bool:
+    df = pd.read_csv(TRAINING_CSV_PATH, usecols=["date", "ticker", "sentiment_score", "decayed_sentiment"],
+                     parse_dates=["date"])
+    df = df.dropna(subset=["ticker"]).drop_duplicates(["ticker", "date"], keep="last")
+
+    ok, rows, worst = True, 0, 0.0
+    for ticker, group in df.sort_values("date").groupby("ticker"):
+        engine = PresetEngine()
+        store = SentimentStore(":memory:", engine=engine, decay=SENTIMENT_DECAY, scale=SENTIMENT_DECAY_SCALE)
+        days = group["date"].reset_index(drop=True)
+        news = articles_for(ticker, days, group["sentiment_score"], engine)
+        half = days.iloc[len(days) // 2].strftime("%Y-%m-%d")
+
+        first = {d: a for d, a in news.items() if d < half}
+        store.add_trading_days(ticker, days[days < half].dt.strftime("%Y-%m-%d"))
+        store.add_articles(ticker, first)
+        store.add_articles(ticker, {d: a for d, a in news.items() if d >= half})
+        store.add_trading_days(ticker, days[days >= half].dt.strftime("%Y-%m-%d"))
+
+        got_days, decayed, _ = store.decayed_range(ticker, "0000-01-01", "9999-12-31")
+        expected = group["decayed_sentiment"].to_numpy(np.float64)
+        same_days = np.array_equal(got_days, days.to_numpy().astype("datetime64[D]"))
+        diff = np.abs(decayed - expected) if same_days else np.array([np.inf])
+        worst = max(worst, float(diff.max()) if diff.size else 0.0)
+        rows += len(days)
+        if not same_days or (diff > atol).any():
+            ok = False
+            i = int(np.argmax(diff)) if same_days else 0
+            print(f"❌ {ticker} {days.iloc[i].date()}: store={decayed[i] if same_days else None!r} "
+                  f"csv={expected[i]!r}")
+
+    print(f"tickers / trading rows     : {df['ticker'].nunique()} / {rows}")
+    print(f"max abs difference         : {worst:.3e}")
+    print("✅ Store decayed_sentiment matches the training CSV." if ok else "❌ Parity check failed.")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--atol", type=float, default=1e-9)
+    args = parser.parse_args()
+    sys.exit(0 if main(args.atol) else 1)
@@ -0,0 +1,122 @@
+# benchmarks/stubs.py
+"""Offline stand-ins for the external services used by the scoring stack."""
+import random
+
+_WORDS = (
+    "shares stock rally slump profit loss guidance beats misses analysts upgrade downgrade "
+    "revenue growth outlook quarter record lawsuit settlement merger acquisition dividend buyback "
+    "layoffs expansion demand supply chain margin pressure rating outperform underperform "
+    "investors market cautious optimistic strong weak earnings forecast cut raise"
+).split()
+
+
+def build_stub_sentiment_model(hidden_size: int = 256, layers: int = 4, heads: int = 4):
+    """
+    A randomly initialised RoBERTa sequence classifier with a word-level
+    tokenizer, built in memory. Same architecture family and label set as the
+    production DistilRoBERTa model, so batching behaviour is representative.
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaForSequenceClassification
+
+    vocab = {"<pad>": 0, "<unk>": 1, "<s>": 2, "</s>": 3}
+    for word in _WORDS:
+        vocab.setdefault(word, len(vocab))
+    backend = Tokenizer(models.WordLevel(vocab=vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, pad_token="<pad>", unk_token="<unk>",
+                                        model_max_length=512)
+
+    config = RobertaConfig(
+        vocab_size=len(vocab), hidden_size=hidden_size, num_hidden_layers=layers,
+        num_attention_heads=heads, intermediate_size=hidden_size * 4, max_position_embeddings=514,
+        pad_token_id=0, num_labels=3,
+        id2label={0: "negative", 1: "neutral", 2: "positive"},
+        label2id={"negative": 0, "neutral": 1, "positive": 2},
+    )
+    model = RobertaForSequenceClassification(config).eval()
+    return tokenizer, model
+
+
+def stub_articles(n: int, seed: int = 0, repeat_ratio: float = 0.3):
+    """Synthetic news articles; about repeat_ratio of them repeat an earlier headline."""
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(n):
+        if articles and rng.random() < repeat_ratio:
+            articles.append(dict(rng.choice(articles)))
+            continue
+        title = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 14)))
+        description = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(15, 60)))
+        articles.append({"title": title, "description": description})
+    return articles
+
+
+class StubMarketFetcher:
+    """
+    Offline stand-in for YFinanceFetcher: deterministic random-walk business-day
+    bars per ticker, plus a fixed `.info` payload. Each call sleeps `latency`
+    seconds to mimic a round trip, and calls are counted.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.download_calls = []
+        self.info_calls = 0
+
+    def _bars(self, ticker: str, start: str, end: str):
+        import numpy as np
+        import pandas as pd
+        from zlib import crc32
+
+        days = pd.bdate_range("2015-01-01", end)
+        rng = np.random.default_rng(crc32(ticker.encode()))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(days))))
+        frame = pd.DataFrame({
+            "Open": close * 0.995, "High": close * 1.01, "Low": close * 0.99,
+            "Close": close, "Adj Close": close, "Volume": rng.integers(1e5, 1e7, len(days)).astype(float),
+        }, index=days)
+        return frame[frame.index >= start]
+
+    def download(self, tickers, start, end):
+        import time
+        time.sleep(self.latency)
+        self.download_calls.append((tuple(tickers), start, end))
+        return {t: self._bars(t, start, end) for t in tickers}
+
+    def info(self, ticker):
+        import time
+        time.sleep(self.latency)
+        self.info_calls += 1
+        return {"longName": f"{ticker} Inc.", "debtToEquity": 150.0, "currentRatio": 1.1, "quickRatio": 0.9,
+                "returnOnAssets": 0.2, "returnOnEquity": 1.5, "profitMargins": 0.25}
+
+
+class StubSentimentEngine:
+    """
+    Stands in for SentimentEngine: a deterministic score in [-1, 1] per text
+    (from its hash), and a count of the texts that reached it.
+    """
+
+    def __init__(self):
+        self.texts = 0
+
+    def score_texts(self, texts):
+        from zlib import crc32
+        texts = list(texts)
+        self.texts += len(texts)
+        return [(crc32(t.encode("utf-8")) % 2001 - 1000) / 1000 for t in texts]
+
+
+def stub_news(latency: float = 0.0, per_day: int = 5):
+    """A drop-in for inference._get_news returning stub_articles seeded by company and date."""
+    import time
+    from zlib import crc32
+
+    def get_news(company_name, date, window, max_articles):
+        time.sleep(latency)
+        seed = crc32(f"{company_name}|{date}".encode("utf-8"))
+        articles = stub_articles(min(per_day, max_articles), seed=seed, repeat_ratio=0.0)
+        return [dict(a, url=f"https://news.example/{seed}/{i}") for i, a in enumerate(articles)]
+
+    return get_news
@@ -0,0 +1,426 @@
+# benchmarks/suite.py
+"""
+Reproducible, fully offline benchmark suite for the scoring stack.
+
+Uses 'final training.csv' and the shipped models/*.pkl. Everything external
+is replaced: prices/fundamentals by StubMarketFetcher, GNews by stub_news,
+the sentiment model by StubSentimentEngine (or, with --sentiment tiny-model,
+a small randomly initialised RoBERTa built in memory), MongoDB by mongomock.
+All caches and state files go to a temporary directory. mongomock makes the
+absolute backfill/api numbers pessimistic; compare runs against each other.
+
+Groups (--only):
+  score     single-row calculate_creditworthiness_with_explain, batch score_batch; first
+            asserts every prediction backend matches XGBoost predict_proba on the rows
+  shap      cold (empty row cache) and warm SHAP explanations
+  features  get_ticker_features: feature-store hit, and the on-the-fly path; first
+            asserts the incremental rolling features match their pandas definitions
+  backfill  run_streaming_backfill rows/s, with and without SHAP
+  api       /scores/* latency and throughput through TestClient
+  sensitivity  a 1,000-point what-if grid (with and without partial dependence),
+               vs one scoring call per point, and through the API
+
+Every metric name ends in its unit: *_ms is lower-is-better, *_per_s
+higher-is-better. Results are written as JSON (--out); with --baseline a
+previous file is compared metric by metric and the exit code is 1 when
+any p50 or throughput metric is worse by more than --tolerance (p95 values
+are printed but too noisy at these sample counts to gate on).
+
+Run from new_backend/ (after pip install -r benchmarks/requirements.txt):
+    python -m benchmarks.suite [--only score shap] [--out bench.json]
+                               [--baseline bench.json --tolerance 0.25] [--quick]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Keep every cache and state file of the app out of the working tree
+_TMP = tempfile.mkdtemp(prefix="credit-bench-")
+for _name, _value in {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "MARKET_DATA_CACHE_DIR": os.path.join(_TMP, "market_data"),
+    "FEATURE_STORE_DIR": os.path.join(_TMP, "feature_store"),
+    "FEATURE_STATE_DIR": os.path.join(_TMP, "feature_state"),
+    "SENTIMENT_STORE_PATH": os.path.join(_TMP, "news_sentiment.sqlite3"),
+    "SENTIMENT_CACHE_PATH": os.path.join(_TMP, "sentiment.sqlite3"),
+    "BACKFILL_CHECKPOINT_PATH": os.path.join(_TMP, "backfill_checkpoint.json"),
+    "JOB_QUEUE_PATH": os.path.join(_TMP, "jobs.sqlite3"),
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ[_name] = _value
+
+import numpy as np
+import pandas as pd
+
+from app.config import TRAINING_CSV_PATH
+from benchmarks.stubs import StubMarketFetcher, StubSentimentEngine, build_stub_sentiment_model, stub_news
+
+SEED = 1234
+GROUPS = ("score", "shap", "features", "backfill", "api", "sensitivity")
+
+
+# -------------------- Measurement -------------------- #
+def _samples_ms(fn: Callable, repeats: int, warmup: int = 3, setup: Optional[Callable] = None) -> List[float]:
+    """Per-call wall time in ms; setup (untimed) runs before every call."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return samples
+
+
+def _latency(samples: List[float], prefix: str = "") -> Dict[str, float]:
+    return {
+        f"{prefix}p50_ms": float(np.percentile(samples, 50)),
+        f"{prefix}p95_ms": float(np.percentile(samples, 95)),
+    }
+
+
+def _rows_per_s(samples: List[float], rows: int) -> float:
+    return rows / (float(np.median(samples)) / 1e3)
+
+
+# -------------------- Environment -------------------- #
+class Env:
+    """Shared fixtures: training rows, a mongomock database and offline stand-ins wired into the app."""
+
+    def __init__(self, quick: bool, sentiment: str):
+        import mongomock
+        from app import database, inference
+        from app.market_data import MarketData
+        from app.sentiment_store import SentimentStore
+
+        self.quick = quick
+        self.repeats = 30 if quick else 200
+        self.rows = pd.read_csv(TRAINING_CSV_PATH)
+        self.rows = self.rows[self.rows["ticker"].notna()].reset_index(drop=True)
+
+        self.db = mongomock.MongoClient().credit_intelligence_bench
+        database.db = self.db
+        database.scores_collection = self.db.scores
+        database.explanations_collection = self.db.explanations
+        database.latest_scores_collection = self.db.latest_scores
+        database.score_writes_collection = self.db.score_writes
+        database.locks_collection = self.db.locks
+
+        if sentiment == "tiny-model":
+            from app.sentiment import SentimentEngine
+            tokenizer, model = build_stub_sentiment_model()
+            engine = SentimentEngine(model_name="stub-roberta", tokenizer=tokenizer, model=model)
+        else:
+            engine = StubSentimentEngine()
+        self.market = MarketData(fetcher=StubMarketFetcher(), cache_dir=os.path.join(_TMP, "market_data"))
+        self.sentiment_store = SentimentStore(os.path.join(_TMP, "news_sentiment.sqlite3"), engine=engine)
+        inference.get_market_data = lambda: self.market
+        inference.get_sentiment_store = lambda: self.sentiment_store
+        inference._get_news = stub_news()
+
+    def sample(self, n: int, seed: int = SEED) -> pd.DataFrame:
+        return self.rows.sample(n=min(n, len(self.rows)), random_state=seed).reset_index(drop=True)
+
+    def reset_db(self):
+        for name in self.db.list_collection_names():
+            self.db.drop_collection(name)
+
+
+# -------------------- Cases -------------------- #
+def bench_score(env: Env) -> Dict[str, Dict[str, float]]:
+    from app.inference import calculate_creditworthiness_with_explain, score_batch, feature_cols, scale_features
+    from benchmarks.bench_fast_predict import assert_parity
+
+    rows = env.sample(1000)
+    # A fast backend that drifts from the models would make its timings meaningless
+    assert_parity(scale_features(rows[feature_cols].to_numpy(np.float64)))
+    singles = [dict(r, ticker=r["ticker"]) for r in rows[["ticker", "date"] + feature_cols].to_dict("records")]
+    it = iter(range(10 ** 9))
+    single = _samples_ms(lambda: calculate_creditworthiness_with_explain(singles[next(it) % len(singles)]),
+                         env.repeats)
+    batch = _samples_ms(lambda: score_batch(rows, method="weighted"), max(10, env.repeats // 10))
+    return {
+        "score.single": _latency(single),
+        "score.batch_1000": {"p50_ms": float(np.median(batch)), "rows_per_s": _rows_per_s(batch, len(rows))},
+    }
+
+
+def bench_shap(env: Env) -> Dict[str, Dict[str, float]]:
+    from app.inference import get_shap_pool, explain_batch, feature_cols
+
+    get_shap_pool().warm()
+    rows = env.sample(256)
+    one = rows.iloc[:1]
+    clear = get_shap_pool().cache.clear
+    cold_single = _samples_ms(lambda: explain_batch(one), env.repeats // 2, setup=clear)
+    warm_single = _samples_ms(lambda: explain_batch(one), env.repeats)
+    cold_batch = _samples_ms(lambda: explain_batch(rows[feature_cols]), max(5, env.repeats // 20), setup=clear)
+    return {
+        "shap.single_cold": _latency(cold_single),
+        "shap.single_warm": _latency(warm_single),
+        "shap.batch_256_cold": {"p50_ms": float(np.median(cold_batch)),
+                                "rows_per_s": _rows_per_s(cold_batch, len(rows))},
+    }
+
+
+def bench_features(env: Env) -> Dict[str, Dict[str, float]]:
+    from app.inference import get_ticker_features
+    from app.feature_store import get_feature_store
+    from benchmarks.check_rolling_parity import assert_parity
+
+    # The on-the-fly timings only mean something while the incremental features match pandas
+    assert_parity(env.rows)
+    get_feature_store()
+    keys = env.sample(500)[["ticker", "date"]].to_records(index=False)
+    it = iter(range(10 ** 9))
+
+    def store_hit():
+        ticker, date = keys[next(it) % len(keys)]
+        get_ticker_features(ticker, date)
+
+    hits = _samples_ms(store_hit, env.repeats)
+
+    # Tickers the feature store does not know: prices, fundamentals, news and
+    # sentiment come through the stand-ins. First call per ticker is cold.
+    tickers = [f"ZB{i:02d}" for i in range(10 if env.quick else 30)]
+    target = "2025-06-30"
+    cold = []
+    for ticker in tickers:
+        start = time.perf_counter()
+        get_ticker_features(ticker, target)
+        cold.append((time.perf_counter() - start) * 1e3)
+    warm_it = iter(range(10 ** 9))
+    warm = _samples_ms(lambda: get_ticker_features(tickers[next(warm_it) % len(tickers)], target), env.repeats)
+    return {
+        "features.store_hit": _latency(hits),
+        "features.on_the_fly_cold": _latency(cold),
+        "features.on_the_fly_warm": _latency(warm),
+    }
+
+
+def bench_backfill(env: Env) -> Dict[str, Dict[str, float]]:
+    from backfill import run_streaming_backfill
+
+    n = 2000 if env.quick else 10000
+    path = os.path.join(_TMP, "backfill.csv")
+    env.rows.iloc[:n].to_csv(path, index=False)
+    out = {}
+    for name, include_shap in (("backfill.no_shap", False), ("backfill.shap", True)):
+        env.reset_db()
+        if include_shap:
+            from app.inference import get_shap_pool
+            get_shap_pool().cache.clear()
+        start = time.perf_counter()
+        checkpoint = run_streaming_backfill(path, start=None, chunk_size=2000, include_shap=include_shap,
+                                            checkpoint_path=os.path.join(_TMP, f"{name}.json"), restart=True)
+        seconds = time.perf_counter() - start
+        out[name] = {"rows_per_s": checkpoint["rows_written"] / seconds}
+    return out
+
+
+def bench_api(env: Env) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+    from app import database
+    from app.main import app
+    from app.response_cache import RESPONSE_CACHE
+    from backfill import score_chunk, select_rows
+
+    # The full history of a handful of tickers, scored by the real models
+    env.reset_db()
+    tickers = sorted(env.rows["ticker"].unique())[:8]
+    history = select_rows(env.rows, None, None, set(tickers))
+    database.ensure_indexes()
+    database.save_scores_bulk(score_chunk(history, include_shap=False))
+    stored = history.sample(n=200, random_state=SEED)
+    stored_keys = list(zip(stored["ticker"], stored["date"].dt.strftime("%Y-%m-%d")))
+    # Tickers without any stored score, so the on-or-before lookup misses too
+    unseen = env.rows[~env.rows["ticker"].isin(tickers)].sample(n=200, random_state=SEED)
+    cold_keys = list(zip(unseen["ticker"], unseen["date"]))
+
+    out = {}
+    with TestClient(app) as client:
+        def get(url):
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code, response.text[:200])
+
+        rng = random.Random(SEED)
+        urls = {
+            "latest": lambda: "/scores/latest",
+            "history": lambda: f"/scores/{rng.choice(tickers)}",
+            "history_page": lambda: f"/scores/{rng.choice(tickers)}?limit=100&fields=date,creditworthiness",
+            "on_date_stored": lambda: "/scores/{}/{}".format(*rng.choice(stored_keys)),
+        }
+        for name, next_url in urls.items():
+            # Uncached: a fresh URL with an empty response cache; cached: one URL over and over
+            uncached = _samples_ms(lambda: get(next_url()), env.repeats // 2, setup=RESPONSE_CACHE.clear)
+            url = next_url()
+            cached = _samples_ms(lambda: get(url), env.repeats)
+            out[f"api.{name}"] = dict(_latency(uncached, "uncached_"), **_latency(cached, "cached_"),
+                                      cached_requests_per_s=1e3 / float(np.median(cached)))
+
+        # Dates the DB does not hold yet: computed on the fly (feature store row + SHAP) and saved
+        cold_it = iter(cold_keys)
+        cold = _samples_ms(lambda: get("/scores/{}/{}".format(*next(cold_it))), min(len(cold_keys) - 3,
+                                                                                    env.repeats // 4))
+        out["api.on_date_cold"] = _latency(cold)
+    return out
+
+
+def bench_sensitivity(env: Env) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+    from app.inference import calculate_creditworthiness_with_explain, feature_cols
+    from app.main import app
+    from app.sensitivity import sensitivity, perturbation_grid
+
+    row = env.sample(1).iloc[0]
+    features = dict(row[feature_cols].astype(float), ticker=row["ticker"], date=row["date"])
+    # 40 x 25 = 1,000 points
+    request = {
+        "perturbations": {
+            "de_ratio": {"mode": "relative", "values": np.linspace(-0.5, 0.5, 40).tolist()},
+            "vol_20d": {"mode": "relative", "values": np.linspace(0.0, 1.5, 25).tolist()},
+        },
+    }
+    grid = sensitivity(features, request["perturbations"])
+    assert grid["grid"]["points"] == 1000
+
+    sweep = _samples_ms(lambda: sensitivity(features, request["perturbations"]), env.repeats)
+    with_pd = _samples_ms(lambda: sensitivity(features, request["perturbations"], feature_cols),
+                          max(10, env.repeats // 3))
+    # What analysts did before: one scoring call per grid point
+    _, _, _, X = perturbation_grid(np.array([features[c] for c in feature_cols]), request["perturbations"])
+    points = [dict(zip(feature_cols, x)) for x in X]
+    loop = _samples_ms(lambda: [calculate_creditworthiness_with_explain(p) for p in points], 3, warmup=1)
+
+    with TestClient(app) as client:
+        url = "/scores/{}/{}/sensitivity".format(row["ticker"], row["date"])
+
+        def post(body):
+            response = client.post(url, json=body)
+            assert response.status_code == 200, (url, response.status_code, response.text[:200])
+
+        api = _samples_ms(lambda: post(request), env.repeats)
+        api_pd = _samples_ms(lambda: post(dict(request, partial_dependence=feature_cols)),
+                             max(10, env.repeats // 3))
+    return {
+        "sensitivity.grid_1000": dict(_latency(sweep), points_per_s=_rows_per_s(sweep, 1000)),
+        "sensitivity.grid_1000_all_pd": _latency(with_pd),
+        "sensitivity.per_point_loop_1000": {"p50_ms": float(np.median(loop))},
+        "sensitivity.api_grid_1000": _latency(api),
+        "sensitivity.api_grid_1000_all_pd": _latency(api_pd),
+    }
+
+
+CASES = {
+    "score": bench_score,
+    "shap": bench_shap,
+    "features": bench_features,
+    "backfill": bench_backfill,
+    "api": bench_api,
+    "sensitivity": bench_sensitivity,
+}
+
+
+# -------------------- Reporting -------------------- #
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _environment(args) -> Dict:
+    import sklearn
+    import xgboost
+    from app.config import PREDICTION_BACKEND
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__, "pandas": pd.__version__,
+        "xgboost": xgboost.__version__, "scikit-learn": sklearn.__version__,
+        "prediction_backend": PREDICTION_BACKEND,
+        "quick": args.quick, "sentiment": args.sentiment, "groups": args.only,
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print current vs baseline per metric; returns the regressed metric names."""
+    regressions = []
+    print(f"\n{'metric':<44}{'baseline':>12}{'current':>12}{'change':>10}")
+    for case, metrics in results.items():
+        for name, value in metrics.items():
+            before = baseline.get(case, {}).get(name)
+            if before is None or before == 0:
+                continue
+            change = (value - before) / before
+            worse = -change if name.endswith("_per_s") else change
+            gated = "p95" not in name
+            flag = "  REGRESSION" if gated and worse > tolerance else ""
+            if flag:
+                regressions.append(f"{case}.{name}")
+            print(f"{case + '.' + name:<44}{before:>12.3f}{value:>12.3f}{change:>+9.0%}{flag}")
+    return regressions
+
+
+def main(args) -> int:
+    random.seed(SEED)
+    np.random.seed(SEED)
+    env = Env(args.quick, args.sentiment)
+    results: Dict[str, Dict[str, float]] = {}
+    for group in args.only:
+        started = time.perf_counter()
+        results.update(CASES[group](env))
+        print(f"[{group}] done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    for case, metrics in results.items():
+        print(f"{case:<36}" + "  ".join(f"{k}={v:,.3f}" for k, v in metrics.items()))
+
+    report = {"environment": _environment(args), "results": results}
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}: "
+                  f"{', '.join(regressions)}")
+            return 1
+        print(f"✅ No metric regressed by more than {args.tolerance:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown per metric")
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions and rows")
+    parser.add_argument("--sentiment", choices=["stub", "tiny-model"], default="stub")
+    args = parser.parse_args()
+    try:
+        code = main(args)
+    finally:
+        shutil.rmtree(_TMP, ignore_errors=True)
+    sys.exit(code)
@@ -2,4 +2,7 @@
 # exit on error
 set -o errexit
 
-pip install -r requirements.txt
\ No newline at end of file
+pip install -r requirements.txt
+
+# Convert final training.csv into the memory-mapped feature store
+python -m app.feature_store build
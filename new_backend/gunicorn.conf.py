@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+# Start with: gunicorn app.main:app -c gunicorn.conf.py
+# Worker count comes from WEB_CONCURRENCY (gunicorn's own default).
+import gc
+
+from app.config import PRELOAD_MODELS
+
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# With PRELOAD_MODELS=true the app (and with it the models, SHAP explainers and
+# sentiment model) is imported once in the master and shared copy-on-write by
+# every forked worker instead of being loaded per worker. Nothing that is unsafe
+# to fork is created in the master: the Mongo client connects lazily, on its
+# first operation in a worker (app/database.py).
+preload_app = PRELOAD_MODELS
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's generations, so collections
+    # in the workers don't touch (and un-share) the preloaded objects' pages
+    if preload_app:
+        gc.freeze()
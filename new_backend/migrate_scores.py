@@ -0,0 +1,110 @@
+# migrate_scores.py
+"""
+Migrates stored scores to the compact schema (see app/database.py).
+
+Score documents written before it embed 'features' (every CSV column of the
+row) and 'shap_explanations' (per-horizon dicts). For each such document the
+features and SHAP values are written to explanations as fixed-order float
+arrays, then the embedded copies are removed from scores. Batches are
+selected by "still has a legacy field", so an interrupted run simply
+resumes; rerunning a finished migration is a no-op. latest_scores is
+rebuilt at the end.
+
+Usage (from new_backend/):
+    python migrate_scores.py [--batch-size 1000] [--dry-run]
+"""
+import time
+import logging
+import argparse
+from typing import Dict, Optional
+
+import bson
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from app import database
+from app.log import configure_logging
+
+logger = logging.getLogger("app.migrate_scores")
+
+LEGACY_QUERY = {"$or": [{f: {"$exists": True}} for f in database.LEGACY_FIELDS]}
+
+
+def collection_stats(collection) -> Optional[Dict]:
+    """Data, storage and index sizes in bytes (None where collStats is unavailable, e.g. mongomock)."""
+    try:
+        stats = collection.database.command("collStats", collection.name)
+    except (OperationFailure, NotImplementedError):
+        return None
+    return {k: stats.get(k, 0) for k in ("count", "size", "storageSize", "totalIndexSize")}
+
+
+def estimate_savings(sample_size: int = 1000) -> Dict[str, float]:
+    """Average BSON bytes per score: a sample of legacy documents vs their compact split."""
+    legacy = hot = explanation = 0
+    docs = list(database.scores_collection.find(LEGACY_QUERY).limit(sample_size))
+    for doc in docs:
+        split = database.split_score_document(doc)
+        legacy += len(bson.encode(doc))
+        hot += len(bson.encode(split[0]))
+        explanation += len(bson.encode(split[1]))
+    n = max(len(docs), 1)
+    return {"sampled": len(docs), "legacy_bytes": legacy / n, "hot_bytes": hot / n,
+            "explanation_bytes": explanation / n}
+
+
+def migrate(batch_size: int) -> int:
+    """Moves every legacy document's heavy fields to explanations. Returns the number migrated."""
+    migrated = 0
+    while True:
+        batch = list(database.scores_collection.find(LEGACY_QUERY).limit(batch_size))
+        if not batch:
+            return migrated
+        explanations = []
+        for doc in batch:
+            _, explanation = database.split_score_document(doc)
+            explanations.append(UpdateOne({"ticker": doc["ticker"], "date": doc["date"]},
+                                          {"$set": explanation}, upsert=True))
+        # Explanations first: an interruption leaves the batch legacy, to be redone
+        database.explanations_collection.bulk_write(explanations, ordered=False)
+        database.scores_collection.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$unset": {f: "" for f in database.LEGACY_FIELDS}})
+            for doc in batch
+        ], ordered=False)
+        migrated += len(batch)
+        logger.info(f"Migrated {migrated} score documents...")
+
+
+def main(batch_size: int, dry_run: bool):
+    database.ensure_indexes()
+    pending = database.scores_collection.count_documents(LEGACY_QUERY)
+    estimate = estimate_savings()
+    print(f"📦 {pending} of {database.scores_collection.count_documents({})} score documents use the legacy schema.")
+    if estimate["sampled"]:
+        print(f"   Sampled {estimate['sampled']}: {estimate['legacy_bytes']:,.0f} B per legacy document -> "
+              f"{estimate['hot_bytes']:,.0f} B in scores + {estimate['explanation_bytes']:,.0f} B in explanations.")
+    if dry_run or not pending:
+        return
+
+    before = collection_stats(database.scores_collection)
+    started = time.perf_counter()
+    migrated = migrate(batch_size)
+    database.rebuild_latest_scores()
+    print(f"✅ Migrated {migrated} documents in {time.perf_counter() - started:.1f}s.")
+
+    after = collection_stats(database.scores_collection)
+    if before and after:
+        explanations = collection_stats(database.explanations_collection) or {}
+        print(f"   scores data size: {before['size']:,} B -> {after['size']:,} B "
+              f"(explanations: {explanations.get('size', 0):,} B). "
+              f"Storage is returned to the OS after a compact or resync.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be migrated.")
+    args = parser.parse_args()
+
+    configure_logging()
+    main(args.batch_size, args.dry_run)